@@ -0,0 +1,54 @@
+"""Sensor reading rollups for tiered retention
+
+Revision ID: 002_sensor_reading_rollups
+Revises: 001_initial
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002_sensor_reading_rollups'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DO $$ BEGIN
+            CREATE TYPE rollupresolutionenum AS ENUM ('minute', 'hour');
+        EXCEPTION
+            WHEN duplicate_object THEN null;
+        END $$;
+    """)
+
+    op.create_table(
+        'sensor_reading_rollups',
+        sa.Column('resolution', postgresql.ENUM('minute', 'hour', name='rollupresolutionenum', create_type=False), nullable=False),
+        sa.Column('unit_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('sensor_type', postgresql.ENUM('co2', 'temperature', 'airflow', 'efficiency', name='sensortypeenum', create_type=False), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('unit', sa.String(50), nullable=False),
+        sa.Column('value_count', sa.Integer(), nullable=False),
+        sa.Column('value_sum', sa.Numeric(20, 4), nullable=False),
+        sa.Column('value_min', sa.Numeric(10, 2), nullable=False),
+        sa.Column('value_max', sa.Numeric(10, 2), nullable=False),
+        sa.ForeignKeyConstraint(['unit_id'], ['dac_units.id'], ),
+        sa.PrimaryKeyConstraint('resolution', 'unit_id', 'sensor_type', 'bucket_start'),
+    )
+    # Retention scans each tier by age, independent of unit/sensor type
+    op.create_index(
+        'ix_sensor_reading_rollups_resolution_bucket',
+        'sensor_reading_rollups',
+        ['resolution', 'bucket_start'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sensor_reading_rollups_resolution_bucket', table_name='sensor_reading_rollups')
+    op.drop_table('sensor_reading_rollups')
+    op.execute('DROP TYPE rollupresolutionenum')
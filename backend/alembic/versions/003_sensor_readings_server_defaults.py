@@ -0,0 +1,25 @@
+"""Server-side defaults for sensor_readings id and created_at
+
+Revision ID: 003_sensor_readings_defaults
+Revises: 002_sensor_reading_rollups
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_sensor_readings_defaults'
+down_revision = '002_sensor_reading_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # gen_random_uuid() is built in from PostgreSQL 13
+    op.execute("ALTER TABLE sensor_readings ALTER COLUMN id SET DEFAULT gen_random_uuid()")
+    op.execute("ALTER TABLE sensor_readings ALTER COLUMN created_at SET DEFAULT timezone('utc', now())")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE sensor_readings ALTER COLUMN created_at DROP DEFAULT")
+    op.execute("ALTER TABLE sensor_readings ALTER COLUMN id DROP DEFAULT")
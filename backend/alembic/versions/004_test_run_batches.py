@@ -0,0 +1,39 @@
+"""Test run batches
+
+Revision ID: 004_test_run_batches
+Revises: 003_sensor_readings_defaults
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004_test_run_batches'
+down_revision = '003_sensor_readings_defaults'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'test_run_batches',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('total_runs', sa.Integer(), nullable=False),
+        sa.Column('filter_status', postgresql.ENUM('healthy', 'warning', 'critical', name='unitstatusenum', create_type=False), nullable=True),
+        sa.Column('filter_location', sa.String(255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+    op.add_column('test_runs', sa.Column('batch_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key('fk_test_runs_batch_id', 'test_runs', 'test_run_batches', ['batch_id'], ['id'])
+    op.create_index(op.f('ix_test_runs_batch_id'), 'test_runs', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_test_runs_batch_id'), table_name='test_runs')
+    op.drop_constraint('fk_test_runs_batch_id', 'test_runs', type_='foreignkey')
+    op.drop_column('test_runs', 'batch_id')
+    op.drop_table('test_run_batches')
@@ -0,0 +1,118 @@
+"""Unique (unit_id, sensor_type, timestamp) on sensor_readings
+
+Revision ID: 005_sensor_readings_dedup
+Revises: 004_test_run_batches
+Create Date: 2026-10-18 00:00:00.000000
+
+Runs online: duplicates are deleted one time slice per transaction and the
+unique index is built with CREATE INDEX CONCURRENTLY, so writes continue
+throughout. Readings that the running application stores while the index is
+building can still create new duplicates, which makes the build fail; the
+invalid index is then dropped, the new duplicates are removed and the build
+is retried.
+
+Options (``alembic -x key=value upgrade head``):
+    dedup_slice_hours   hours of readings de-duplicated per transaction (default 24)
+"""
+from datetime import datetime, timedelta
+from alembic import context, op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision = '005_sensor_readings_dedup'
+down_revision = '004_test_run_batches'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ux_sensor_readings_unit_type_timestamp'
+BUILD_ATTEMPTS = 3
+
+# Keeps the first reading stored for each key; uses ix_sensor_readings_timestamp
+_DEDUP_SLICE_SQL = text("""
+    DELETE FROM sensor_readings
+    WHERE ctid IN (
+        SELECT ctid FROM (
+            SELECT ctid, row_number() OVER (
+                PARTITION BY unit_id, sensor_type, timestamp
+                ORDER BY created_at, ctid
+            ) AS position
+            FROM sensor_readings
+            WHERE timestamp >= :lo AND timestamp < :hi
+        ) ranked
+        WHERE position > 1
+    )
+""")
+
+# Duplicates stored since ``since`` (while the index was building)
+_DEDUP_RECENT_SQL = text("""
+    DELETE FROM sensor_readings newer
+    WHERE newer.created_at >= :since
+      AND EXISTS (
+        SELECT 1 FROM sensor_readings older
+        WHERE older.unit_id = newer.unit_id
+          AND older.sensor_type = newer.sensor_type
+          AND older.timestamp = newer.timestamp
+          AND (older.created_at, older.ctid) < (newer.created_at, newer.ctid)
+      )
+""")
+
+
+def _slice_hours() -> int:
+    hours = int(context.get_x_argument(as_dictionary=True).get("dedup_slice_hours", 24))
+    if hours < 1:
+        raise ValueError("dedup_slice_hours must be at least 1")
+    return hours
+
+
+def _dedup_in_slices(conn, slice_hours: int) -> None:
+    oldest, newest = conn.execute(text("SELECT min(timestamp), max(timestamp) FROM sensor_readings")).one()
+    if oldest is None:
+        return
+    step = timedelta(hours=slice_hours)
+    lo = oldest
+    while lo <= newest:
+        # Each statement commits on its own inside the autocommit block
+        conn.execute(_DEDUP_SLICE_SQL, {"lo": lo, "hi": lo + step})
+        lo += step
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        # SQL script: no per-slice loop or retries; run it in a quiet period
+        op.execute(_DEDUP_SLICE_SQL.bindparams(lo=datetime.min, hi=datetime.max))
+        with op.get_context().autocommit_block():
+            op.create_index(
+                INDEX_NAME, 'sensor_readings', ['unit_id', 'sensor_type', 'timestamp'],
+                unique=True, postgresql_concurrently=True,
+            )
+            op.drop_index('ix_sensor_readings_unit_id', table_name='sensor_readings', postgresql_concurrently=True)
+        return
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        build_started = conn.execute(text("SELECT timezone('utc', now())")).scalar()
+        _dedup_in_slices(conn, _slice_hours())
+        for attempt in range(1, BUILD_ATTEMPTS + 1):
+            try:
+                op.create_index(
+                    INDEX_NAME, 'sensor_readings', ['unit_id', 'sensor_type', 'timestamp'],
+                    unique=True, postgresql_concurrently=True,
+                )
+                break
+            except Exception:
+                # A failed concurrent build leaves an INVALID index behind
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+                if attempt == BUILD_ATTEMPTS:
+                    raise
+                conn.execute(_DEDUP_RECENT_SQL, {"since": build_started})
+        # Covered by the leading column of the unique index; one less index per insert
+        op.drop_index('ix_sensor_readings_unit_id', table_name='sensor_readings', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_sensor_readings_unit_id', 'sensor_readings', ['unit_id'],
+            unique=False, postgresql_concurrently=True,
+        )
+        op.drop_index(INDEX_NAME, table_name='sensor_readings', postgresql_concurrently=True)
@@ -0,0 +1,69 @@
+"""BRIN indexes on sensor_readings timestamp and created_at
+
+Revision ID: 006_sensor_readings_brin
+Revises: 005_sensor_readings_dedup
+Create Date: 2026-10-18 00:00:00.000000
+
+Readings are appended in close to time order, so a BRIN index (min/max per
+block range) answers time-range scans for a fraction of a B-tree's size and
+insert cost. Per-unit reads use ux_sensor_readings_unit_type_timestamp;
+ix_sensor_readings_timestamp serves fleet-wide range scans (retention,
+archive). It is kept by default: once retention deletes old rows, new rows
+reuse the freed pages and widen the BRIN summaries of those ranges (see
+benchmarks/bench_brin.py, "steady" state). Drop it with
+``-x drop_timestamp_btree=true`` after measuring on your own data.
+
+Indexes are built and dropped with CONCURRENTLY, so ingest is not blocked
+while they build on a large table.
+
+Options (``alembic -x key=value upgrade head``):
+    brin_pages_per_range   heap pages summarized per index entry (default 32)
+    drop_timestamp_btree   drop ix_sensor_readings_timestamp (default false)
+"""
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = '006_sensor_readings_brin'
+down_revision = '005_sensor_readings_dedup'
+branch_labels = None
+depends_on = None
+
+DEFAULT_PAGES_PER_RANGE = 32
+
+
+def _options():
+    args = context.get_x_argument(as_dictionary=True)
+    pages_per_range = int(args.get("brin_pages_per_range", DEFAULT_PAGES_PER_RANGE))
+    if pages_per_range < 1:
+        raise ValueError("brin_pages_per_range must be at least 1")
+    drop_btree = args.get("drop_timestamp_btree", "false").lower() in ("1", "true", "yes")
+    return pages_per_range, drop_btree
+
+
+def upgrade() -> None:
+    pages_per_range, drop_btree = _options()
+    # CONCURRENTLY cannot run in a transaction; ingest continues during the builds
+    with op.get_context().autocommit_block():
+        # autosummarize: new block ranges are summarized as they fill instead of
+        # at the next vacuum, so recent ranges do not fall back to a full scan
+        for column in ('timestamp', 'created_at'):
+            op.create_index(
+                f'ix_sensor_readings_{column}_brin',
+                'sensor_readings',
+                [column],
+                unique=False,
+                postgresql_using='brin',
+                postgresql_with={'pages_per_range': pages_per_range, 'autosummarize': 'on'},
+                postgresql_concurrently=True,
+            )
+        if drop_btree:
+            op.drop_index('ix_sensor_readings_timestamp', table_name='sensor_readings', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sensor_readings_timestamp ON sensor_readings (timestamp)"
+        )
+        op.drop_index('ix_sensor_readings_created_at_brin', table_name='sensor_readings', postgresql_concurrently=True)
+        op.drop_index('ix_sensor_readings_timestamp_brin', table_name='sensor_readings', postgresql_concurrently=True)
@@ -0,0 +1,59 @@
+"""Pluggable cache shared by the API routers."""
+import threading
+from typing import Optional
+from app.database import get_settings
+from .base import Cache, CacheBackend, MISSING, INVALIDATION_CHANNEL
+from .memory import LocalMemoryBackend
+from .redis_backend import RedisBackend
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def create_cache() -> Cache:
+    """Build the cache configured by ``CACHE_BACKEND`` (memory or redis)."""
+    settings = get_settings()
+    backend_name = settings.cache_backend.lower()
+    if backend_name == "memory":
+        backend: CacheBackend = LocalMemoryBackend(max_entries=settings.cache_max_entries)
+    elif backend_name == "redis":
+        backend = RedisBackend(url=settings.cache_url, prefix=settings.cache_prefix)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {settings.cache_backend}")
+
+    return Cache(
+        backend,
+        prefix=settings.cache_prefix,
+        default_ttl=settings.cache_default_ttl_seconds,
+        lock_timeout=settings.cache_lock_timeout_seconds,
+    )
+
+
+def get_cache() -> Cache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+    return _cache
+
+
+def set_cache(cache: Optional[Cache]) -> None:
+    """Replace the process-wide cache (e.g. with a fake-backed one in tests)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+__all__ = [
+    "Cache",
+    "CacheBackend",
+    "LocalMemoryBackend",
+    "RedisBackend",
+    "MISSING",
+    "INVALIDATION_CHANNEL",
+    "create_cache",
+    "get_cache",
+    "set_cache",
+]
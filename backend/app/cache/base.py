@@ -0,0 +1,318 @@
+"""Cache backend interface and the namespaced cache facade used by routers."""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+from app.logging_config import get_logger
+from app.utils.singleflight import SingleFlight
+
+logger = get_logger("cache")
+
+MISSING = object()
+
+# Channel carrying namespace/key invalidations between processes
+INVALIDATION_CHANNEL = "invalidate"
+
+MessageHandler = Callable[[Dict[str, Any]], None]
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a cache value (transformer output) to bytes."""
+    return json.dumps(value, default=json_default, separators=(",", ":")).encode()
+
+
+def loads(raw: bytes) -> Any:
+    return json.loads(raw)
+
+
+class CacheBackend(ABC):
+    """
+    Raw key/value storage with TTLs and pub/sub.
+
+    Keys are fully qualified strings and values are bytes; namespacing and
+    serialization live in ``Cache``.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._handlers_lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value for key, or None if absent or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store value under key, expiring after ttl seconds if given."""
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Store value only if key is absent; return whether it was stored."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove key if present."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment an integer counter and return the new value."""
+
+    @abstractmethod
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """Deliver a message to subscribers of channel in every process."""
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        """Register a handler for messages published on channel."""
+        with self._handlers_lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def close(self) -> None:
+        """Release connections and background threads."""
+
+    def _dispatch(self, channel: str, message: Dict[str, Any]) -> None:
+        with self._handlers_lock:
+            handlers = list(self._handlers.get(channel, ()))
+        for handler in handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(
+                    "Cache message handler failed",
+                    extra={"channel": channel, "error": str(e)},
+                    exc_info=True,
+                )
+
+
+class Cache:
+    """
+    Namespaced, serializing cache with stampede protection and invalidation.
+
+    Keys are stored as ``{prefix}:{namespace}:v{version}:{key}``. Invalidating
+    a whole namespace bumps its version, which orphans every old key at once
+    (they expire via TTL) instead of scanning the keyspace. Versions are
+    memoized per process and refreshed on invalidation messages, so reads
+    cost one backend round-trip.
+
+    ``get_or_set`` protects loaders against stampedes twice: concurrent
+    callers in this process share one load (single-flight), and across
+    processes a short-lived lock key lets one worker load while the others
+    wait briefly for its result.
+
+    The cache is never required for correctness: when the backend fails,
+    reads behave as misses and call the loader directly, and failed writes
+    and invalidations are logged and skipped (TTLs bound staleness).
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        prefix: str = "dacops",
+        default_ttl: float = 30,
+        lock_timeout: float = 5.0,
+        version_max_age: float = 5.0,
+    ):
+        self.backend = backend
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+        self.version_max_age = version_max_age
+        self.origin = uuid4().hex
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._versions_lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._hits = 0
+        self._misses = 0
+        self._lock_waits = 0
+        self._backend_errors = 0
+        backend.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    def get(self, namespace: str, key: str) -> Any:
+        """Return the cached value, or ``MISSING`` (also when the backend fails)."""
+        try:
+            raw = self.backend.get(self._key(namespace, key))
+        except Exception as e:
+            self._backend_failed("get", e)
+            raw = None
+        if raw is None:
+            self._misses += 1
+            return MISSING
+        self._hits += 1
+        return loads(raw)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            self.backend.set(self._key(namespace, key), dumps(value), ttl or self.default_ttl)
+        except Exception as e:
+            self._backend_failed("set", e)
+
+    def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Return the cached value, computing and storing it with loader on a miss.
+
+        Exceptions from loader propagate and nothing is cached. If the
+        backend is unavailable the loader's result is returned uncached.
+        """
+        try:
+            full_key = self._key(namespace, key)
+            raw = self.backend.get(full_key)
+        except Exception as e:
+            self._backend_failed("get", e)
+            self._misses += 1
+            return self._flights.do(f"{self.prefix}:{namespace}:uncached:{key}", loader)
+        if raw is not None:
+            self._hits += 1
+            return loads(raw)
+        self._misses += 1
+        return self._flights.do(full_key, lambda: self._load(full_key, loader, ttl))
+
+    def invalidate(self, namespace: str, key: Optional[str] = None) -> None:
+        """Drop one key, or every key in a namespace, in all processes."""
+        try:
+            if key is not None:
+                self.backend.delete(self._key(namespace, key))
+            else:
+                version = self.backend.incr(self._version_key(namespace))
+                self._remember_version(namespace, version)
+        except Exception as e:
+            # Callers invalidate after committing; a cache outage must not fail the write
+            self._backend_failed("invalidate", e)
+            with self._versions_lock:
+                self._versions.pop(namespace, None)
+        self.publish(INVALIDATION_CHANNEL, {"namespace": namespace, "key": key})
+
+    def publish(self, channel: str, data: Dict[str, Any]) -> None:
+        """Publish a message to other processes sharing this cache."""
+        try:
+            self.backend.publish(channel, {"origin": self.origin, "data": data})
+        except Exception as e:
+            # Invalidation is best-effort; TTLs bound staleness
+            logger.warning("Cache publish failed", extra={"channel": channel, "error": str(e)})
+
+    def subscribe(self, channel: str, handler: MessageHandler, include_own: bool = False) -> None:
+        """Call handler with the data of each message published by other processes."""
+        def _handle(message: Dict[str, Any]) -> None:
+            if include_own or message.get("origin") != self.origin:
+                handler(message.get("data") or {})
+        self.backend.subscribe(channel, _handle)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+            "lock_waits": self._lock_waits,
+            "backend_errors": self._backend_errors,
+            "single_flight": self._flights.stats(),
+        }
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def _load(self, full_key: str, loader: Callable[[], Any], ttl: Optional[float]) -> Any:
+        lock_key = f"{full_key}:lock"
+        try:
+            holding, raw = self._acquire_load_lock(full_key, lock_key)
+        except Exception as e:
+            self._backend_failed("lock", e)
+            return loader()
+        if raw is not None:
+            return loads(raw)
+
+        try:
+            value = loader()
+            raw = dumps(value)
+            try:
+                self.backend.set(full_key, raw, ttl or self.default_ttl)
+            except Exception as e:
+                self._backend_failed("set", e)
+            # Return what other callers will see from the cache
+            return loads(raw)
+        finally:
+            if holding:
+                try:
+                    self.backend.delete(lock_key)
+                except Exception as e:
+                    self._backend_failed("unlock", e)
+
+    def _acquire_load_lock(self, full_key: str, lock_key: str) -> Tuple[bool, Optional[bytes]]:
+        """
+        Take the cross-process load lock for a key.
+
+        Returns:
+            (holding the lock, value stored meanwhile by the process that held it).
+            ``(False, None)`` means the other loader is slow or died, so the
+            caller loads without the lock.
+        """
+        if self.backend.add(lock_key, b"1", ttl=self.lock_timeout):
+            return True, None
+        # Another process is loading this key; wait briefly for its result
+        self._lock_waits += 1
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            raw = self.backend.get(full_key)
+            if raw is not None:
+                return False, raw
+            if self.backend.add(lock_key, b"1", ttl=self.lock_timeout):
+                return True, None
+        return False, None
+
+    def _backend_failed(self, operation: str, error: Exception) -> None:
+        self._backend_errors += 1
+        logger.warning(
+            "Cache backend error; continuing without the cache",
+            extra={"operation": operation, "backend": type(self.backend).__name__, "error": str(error)},
+        )
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:v{self._version(namespace)}:{key}"
+
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}:version"
+
+    def _version(self, namespace: str) -> int:
+        now = time.monotonic()
+        with self._versions_lock:
+            cached = self._versions.get(namespace)
+            if cached is not None and now - cached[1] < self.version_max_age:
+                return cached[0]
+        raw = self.backend.get(self._version_key(namespace))
+        version = int(raw) if raw is not None else 0
+        self._remember_version(namespace, version)
+        return version
+
+    def _remember_version(self, namespace: str, version: int) -> None:
+        with self._versions_lock:
+            self._versions[namespace] = (version, time.monotonic())
+
+    def _on_invalidation(self, message: Dict[str, Any]) -> None:
+        data = message.get("data") or {}
+        if data.get("key") is None and data.get("namespace"):
+            # Force the next read to fetch the bumped version
+            with self._versions_lock:
+                self._versions.pop(data["namespace"], None)
@@ -0,0 +1,67 @@
+"""Process-local cache backend."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.cache.base import CacheBackend
+
+
+class LocalMemoryBackend(CacheBackend):
+    """
+    In-process dict backend with TTLs and LRU eviction.
+
+    Each worker process has its own copy, and pub/sub only reaches handlers
+    in the same process. Suitable for development, tests and single-worker
+    deployments.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._data.get(key)
+            value = int(entry[0]) + 1 if entry is not None else 1
+            self._store(key, str(value).encode(), None)
+            return value
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        self._dispatch(channel, message)
+
+    def _store(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
@@ -0,0 +1,145 @@
+"""Redis-protocol cache backend shared by all worker processes."""
+import json
+import threading
+from typing import Any, Dict, Optional
+from app.cache.base import CacheBackend, json_default
+from app.logging_config import get_logger
+
+logger = get_logger("cache.redis")
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend for Redis or any server speaking its protocol (KeyDB, Valkey, ...).
+
+    All pub/sub traffic goes over a single ``{prefix}:events`` channel and is
+    dispatched to local handlers by logical channel name, so subscribing never
+    touches the listener connection after startup.
+
+    If the listener connection drops, the listener thread is stopped and a
+    new subscription is attempted every ``resubscribe_seconds`` (doubling up
+    to a minute) until the server is back. Messages published meanwhile are
+    lost; cache entries they would have invalidated expire via their TTL.
+
+    Pass ``client`` to use an existing client, e.g. ``fakeredis.FakeRedis()``
+    in tests; otherwise one is created from ``url``.
+    """
+
+    MAX_RESUBSCRIBE_SECONDS = 60.0
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client: Any = None,
+        prefix: str = "dacops",
+        resubscribe_seconds: float = 1.0,
+    ):
+        super().__init__()
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "CACHE_BACKEND=redis requires the 'redis' package. "
+                    "Install it with: pip install redis"
+                ) from e
+            if not url:
+                raise ValueError("CACHE_URL must be set when CACHE_BACKEND=redis")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.events_channel = f"{prefix}:events"
+        self._pubsub = None
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        self._resubscribe_seconds = resubscribe_seconds
+        self._closed = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(key, value, nx=True, px=int(ttl * 1000) if ttl else None))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        payload = json.dumps({"channel": channel, "message": message}, default=json_default)
+        self.client.publish(self.events_channel, payload)
+
+    def subscribe(self, channel: str, handler) -> None:
+        super().subscribe(channel, handler)
+        self._ensure_listener()
+
+    def close(self) -> None:
+        with self._listener_lock:
+            self._closed = True
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+            if self._pubsub is not None:
+                self._pubsub.close()
+                self._pubsub = None
+        self.client.close()
+
+    def _ensure_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener is not None or self._closed:
+                return
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(**{self.events_channel: self._on_event})
+            except Exception:
+                pubsub.close()
+                raise
+            self._pubsub = pubsub
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+            )
+
+    def _on_listener_error(self, error: BaseException, pubsub, thread) -> None:
+        """Called on the listener thread when reading from the subscription fails."""
+        logger.error(
+            "Cache event listener disconnected; resubscribing",
+            extra={"channel": self.events_channel, "error": str(error)},
+        )
+        # Ends the thread's loop; it closes its pubsub on the way out
+        thread.stop()
+        with self._listener_lock:
+            if self._listener is not thread:
+                return
+            self._listener = None
+            self._pubsub = None
+        self._schedule_resubscribe(self._resubscribe_seconds)
+
+    def _schedule_resubscribe(self, delay: float) -> None:
+        timer = threading.Timer(delay, self._resubscribe, args=(delay,))
+        timer.daemon = True
+        timer.start()
+
+    def _resubscribe(self, delay: float) -> None:
+        try:
+            self._ensure_listener()
+        except Exception as e:
+            delay = min(delay * 2, self.MAX_RESUBSCRIBE_SECONDS)
+            logger.warning(
+                "Cache event resubscribe failed",
+                extra={"channel": self.events_channel, "error": str(e), "retry_seconds": delay},
+            )
+            self._schedule_resubscribe(delay)
+            return
+        logger.info("Cache event listener resubscribed", extra={"channel": self.events_channel})
+
+    def _on_event(self, event: Dict[str, Any]) -> None:
+        try:
+            payload = json.loads(event["data"])
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed cache event")
+            return
+        self._dispatch(payload.get("channel"), payload.get("message") or {})
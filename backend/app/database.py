@@ -1,15 +1,20 @@
-"""Database connection and session management."""
+"""Database connection and session management.
+
+``settings``, ``engine`` and ``SessionLocal`` are created on first access
+rather than at import, so importing the models (alembic, CLI tools, test
+collection) does not read ``.env``, validate settings or build a pool.
+"""
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pydantic_settings import BaseSettings
-from pydantic import ConfigDict, field_validator
-from typing import Optional
+from pydantic import ConfigDict, field_validator, model_validator
+from typing import Any, Optional, Tuple
 import os
+import threading
 from dotenv import load_dotenv
 
-load_dotenv()
-
 
 class Settings(BaseSettings):
     """Application settings."""
@@ -22,6 +27,123 @@ class Settings(BaseSettings):
     database_password: str
     cors_origins: str
 
+    # Sensor reading retention (days; None keeps a tier forever)
+    retention_raw_days: Optional[int] = 7
+    retention_minute_days: Optional[int] = 90
+    retention_hourly_days: Optional[int] = None
+    retention_slice_minutes: int = 60
+    retention_batch_size: int = 5000
+    retention_batch_pause_ms: int = 50
+    retention_interval_minutes: int = 0  # 0 disables the in-process scheduler
+
+    # Cold archive: the retention job moves closed days of raw readings older
+    # than this out of sensor_readings into memory-mapped files under archive_dir;
+    # must be below retention_raw_days, or the raw tier is rolled up first
+    archive_enabled: bool = False
+    archive_dir: str = "archive"
+    archive_after_days: int = 6
+    archive_open_days: int = 64  # Archived days kept mapped per process
+
+    # Connection pool per process. With DATABASE_MAX_CONNECTIONS set, the
+    # budget is split across WEB_WORKERS processes instead (see app.launcher)
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_max_connections: Optional[int] = None
+
+    # Production server (python -m app.launcher); workers default to the
+    # CPUs available to the container
+    web_workers: Optional[int] = None
+    web_bind: str = "0.0.0.0:8000"
+    web_max_requests: int = 10_000
+    web_max_requests_jitter: int = 1_000
+    web_keepalive_seconds: int = 75
+    web_graceful_timeout_seconds: int = 30
+
+    # psycopg 3 only (postgresql+psycopg:// URLs): prepare a statement server-side
+    # once it has run this many times on a connection (None disables)
+    database_prepare_threshold: Optional[int] = 5
+
+    # Read replicas for read-only endpoints (comma-separated URLs; empty = primary only)
+    database_replica_urls: str = ""
+    replica_max_lag_seconds: float = 5.0
+    replica_check_interval_seconds: float = 5.0
+
+    # Startup warmup before /readyz reports ready: pool connections opened
+    # up front (None = the pool size) and units whose recent windows are cached
+    warmup_enabled: bool = True
+    warmup_pool_connections: Optional[int] = None
+    warmup_cache_units: int = 20
+    warmup_timeout_seconds: float = 60.0
+
+    # Readiness probe: the primary is checked in the background every interval;
+    # /readyz fails once the last success is this many intervals old or this
+    # share of pool connections (including overflow) is checked out
+    health_check_interval_seconds: float = 5.0
+    health_stale_after_checks: int = 3
+    health_pool_saturation: float = 1.0
+
+    # In-memory cache of recent sensor reading windows
+    timeseries_cache_enabled: bool = True
+    timeseries_cache_window_hours: int = 24
+    timeseries_cache_series_capacity: int = 20_000
+    timeseries_cache_max_mb: int = 64
+    timeseries_cache_ttl_seconds: int = 300
+
+    # Response cache shared by the routers ("memory" or "redis")
+    cache_backend: str = "memory"
+    cache_url: Optional[str] = None
+    cache_prefix: str = "dacops"
+    cache_default_ttl_seconds: int = 30
+    cache_max_entries: int = 10_000
+    cache_lock_timeout_seconds: float = 5.0
+
+    # Identical concurrent GETs on these paths share one execution
+    coalescing_enabled: bool = True
+    coalescing_paths: str = "/api/units,/api/sensors/readings"
+
+    # Response compression: encodings in preference order (br and zstd need
+    # the brotli and zstandard packages) and the smallest body compressed
+    compression_enabled: bool = True
+    compression_encodings: str = "zstd,br,gzip"
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+
+    # Statements slower than this are logged with their EXPLAIN plan (0 disables)
+    slow_query_ms: int = 500
+    slow_query_explain: bool = True
+
+    # Single-reading POSTs: "off" commits each reading on its own; "durable"
+    # group-commits and answers after the flush; "ack" answers once buffered
+    ingest_group_commit: str = "off"
+    ingest_flush_interval_ms: int = 10
+    ingest_flush_max_rows: int = 500
+    ingest_max_pending_rows: int = 50_000
+
+    # Batch test runs: executions in flight at once and maximum batch size;
+    # runs still pending or running after the stale limit are failed
+    test_batch_concurrency: int = 200
+    test_batch_max_units: int = 1000
+    test_run_stale_minutes: int = 15
+
+    # Test executor: "live" fetches from the sensor source ("simulator" or
+    # "http"); "stored" evaluates the unit's most recent stored readings
+    test_executor_mode: str = "live"
+    test_stored_window_minutes: int = 60
+    test_stored_tick_ms: int = 50
+    sensor_source: str = "simulator"
+    sensor_api_url: Optional[str] = None
+    sensor_api_max_connections: int = 100
+    sensor_fetch_timeout_seconds: float = 10.0
+    test_executor_db_concurrency: int = 5
+
+    # Logging: records are serialized on a background thread when async;
+    # only this fraction of successful request logs is written
+    log_level: str = "INFO"
+    log_async: bool = True
+    log_request_sample_rate: float = 1.0
+
     @field_validator('database_url')
     @classmethod
     def validate_database_url(cls, v: str) -> str:
@@ -49,23 +171,150 @@ class Settings(BaseSettings):
             )
         return v
 
+    @field_validator(
+        'retention_slice_minutes', 'retention_batch_size',
+        'test_batch_concurrency', 'test_batch_max_units', 'test_executor_db_concurrency', 'test_run_stale_minutes',
+        'ingest_flush_interval_ms', 'ingest_flush_max_rows', 'ingest_max_pending_rows',
+        'health_stale_after_checks', 'compression_min_bytes',
+        'archive_after_days', 'archive_open_days',
+    )
+    @classmethod
+    def validate_positive(cls, v: int) -> int:
+        """Validate batching parameters are positive."""
+        if v <= 0:
+            raise ValueError("Batch sizes and concurrency limits must be positive")
+        return v
+
+    @field_validator('health_pool_saturation')
+    @classmethod
+    def validate_pool_saturation(cls, v: float) -> float:
+        """Validate the saturation threshold is a share of the pool."""
+        if not 0 < v <= 1:
+            raise ValueError("HEALTH_POOL_SATURATION must be greater than 0 and at most 1")
+        return v
+
+    @field_validator('test_executor_mode')
+    @classmethod
+    def validate_executor_mode(cls, v: str) -> str:
+        """Validate the test executor mode."""
+        if v not in ("live", "stored"):
+            raise ValueError("TEST_EXECUTOR_MODE must be 'live' or 'stored'")
+        return v
+
+    @field_validator('ingest_group_commit')
+    @classmethod
+    def validate_group_commit_mode(cls, v: str) -> str:
+        """Validate the ingest group commit mode."""
+        if v not in ("off", "durable", "ack"):
+            raise ValueError("INGEST_GROUP_COMMIT must be 'off', 'durable' or 'ack'")
+        return v
+
+    @model_validator(mode='after')
+    def validate_archive_before_raw_rollup(self) -> "Settings":
+        """Validate whole days are archived before raw retention rolls them up."""
+        if (
+            self.archive_enabled
+            and self.retention_raw_days is not None
+            and self.archive_after_days >= self.retention_raw_days
+        ):
+            raise ValueError(
+                f"ARCHIVE_AFTER_DAYS ({self.archive_after_days}) must be less than "
+                f"RETENTION_RAW_DAYS ({self.retention_raw_days}); otherwise raw readings "
+                "are rolled up and deleted before they are old enough to archive"
+            )
+        return self
+
     model_config = ConfigDict(
         env_file=".env",
         extra="ignore"  # Ignore extra fields from .env file
     )
 
 
-settings = Settings()
+_init_lock = threading.RLock()
+_settings: Optional[Settings] = None
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def get_settings() -> Settings:
+    """Load and validate settings on first use."""
+    global _settings
+    if _settings is None:
+        with _init_lock:
+            if _settings is None:
+                load_dotenv()
+                _settings = Settings()
+    return _settings
+
+
+def pool_sizes() -> Tuple[int, int]:
+    """(pool_size, max_overflow) for this process.
+
+    With a connection budget and a known worker count, each worker gets an
+    equal share as a fixed pool, so the fleet never exceeds the budget.
+    """
+    settings = get_settings()
+    if settings.database_max_connections and settings.web_workers:
+        return max(1, settings.database_max_connections // settings.web_workers), 0
+    return settings.database_pool_size, settings.database_max_overflow
 
-# Create database engine
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    echo=False
-)
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def engine_options(url: str) -> dict:
+    """Engine keyword arguments shared by the primary and replica engines."""
+    pool_size, max_overflow = pool_sizes()
+    options = {
+        "pool_pre_ping": True,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "echo": False,
+    }
+    # psycopg2 has no server-side prepared statements; psycopg 3 does
+    if make_url(url).drivername == "postgresql+psycopg":
+        options["connect_args"] = {"prepare_threshold": get_settings().database_prepare_threshold}
+    return options
+
+
+def get_engine() -> Engine:
+    """Create the primary database engine on first use."""
+    global _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                url = get_settings().database_url
+                _engine = create_engine(url, **engine_options(url))
+    return _engine
+
+
+def get_session_factory() -> sessionmaker:
+    global _session_factory
+    if _session_factory is None:
+        with _init_lock:
+            if _session_factory is None:
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory
+
+
+_LAZY_ATTRIBUTES = {
+    "settings": get_settings,
+    "engine": get_engine,
+    "SessionLocal": get_session_factory,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # ``from app.database import settings`` etc. keep working, created on first access
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _dispose_pool_in_child() -> None:
+    """Drop pooled connections inherited over fork() without closing them for the parent."""
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_pool_in_child)
 
 # Base class for models
 Base = declarative_base()
@@ -73,9 +322,8 @@ Base = declarative_base()
 
 def get_db():
     """Dependency for getting database session."""
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
-
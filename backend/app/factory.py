@@ -0,0 +1,159 @@
+"""Application factory.
+
+``create_app`` builds the FastAPI app: logging, query profiling, middleware
+and routers. Routers, and the services they pull in, are imported when the
+app is built rather than when this module is imported. Background jobs,
+cache subscriptions and connections are owned by the ``lifespan`` context,
+so they start in each worker process and are released on shutdown.
+"""
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import List, Optional
+from fastapi import FastAPI
+from app.database import Settings, get_engine, get_settings
+from app.logging_config import setup_logging, get_logger
+
+logger = get_logger("main")
+
+# Mounted under /api, in this order
+API_ROUTERS = ("units", "sensors", "tests", "system")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start per-process background work; stop it and release connections on shutdown."""
+    from app.cache import get_cache
+    from app.services import db_health, retention
+    from app.services.ingest_buffer import ingest_buffer
+    from app.services.sensor_sources import close_sensor_source
+    from app.services.test_batches import test_run_dispatcher
+    from app.services.test_executor import fail_stale_runs_periodically
+    from app.services.timeseries_cache import subscribe_to_remote_readings
+    from app.services.warmup import run_warmup, warmup_state
+    from app.utils import replicas
+
+    settings = app.state.settings
+    logger.info("Application starting up")
+
+    # Keep this worker's sensor window cache in step with other workers
+    subscribe_to_remote_readings(get_cache())
+
+    # Long-running background jobs started with the application; the first
+    # keeps the database health read by the readiness probe up to date
+    background_jobs: List[asyncio.Task] = [asyncio.create_task(db_health.run_health_checks())]
+
+    # Fail runs left pending or running by processes that stopped without marking them
+    background_jobs.append(asyncio.create_task(
+        fail_stale_runs_periodically(timedelta(minutes=settings.test_run_stale_minutes))
+    ))
+
+    if replicas.replica_router.enabled:
+        background_jobs.append(asyncio.create_task(
+            replicas.run_health_checks(settings.replica_check_interval_seconds)
+        ))
+        logger.info(
+            "Read replica routing enabled",
+            extra={"replicas": len(replicas.replica_router.replicas)},
+        )
+
+    if settings.retention_interval_minutes > 0:
+        background_jobs.append(asyncio.create_task(
+            retention.run_periodically(settings.retention_interval_minutes * 60)
+        ))
+        logger.info(
+            "Retention job scheduled",
+            extra={"interval_minutes": settings.retention_interval_minutes},
+        )
+
+    # Open connections and fill caches before /health reports ready
+    if settings.warmup_enabled:
+        background_jobs.append(asyncio.create_task(run_warmup(app)))
+    else:
+        warmup_state.status = "disabled"
+
+    try:
+        yield
+    finally:
+        logger.info("Application shutting down")
+
+        for job in background_jobs:
+            job.cancel()
+        # Marks runs in flight or queued as interrupted
+        await test_run_dispatcher.shutdown()
+        # Commit readings still waiting in the group-commit buffer
+        await asyncio.to_thread(ingest_buffer.close)
+        await close_sensor_source()
+        get_cache().close()
+        replicas.replica_router.dispose()
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the API application."""
+    from fastapi.middleware.cors import CORSMiddleware
+    from app.middleware.coalescing import RequestCoalescingMiddleware
+    from app.middleware.compression import CompressionMiddleware, create_encodings
+    from app.middleware.request_logging import RequestLoggingMiddleware
+    from app.routers import health
+    from app.utils.query_profiler import query_profiler
+    from app.utils.replicas import replica_router
+
+    settings = settings or get_settings()
+    setup_logging(settings.log_level, settings.log_async)
+
+    # Per-request query counts/DB time and the slow-query log
+    query_profiler.install(get_engine(), settings.slow_query_ms, settings.slow_query_explain)
+    for replica in replica_router.replicas:
+        query_profiler.install(replica.engine, settings.slow_query_ms, settings.slow_query_explain)
+
+    app = FastAPI(
+        title="DAC Operations Dashboard API",
+        description="API for Direct Air Capture Operations Dashboard",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+
+    # Share one execution between identical concurrent reads. Added before CORS
+    # so it sits inside it and followers still get their own CORS headers.
+    if settings.coalescing_enabled:
+        app.add_middleware(
+            RequestCoalescingMiddleware,
+            paths=[path.strip() for path in settings.coalescing_paths.split(",") if path.strip()],
+        )
+
+    # Configure CORS
+    origins = settings.cors_origins.split(",")
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Outside coalescing, so followers are compressed for their own Accept-Encoding
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            encodings=create_encodings(
+                [name.strip() for name in settings.compression_encodings.split(",") if name.strip()],
+                {
+                    "gzip": settings.compression_gzip_level,
+                    "br": settings.compression_brotli_quality,
+                    "zstd": settings.compression_zstd_level,
+                },
+            ),
+            minimum_size=settings.compression_min_bytes,
+        )
+
+    # Request timing and logging; added last so it wraps everything else
+    app.add_middleware(RequestLoggingMiddleware, sample_rate=settings.log_request_sample_rate)
+
+    # Include routers
+    for name in API_ROUTERS:
+        app.include_router(importlib.import_module(f"app.routers.{name}").router, prefix="/api")
+    app.include_router(health.router)
+
+    return app
@@ -0,0 +1,145 @@
+"""Production server: gunicorn managing uvicorn worker processes.
+
+    python -m app.launcher
+
+The app is imported once in the master before workers are forked
+(``preload_app``), so code and read-only data are shared copy-on-write.
+Workers run uvloop and httptools, and each is replaced gracefully after
+``WEB_MAX_REQUESTS`` requests (plus random jitter, so workers do not all
+recycle at once) to bound slow memory growth.
+
+Module-level resources are fork-safe: database engines drop inherited pool
+connections in the child and the logging listener thread is restarted
+there. Caches, the group-commit buffer and background tasks are created
+lazily or at worker startup, so each worker gets its own.
+
+The ``memory`` cache backend cannot reach other processes, so workers would
+serve stale sensor windows and cached responses until their TTLs expire.
+With ``CACHE_BACKEND=memory`` the launcher therefore runs a single worker.
+"""
+import math
+import os
+from typing import Any, Dict, Optional
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+
+class TunedUvicornWorker(UvicornWorker):
+    """Uvicorn worker pinned to the fast event loop and HTTP parser."""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of the container (cgroup v2 or v1), or None when unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: the cgroup quota, CPU affinity or the host count."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def default_workers() -> int:
+    """One worker per CPU; at least two so a recycling worker never leaves none serving."""
+    return max(2, available_cpus())
+
+
+def gunicorn_options() -> Dict[str, Any]:
+    from app.database import settings
+
+    return {
+        "bind": settings.web_bind,
+        "workers": settings.web_workers,
+        "worker_class": "app.launcher.TunedUvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.web_max_requests,
+        "max_requests_jitter": settings.web_max_requests_jitter,
+        "keepalive": settings.web_keepalive_seconds,
+        "graceful_timeout": settings.web_graceful_timeout_seconds,
+        "timeout": 60,
+        "proc_name": "dac-ops-backend",
+    }
+
+
+class Application(BaseApplication):
+    """Gunicorn application configured from settings instead of a config file."""
+
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        from app.database import pool_sizes
+        from app.logging_config import get_logger
+
+        pool_size, max_overflow = pool_sizes()
+        get_logger("launcher").info(
+            "Starting workers",
+            extra={
+                "workers": self.options["workers"],
+                "bind": self.options["bind"],
+                "cpus": available_cpus(),
+                "max_requests": self.options["max_requests"],
+                "pool_size": pool_size,
+                "max_overflow": max_overflow,
+            },
+        )
+        return app
+
+
+def worker_count(requested: Optional[int], cache_backend: str) -> int:
+    """Workers to start: WEB_WORKERS or one per CPU, but one with a per-process cache."""
+    workers = requested or default_workers()
+    if workers > 1 and cache_backend.lower() == "memory":
+        from app.logging_config import get_logger
+
+        get_logger("launcher").warning(
+            "CACHE_BACKEND=memory is per-process; starting one worker. Set CACHE_BACKEND=redis to run more",
+            extra={"requested_workers": workers},
+        )
+        return 1
+    return workers
+
+
+def main() -> None:
+    from app.database import get_settings
+
+    settings = get_settings()
+    # Pool sizing (app.database.pool_sizes) reads the worker count from settings
+    settings.web_workers = worker_count(settings.web_workers, settings.cache_backend)
+    Application(gunicorn_options()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,44 @@
 """Logging configuration for structured logging."""
+import atexit
+import copy
 import logging
+import os
+import queue
 import sys
-from typing import Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional, TextIO
 import json
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# LogRecord attributes that are not ``extra`` fields
+_STANDARD_ATTRS = frozenset({
+    'name', 'msg', 'args', 'created', 'filename', 'funcName',
+    'levelname', 'levelno', 'lineno', 'module', 'msecs',
+    'message', 'pathname', 'process', 'processName', 'relativeCreated',
+    'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info',
+    'taskName',
+})
+
+_listener: Optional[QueueListener] = None
+
+
+def _dumps(data: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode()
+    return json.dumps(data, default=str)
+
 
 class StructuredFormatter(logging.Formatter):
     """JSON formatter for structured logging."""
-    
+
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -19,56 +46,109 @@ class StructuredFormatter(logging.Formatter):
             "function": record.funcName,
             "line": record.lineno,
         }
-        
-        # Add exception info if present
+
+        # Add exception info if present (already rendered if queued)
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
-        
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
+
         # Add extra fields (from extra parameter or extra_fields attribute)
         if hasattr(record, "extra_fields"):
             log_data.update(record.extra_fields)
         else:
             # Python's logging merges extra dict into record attributes
-            # Filter out standard LogRecord attributes
-            standard_attrs = {
-                'name', 'msg', 'args', 'created', 'filename', 'funcName',
-                'levelname', 'levelno', 'lineno', 'module', 'msecs',
-                'message', 'pathname', 'process', 'processName', 'relativeCreated',
-                'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info'
-            }
             for key, value in record.__dict__.items():
-                if key not in standard_attrs and not key.startswith('_'):
+                if key not in _STANDARD_ATTRS and not key.startswith('_'):
                     log_data[key] = value
-        
-        return json.dumps(log_data)
 
+        return _dumps(log_data)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    Queue handler that keeps ``extra`` fields for the structured formatter.
+
+    The stock ``QueueHandler.prepare`` formats the record with a plain
+    formatter before queueing; this only resolves the message arguments and
+    traceback (which may not be safe to render later) and leaves JSON
+    serialization to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(log_level: str = "INFO", async_output: bool = True, stream: Optional[TextIO] = None) -> None:
+    """Configure application logging.
 
-def setup_logging(log_level: str = "INFO") -> None:
-    """Configure application logging."""
+    With ``async_output`` the calling thread only enqueues records; a
+    listener thread serializes them and writes to the stream, so slow stdout
+    never blocks the event loop.
+    """
+    global _listener
     logger = logging.getLogger("app")
     logger.setLevel(getattr(logging, log_level.upper()))
-    
+
     # Remove existing handlers
     logger.handlers.clear()
-    
+    shutdown_logging()
+
     # Console handler with structured formatter
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(stream or sys.stdout)
     console_handler.setFormatter(StructuredFormatter())
-    logger.addHandler(console_handler)
-    
+    if async_output:
+        log_queue: Any = queue.SimpleQueue()
+        logger.addHandler(StructuredQueueHandler(log_queue))
+        _listener = QueueListener(log_queue, console_handler)
+        _listener.start()
+    else:
+        logger.addHandler(console_handler)
+
     # Set levels for third-party libraries
     logging.getLogger("uvicorn").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     logging.getLogger("alembic").setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """Stop the queue listener, flushing queued records."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_in_child() -> None:
+    """The listener thread does not survive fork(); start one in the child."""
+    global _listener
+    if _listener is not None:
+        _listener = QueueListener(_listener.queue, *_listener.handlers)
+        _listener.start()
+
+
+atexit.register(shutdown_logging)
+# Pre-forking servers (app.launcher) import the app, and so set up logging,
+# before starting workers
+os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance with structured logging.
-    
+
     Usage:
         logger = get_logger("module.name")
         logger.info("message", extra={"key": "value"})
         logger.error("message", extra={"key": "value"}, exc_info=True)
+
+    In hot paths, skip building ``extra`` when the level is disabled:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("message", extra={...})
     """
     return logging.getLogger(f"app.{name}")
-
@@ -0,0 +1,127 @@
+"""Request coalescing (single-flight) for identical concurrent GET requests."""
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from app.logging_config import get_logger
+
+logger = get_logger("middleware.coalescing")
+
+_CoalesceKey = Tuple[str, str]
+
+
+def _copy_message(message: dict) -> dict:
+    """Copy an ASGI message; outer middleware may mutate header lists in place."""
+    copied = dict(message)
+    if "headers" in copied:
+        copied["headers"] = list(copied["headers"])
+    return copied
+
+
+class CoalescingMetrics:
+    """Counters for the coalescing middleware, exposed via /api/system/stats."""
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+        self.in_flight = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        total = self.leaders + self.coalesced
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "fallbacks": self.fallbacks,
+            "in_flight": self.in_flight,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else None,
+        }
+
+
+coalescing_metrics = CoalescingMetrics()
+
+
+class RequestCoalescingMiddleware:
+    """
+    Share one downstream execution between identical concurrent GET requests.
+
+    Requests are keyed by path plus the sorted query parameters. The first
+    request for a key (the leader) runs normally while its response messages
+    are recorded; requests with the same key that arrive before it finishes
+    wait and replay the recorded status, headers and body instead of running
+    their own database query.
+
+    Followers fall back to running the request themselves if the leader
+    fails, disconnects or produces a body larger than ``max_body_bytes``.
+
+    Must be installed inside middleware whose output depends on request
+    headers (CORS, compression) so followers still get their own headers.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths: Iterable[str],
+        max_body_bytes: int = 8 * 1024 * 1024,
+        metrics: Optional[CoalescingMetrics] = None,
+    ):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_body_bytes = max_body_bytes
+        self.metrics = metrics or coalescing_metrics
+        self._in_flight: Dict[_CoalesceKey, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = self._key(scope)
+        leader_future = self._in_flight.get(key)
+        if leader_future is not None:
+            self.metrics.coalesced += 1
+            messages = await asyncio.shield(leader_future)
+            if messages is not None:
+                for message in messages:
+                    await send(_copy_message(message))
+                return
+            self.metrics.fallbacks += 1
+            await self.app(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.metrics.leaders += 1
+        self.metrics.in_flight += 1
+
+        recorded: List[dict] = []
+        state = {"size": 0, "shareable": True, "complete": False}
+
+        async def record_and_send(message):
+            if state["shareable"]:
+                if message["type"] == "http.response.body":
+                    state["size"] += len(message.get("body", b""))
+                    if state["size"] > self.max_body_bytes:
+                        state["shareable"] = False
+                        recorded.clear()
+                    elif not message.get("more_body", False):
+                        state["complete"] = True
+                if state["shareable"]:
+                    recorded.append(_copy_message(message))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record_and_send)
+        finally:
+            del self._in_flight[key]
+            self.metrics.in_flight -= 1
+            shared = recorded if state["shareable"] and state["complete"] else None
+            future.set_result(shared)
+
+    @staticmethod
+    def _key(scope) -> _CoalesceKey:
+        params = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        return scope["path"], urlencode(sorted(params))
@@ -0,0 +1,344 @@
+"""Content-negotiated response compression (zstd, brotli, gzip).
+
+Reading and test-run payloads repeat the same ``unit_id``, ``sensor_type``
+and ``unit`` on every row, so they compress to a small fraction of their
+size, which matters on slow links to remote sites.
+
+The encoding is chosen from the request's ``Accept-Encoding`` (highest
+q-value; ties go to the server's preference order). Complete bodies below
+``minimum_size`` or that do not shrink are sent as they are. Streamed
+bodies are compressed chunk by chunk, with a flush after each chunk so
+clients receive data as it is produced. Event streams, already encoded
+responses and non-text content types are never compressed.
+
+brotli and zstd need the ``brotli`` and ``zstandard`` packages; encodings
+whose package is missing are left out with a warning.
+"""
+import asyncio
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.logging_config import get_logger
+
+logger = get_logger("middleware.compression")
+
+# Content types worth compressing; text/event-stream is excluded separately
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-ndjson",
+    "application/vnd.apache.arrow",
+)
+
+# Complete bodies above this size are compressed off the event loop
+OFFLOAD_BYTES = 256 * 1024
+
+
+class StreamCompressor:
+    """Incremental compressor for one streamed response."""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        """Emit everything compressed so far without ending the stream."""
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+
+class Encoding:
+    """A content coding: one-shot compression plus a streaming compressor."""
+
+    name = ""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def stream(self) -> StreamCompressor:
+        raise NotImplementedError
+
+
+class _ZlibStream(StreamCompressor):
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class GzipEncoding(Encoding):
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        stream = _ZlibStream(self.level)
+        return stream.compress(data) + stream.finish()
+
+    def stream(self) -> StreamCompressor:
+        return _ZlibStream(self.level)
+
+
+class _BrotliStream(StreamCompressor):
+    def __init__(self, brotli, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class BrotliEncoding(Encoding):
+    name = "br"
+
+    def __init__(self, quality: int = 4):
+        try:
+            import brotli
+        except ImportError as e:
+            raise RuntimeError(
+                "brotli compression requires the 'brotli' package. "
+                "Install it with: pip install brotli"
+            ) from e
+        self._brotli = brotli
+        self.quality = quality
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.compress(data, quality=self.quality)
+
+    def stream(self) -> StreamCompressor:
+        return _BrotliStream(self._brotli, self.quality)
+
+
+class _ZstdStream(StreamCompressor):
+    def __init__(self, zstandard, level: int):
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class ZstdEncoding(Encoding):
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError(
+                "zstd compression requires the 'zstandard' package. "
+                "Install it with: pip install zstandard"
+            ) from e
+        self._zstandard = zstandard
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        # Compressor objects are not thread-safe and compress() may run in a worker thread
+        return self._zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self) -> StreamCompressor:
+        return _ZstdStream(self._zstandard, self.level)
+
+
+def create_encodings(names: Iterable[str], levels: Dict[str, int]) -> List[Encoding]:
+    """Encodings in preference order, skipping those whose package is not installed."""
+    factories = {"zstd": ZstdEncoding, "br": BrotliEncoding, "gzip": GzipEncoding}
+    encodings = []
+    for name in names:
+        if name not in factories:
+            raise ValueError(f"Unknown compression encoding: {name}")
+        try:
+            encodings.append(factories[name](levels[name]))
+        except RuntimeError as e:
+            logger.warning("Compression encoding unavailable", extra={"encoding": name, "error": str(e)})
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def _is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream")
+
+
+class CompressionMetrics:
+    """Counters for the compression middleware, exposed via /api/system/stats."""
+
+    def __init__(self):
+        self.compressed: Dict[str, int] = {}
+        self.streamed = 0
+        self.skipped_small = 0
+        self.skipped_incompressible = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "compressed": dict(self.compressed),
+            "streamed": self.streamed,
+            "skipped_small": self.skipped_small,
+            "skipped_incompressible": self.skipped_incompressible,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            "compress_ms": round(self.compress_seconds * 1000, 1),
+        }
+
+
+compression_metrics = CompressionMetrics()
+
+
+def _compressed_start(message: dict, encoding: str, length: Optional[int]) -> dict:
+    start = dict(message)
+    headers = MutableHeaders(raw=list(message.get("headers", [])))
+    del headers["content-length"]
+    if length is not None:
+        headers["content-length"] = str(length)
+    headers["content-encoding"] = encoding
+    headers.add_vary_header("Accept-Encoding")
+    start["headers"] = headers.raw
+    return start
+
+
+class CompressionMiddleware:
+    """Compress response bodies with the best encoding the client accepts."""
+
+    def __init__(
+        self,
+        app,
+        encodings: List[Encoding],
+        minimum_size: int = 1024,
+        metrics: Optional[CompressionMetrics] = None,
+    ):
+        self.app = app
+        self.encodings = encodings
+        self.minimum_size = minimum_size
+        self.metrics = metrics or compression_metrics
+
+    def negotiate(self, accept_encoding: str) -> Optional[Encoding]:
+        accepted = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding.name, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        start_message: Optional[dict] = None
+        passthrough = False
+        stream: Optional[StreamCompressor] = None
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough, stream
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if "content-encoding" in headers or not _is_compressible(headers.get("content-type", "")):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held until the first body chunk shows whether to compress
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                start, start_message = start_message, None
+                if not more_body:
+                    await send_complete(start, body)
+                    return
+                stream = encoding.stream()
+                metrics.streamed += 1
+                metrics.compressed[encoding.name] = metrics.compressed.get(encoding.name, 0) + 1
+                await send(_compressed_start(start, encoding.name, None))
+
+            started = time.perf_counter()
+            chunk = stream.compress(body) + (stream.flush() if more_body else stream.finish())
+            metrics.compress_seconds += time.perf_counter() - started
+            metrics.bytes_in += len(body)
+            metrics.bytes_out += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        async def send_complete(start: dict, body: bytes):
+            if len(body) < self.minimum_size:
+                metrics.skipped_small += 1
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            started = time.perf_counter()
+            if len(body) > OFFLOAD_BYTES:
+                compressed = await asyncio.to_thread(encoding.compress, body)
+            else:
+                compressed = encoding.compress(body)
+            metrics.compress_seconds += time.perf_counter() - started
+
+            if len(compressed) >= len(body):
+                metrics.skipped_incompressible += 1
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            metrics.compressed[encoding.name] = metrics.compressed.get(encoding.name, 0) + 1
+            metrics.bytes_in += len(body)
+            metrics.bytes_out += len(compressed)
+            await send(_compressed_start(start, encoding.name, len(compressed)))
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,129 @@
+"""Request timing and structured request logs as pure ASGI middleware."""
+import logging
+import random
+import time
+from typing import Optional
+from app.logging_config import get_logger
+from app.utils.query_profiler import begin_request, end_request
+
+# Same logger name as the request logs have always used
+logger = get_logger("main")
+
+
+class RequestLoggingMiddleware:
+    """
+    Time and log every HTTP request without wrapping the response.
+
+    Unlike ``@app.middleware("http")`` (``BaseHTTPMiddleware``), this passes
+    messages straight through: no extra task per request and no re-streamed
+    body, so streaming responses reach the client as they are produced.
+
+    Timing headers are added to ``http.response.start``: ``X-Process-Time``
+    and a ``Server-Timing`` entry with the request's database time so far.
+    The ``request_completed`` log line is written as soon as the last body
+    chunk is sent and reports both time to first byte and total time.
+    Background tasks (which Starlette runs after the response, inside the
+    same call) are therefore not counted as request latency, and their
+    queries are not added to the request's query stats. Successful requests
+    are logged for a ``sample_rate`` fraction of requests; errors always.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        query_stats = begin_request()
+        method = scope["method"]
+        path = scope["path"]
+
+        if logger.isEnabledFor(logging.DEBUG):
+            client = scope.get("client")
+            logger.debug(
+                "request_received",
+                extra={
+                    "method": method,
+                    "path": path,
+                    "query_params": scope.get("query_string", b"").decode("latin-1"),
+                    "client_host": client[0] if client else None,
+                }
+            )
+
+        status_code: Optional[int] = None
+        ttfb: Optional[float] = None
+        response_bytes = 0
+        completed = False
+
+        def log_completed() -> None:
+            nonlocal completed
+            completed = True
+            if logger.isEnabledFor(logging.INFO) and (
+                status_code is None
+                or status_code >= 400
+                or self.sample_rate >= 1
+                or random.random() < self.sample_rate
+            ):
+                logger.info(
+                    "request_completed",
+                    extra={
+                        "method": method,
+                        "path": path,
+                        "status_code": status_code,
+                        "ttfb_ms": round(ttfb * 1000, 2) if ttfb is not None else None,
+                        "process_time_ms": round((time.perf_counter() - start) * 1000, 2),
+                        "response_bytes": response_bytes,
+                        **query_stats.as_log_fields(),
+                    }
+                )
+
+        async def send_with_timing(message):
+            nonlocal status_code, ttfb, response_bytes
+            if message["type"] == "http.response.start":
+                ttfb = time.perf_counter() - start
+                status_code = message["status"]
+                process_ms = round(ttfb * 1000, 2)
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-process-time", str(ttfb).encode()),
+                    (
+                        b"server-timing",
+                        f'db;dur={query_stats.total_ms};desc="{query_stats.count} queries", '
+                        f"app;dur={process_ms}".encode(),
+                    ),
+                ]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await send(message)
+                    # The response is done; whatever runs next is background work
+                    end_request()
+                    log_completed()
+                    return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            logger.error(
+                "request_failed",
+                extra={
+                    "method": method,
+                    "path": path,
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "response_sent": completed,  # True: a background task failed
+                    "process_time_ms": round((time.perf_counter() - start) * 1000, 2),
+                    **query_stats.as_log_fields(),
+                },
+                exc_info=True
+            )
+            raise
+
+        if not completed:
+            # No final body chunk was sent (e.g. the client disconnected)
+            log_completed()
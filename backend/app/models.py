@@ -1,5 +1,5 @@
 """SQLAlchemy ORM models."""
-from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, Text, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, Numeric, Integer, DateTime, ForeignKey, Text, Boolean, Index, Enum as SQLEnum, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -23,6 +23,12 @@ class SensorTypeEnum(str, enum.Enum):
     efficiency = "efficiency"
 
 
+class RollupResolutionEnum(str, enum.Enum):
+    """Sensor rollup resolution enum."""
+    minute = "minute"
+    hour = "hour"
+
+
 class TestRunStatusEnum(str, enum.Enum):
     """Test run status enum."""
     pending = "pending"
@@ -52,17 +58,59 @@ class SensorReading(Base):
     """Sensor reading model."""
     __tablename__ = "sensor_readings"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Server default lets COPY-based bulk loads skip generating IDs in Python
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
     unit_id = Column(UUID(as_uuid=True), ForeignKey("dac_units.id"), nullable=False)
     sensor_type = Column(SQLEnum(SensorTypeEnum), nullable=False)
     value = Column(Numeric(10, 2), nullable=False)
     unit = Column(String(50), nullable=False)
     timestamp = Column(DateTime, nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(
+        DateTime, default=datetime.utcnow, server_default=text("timezone('utc', now())"), nullable=False
+    )
 
     # Relationships
     dac_unit = relationship("DacUnit", back_populates="sensor_readings")
 
+    # One reading per sensor and instant; ingest paths insert with ON CONFLICT DO NOTHING.
+    # Rows arrive in time order, so BRIN block summaries sit next to the timestamp
+    # B-tree (pages_per_range is chosen, and the B-tree optionally dropped, when
+    # migration 006 runs).
+    __table_args__ = (
+        Index("ux_sensor_readings_unit_type_timestamp", "unit_id", "sensor_type", "timestamp", unique=True),
+        Index(
+            "ix_sensor_readings_timestamp_brin",
+            "timestamp",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32, "autosummarize": "on"},
+        ),
+        Index(
+            "ix_sensor_readings_created_at_brin",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32, "autosummarize": "on"},
+        ),
+    )
+
+
+class SensorReadingRollup(Base):
+    """Downsampled sensor readings for one (unit, sensor type, time bucket)."""
+    __tablename__ = "sensor_reading_rollups"
+
+    resolution = Column(SQLEnum(RollupResolutionEnum), primary_key=True)
+    unit_id = Column(UUID(as_uuid=True), ForeignKey("dac_units.id"), primary_key=True)
+    sensor_type = Column(SQLEnum(SensorTypeEnum), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    unit = Column(String(50), nullable=False)
+    value_count = Column(Integer, nullable=False)
+    value_sum = Column(Numeric(20, 4), nullable=False)
+    value_min = Column(Numeric(10, 2), nullable=False)
+    value_max = Column(Numeric(10, 2), nullable=False)
+
+    __table_args__ = (
+        Index("ix_sensor_reading_rollups_resolution_bucket", "resolution", "bucket_start"),
+    )
+
 
 class TestRun(Base):
     """Test run model."""
@@ -74,11 +122,28 @@ class TestRun(Base):
     started_at = Column(DateTime, nullable=False)
     completed_at = Column(DateTime, nullable=True)
     error = Column(Text, nullable=True)
+    batch_id = Column(UUID(as_uuid=True), ForeignKey("test_run_batches.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     unit = relationship("DacUnit", back_populates="test_runs")
     result = relationship("TestResult", back_populates="test_run", uselist=False, cascade="all, delete-orphan")
+    batch = relationship("TestRunBatch", back_populates="test_runs")
+
+
+class TestRunBatch(Base):
+    """A group of test runs started by one batch request."""
+    __tablename__ = "test_run_batches"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    total_runs = Column(Integer, nullable=False)
+    # Unit filter the batch was created with (null when unit IDs were listed)
+    filter_status = Column(SQLEnum(UnitStatusEnum), nullable=True)
+    filter_location = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    test_runs = relationship("TestRun", back_populates="batch")
 
 
 class TestResult(Base):
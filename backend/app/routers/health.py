@@ -0,0 +1,31 @@
+"""Root and health check endpoints (served without the /api prefix).
+
+The probes are async so they answer on the event loop even when every
+threadpool worker is busy with a slow request, and neither touches the
+database: ``/readyz`` reads the state kept by ``app.services.db_health``.
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.db_health import db_health
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/")
+def root():
+    """Root endpoint."""
+    return {"message": "DAC Operations Dashboard API"}
+
+
+@router.get("/livez")
+async def liveness():
+    """Liveness probe: the process is up and its event loop is serving requests."""
+    return {"status": "alive"}
+
+
+@router.get("/readyz")
+@router.get("/health")
+async def readiness():
+    """Readiness probe: 200 when this process should receive traffic, 503 otherwise."""
+    ready, body = db_health.readiness()
+    return JSONResponse(status_code=200 if ready else 503, content=body)
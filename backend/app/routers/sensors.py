@@ -1,18 +1,70 @@
 """Sensor readings API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from app.database import get_db
+from app.database import get_db, get_engine, get_settings
+from app.utils.replicas import get_read_db, first_or_primary, on_primary, replica_router
 from app import models, schemas
 from app.utils.transformers import transform_sensor_reading
+from app.utils import queries
 from app.utils.database import transaction
+from app.services.timeseries_cache import (
+    invalidate_series,
+    timeseries_cache,
+    to_utc_naive,
+    READINGS_CHANNEL,
+)
+from app.services.ingest_buffer import (
+    ingest_buffer,
+    BufferFullError,
+    UnitNotFoundError,
+    find_stored_readings,
+    insert_ignoring_duplicates,
+    prepare_reading,
+    reading_key,
+)
+from app.services.archive import merge_export_batches, merge_readings, sensor_archive
+from app.services.bulk_load import import_batch, iter_import_batches
+from app.services.retention import merge_rollups, rollup_readings
+from app.utils.export import (
+    EXPORT_FORMATS,
+    MEDIA_TYPES,
+    content_disposition,
+    iter_query_batches,
+    stream_export,
+)
+from app.cache import get_cache
 from app.logging_config import get_logger
 
 logger = get_logger("routers.sensors")
 router = APIRouter(prefix="/sensors", tags=["sensors"])
 
+READINGS_CACHE_NAMESPACE = "readings"
+SENSOR_TYPES_CACHE_NAMESPACE = "sensor_types"
+SENSOR_TYPES_CACHE_TTL_SECONDS = 60
+
+# How long a durable group-commit POST waits for its flush
+INGEST_DURABLE_TIMEOUT_SECONDS = 10.0
+
+# Rows per cursor fetch and per Parquet row group / Arrow record batch
+EXPORT_BATCH_ROWS = 50_000
+IMPORT_BATCH_ROWS = 250_000
+
+# Same columns as backfill.py imports, so exports can be re-imported as they are
+EXPORT_COLUMNS = [
+    ("unit_id", "string"),
+    ("sensor_type", "string"),
+    ("timestamp", "timestamp"),
+    ("value", "float"),
+    ("unit", "string"),
+]
+
 
 @router.get("/readings", response_model=List[schemas.SensorReading])
 def get_sensor_readings(
@@ -20,32 +72,76 @@ def get_sensor_readings(
     sensor_type: schemas.SensorType = Query(..., alias="sensorType", description="Sensor type"),
     start_time: datetime = Query(..., alias="startTime", description="Start time (ISO format)"),
     end_time: datetime = Query(..., alias="endTime", description="End time (ISO format)"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get sensor readings with filters."""
+    """Get sensor readings with filters.
+
+    Recent windows are served from the in-memory time-series cache; older
+    windows go through the shared response cache, merged with any archived
+    days they cover. With raw retention on, the part of a range older than
+    the oldest raw reading is filled from the 1-minute and hourly rollups.
+    """
     try:
+        sensor_type_value = sensor_type.value if hasattr(sensor_type, 'value') else str(sensor_type)
+        result = timeseries_cache.get(unit_id, sensor_type_value, start_time, end_time)
+        if result is not None:
+            return result
+
         # Verify unit exists
-        unit = db.query(models.DacUnit).filter(models.DacUnit.id == unit_id).first()
+        unit = first_or_primary(
+            db, lambda session: session.execute(queries.UNIT_EXISTS, {"unit_id": unit_id}).first()
+        )
         if not unit:
             logger.warning(f"Unit not found for sensor readings: {unit_id}")
             raise HTTPException(status_code=404, detail="Unit not found")
         
         # Query sensor readings
-        sensor_type_enum = models.SensorTypeEnum(sensor_type.value if hasattr(sensor_type, 'value') else sensor_type)
-        readings = db.query(models.SensorReading).filter(
-            models.SensorReading.unit_id == unit_id,
-            models.SensorReading.sensor_type == sensor_type_enum,
-            models.SensorReading.timestamp >= start_time,
-            models.SensorReading.timestamp <= end_time
-        ).order_by(models.SensorReading.timestamp).all()
-        
-        result = [transform_sensor_reading(reading) for reading in readings]
+        sensor_type_enum = models.SensorTypeEnum(sensor_type_value)
+        if timeseries_cache.accepts(start_time):
+            # Load the whole recent window once so later requests hit the cache.
+            # The cache keeps it for its TTL, so read it from the primary: a
+            # lagging replica could miss readings that are already committed.
+            window_start = timeseries_cache.window_start()
+            token = timeseries_cache.begin_fill(unit_id, sensor_type_value)
+            readings = on_primary(db, lambda session: session.execute(queries.READINGS_SINCE, {
+                "unit_id": unit_id, "sensor_type": sensor_type_enum, "start": window_start,
+            }).all())
+            window = [transform_sensor_reading(reading) for reading in readings]
+            timeseries_cache.fill(unit_id, sensor_type_value, window, window_start, token)
+
+            start, end = to_utc_naive(start_time), to_utc_naive(end_time)
+            readings = [r for r in readings if start <= r.timestamp <= end]
+            result = [transform_sensor_reading(reading) for reading in readings]
+        else:
+            def load_readings():
+                readings = db.execute(queries.READINGS_BETWEEN, {
+                    "unit_id": unit_id, "sensor_type": sensor_type_enum,
+                    "start": start_time, "end": end_time,
+                }).all()
+                result = [transform_sensor_reading(reading) for reading in readings]
+                if sensor_archive.covers(start_time):
+                    result = merge_readings(
+                        result, sensor_archive.read(unit_id, sensor_type_value, start_time, end_time)
+                    )
+                # Rollups only hold what is older than the oldest raw reading
+                rolled_up = not result or to_utc_naive(start_time) < result[0]["timestamp"]
+                if rolled_up and get_settings().retention_raw_days is not None:
+                    result = merge_rollups(
+                        result, rollup_readings(db, unit_id, sensor_type_value, start_time, end_time)
+                    )
+                return result
+
+            cache_key = (
+                f"{unit_id}:{sensor_type_value}:"
+                f"{to_utc_naive(start_time).isoformat()}:{to_utc_naive(end_time).isoformat()}"
+            )
+            result = get_cache().get_or_set(READINGS_CACHE_NAMESPACE, cache_key, load_readings)
         
         logger.debug(
             f"Retrieved {len(result)} sensor readings",
             extra={
                 "unit_id": str(unit_id),
-                "sensor_type": sensor_type.value,
+                "sensor_type": sensor_type_value,
                 "count": len(result),
             }
         )
@@ -68,34 +164,42 @@ def get_sensor_readings(
 
 
 @router.get("/types/{unit_id}", response_model=List[str])
-def get_available_sensor_types(unit_id: UUID, db: Session = Depends(get_db)):
+def get_available_sensor_types(unit_id: UUID, db: Session = Depends(get_read_db)):
     """Get available sensor types for a unit."""
     try:
-        # Verify unit exists
-        unit = db.query(models.DacUnit).filter(models.DacUnit.id == unit_id).first()
-        if not unit:
-            logger.warning(f"Unit not found for sensor types: {unit_id}")
-            raise HTTPException(status_code=404, detail="Unit not found")
-        
-        # Get distinct sensor types for this unit
-        sensor_types = db.query(models.SensorReading.sensor_type).filter(
-            models.SensorReading.unit_id == unit_id
-        ).distinct().all()
-        
-        # Extract enum values
-        result = []
-        for st in sensor_types:
-            sensor_type = st[0]
-            if hasattr(sensor_type, 'value'):
-                result.append(sensor_type.value)
-            else:
-                result.append(str(sensor_type))
-        
-        # Return default if no readings found
-        if not result:
-            result = ["co2", "temperature", "airflow", "efficiency"]
+        def load_sensor_types():
+            # Verify unit exists
+            unit = first_or_primary(
+                db, lambda session: session.execute(queries.UNIT_EXISTS, {"unit_id": unit_id}).first()
+            )
+            if not unit:
+                logger.warning(f"Unit not found for sensor types: {unit_id}")
+                raise HTTPException(status_code=404, detail="Unit not found")
+            
+            # Get distinct sensor types for this unit
+            sensor_types = db.execute(queries.SENSOR_TYPES_FOR_UNIT, {"unit_id": unit_id}).scalars()
+            
+            # Extract enum values
+            result = []
+            for sensor_type in sensor_types:
+                if hasattr(sensor_type, 'value'):
+                    result.append(sensor_type.value)
+                else:
+                    result.append(str(sensor_type))
+            
+            # Return default if no readings found
+            if not result:
+                result = ["co2", "temperature", "airflow", "efficiency"]
+            
+            return result
         
-        return result
+        # New sensor types are rare, so a short TTL bounds staleness
+        return get_cache().get_or_set(
+            SENSOR_TYPES_CACHE_NAMESPACE,
+            str(unit_id),
+            load_sensor_types,
+            ttl=SENSOR_TYPES_CACHE_TTL_SECONDS,
+        )
         
     except HTTPException:
         raise
@@ -108,38 +212,145 @@ def get_available_sensor_types(unit_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to retrieve sensor types")
 
 
+@router.get("/export")
+def export_sensor_readings(
+    export_format: str = Query("parquet", alias="format", description="parquet, arrow or csv"),
+    unit_ids: Optional[List[UUID]] = Query(None, alias="unitId", description="Unit IDs (repeatable; default: all)"),
+    sensor_types: Optional[List[schemas.SensorType]] = Query(
+        None, alias="sensorType", description="Sensor types (repeatable; default: all)"
+    ),
+    start_time: Optional[datetime] = Query(None, alias="startTime", description="Start time (ISO format)"),
+    end_time: Optional[datetime] = Query(None, alias="endTime", description="End time (ISO format)"),
+):
+    """Stream raw sensor readings as Parquet, Arrow IPC or CSV.
+
+    Readings come in (unit_id, sensor_type, timestamp) order, which is the
+    order of the readings' unique index, so the cursor streams without a sort.
+    Archived days in the range are merged into the stream in the same order.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if export_format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"{export_format} export is not available on this server")
+
+    reading = models.SensorReading
+    statement = (
+        select(reading.unit_id, reading.sensor_type, reading.timestamp, reading.value, reading.unit)
+        .order_by(reading.unit_id, reading.sensor_type, reading.timestamp)
+    )
+    if unit_ids:
+        statement = statement.where(reading.unit_id.in_(unit_ids))
+    if sensor_types:
+        statement = statement.where(
+            reading.sensor_type.in_([models.SensorTypeEnum(sensor_type.value) for sensor_type in sensor_types])
+        )
+    if start_time:
+        statement = statement.where(reading.timestamp >= to_utc_naive(start_time))
+    if end_time:
+        statement = statement.where(reading.timestamp < to_utc_naive(end_time))
+
+    logger.info(
+        "Exporting sensor readings",
+        extra={
+            "format": export_format,
+            "units": len(unit_ids) if unit_ids else None,
+            "sensor_types": [sensor_type.value for sensor_type in sensor_types] if sensor_types else None,
+        },
+    )
+    batches = iter_query_batches(statement, EXPORT_BATCH_ROWS, session_factory=replica_router.session)
+    if sensor_archive.covers(start_time):
+        archived = sensor_archive.iter_export(
+            unit_ids,
+            [sensor_type.value for sensor_type in sensor_types] if sensor_types else None,
+            start_time,
+            end_time,
+            EXPORT_BATCH_ROWS,
+        )
+        batches = merge_export_batches(batches, archived, EXPORT_BATCH_ROWS)
+    return StreamingResponse(
+        stream_export(export_format, EXPORT_COLUMNS, batches),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": content_disposition("sensor_readings", export_format)},
+    )
+
+
+def _buffer_sensor_reading(reading: schemas.SensorReadingCreate, db: Session, response: Response):
+    """Hand a reading to the group-commit buffer (see app.services.ingest_buffer)."""
+    if not ingest_buffer.unit_exists(db, reading.unit_id):
+        logger.warning(f"Unit not found for sensor reading creation: {reading.unit_id}")
+        raise HTTPException(status_code=404, detail="Unit not found")
+    # Release the connection while waiting for the flush
+    db.close()
+
+    try:
+        result, committed = ingest_buffer.submit(reading)
+    except BufferFullError:
+        logger.warning("Sensor reading buffer full", extra={"unit_id": str(reading.unit_id)})
+        raise HTTPException(status_code=503, detail="Sensor reading buffer full, retry later")
+
+    if ingest_buffer.mode == "ack":
+        response.status_code = 202
+        return result
+
+    try:
+        return committed.result(timeout=INGEST_DURABLE_TIMEOUT_SECONDS)
+    except UnitNotFoundError:
+        raise HTTPException(status_code=404, detail="Unit not found")
+    except FuturesTimeoutError:
+        # The reading is still buffered and may yet commit
+        logger.warning("Timed out waiting for sensor reading flush", extra={"unit_id": str(reading.unit_id)})
+        raise HTTPException(
+            status_code=503,
+            detail="Sensor reading not confirmed in time; retry, the write is idempotent",
+            headers={"Retry-After": "1"},
+        )
+
+
 @router.post("/readings", response_model=schemas.SensorReading)
 def create_sensor_reading(
     reading: schemas.SensorReadingCreate,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """Create a new sensor reading."""
+    """Create a new sensor reading.
+
+    With group commit enabled the reading is written in a batch with other
+    concurrent readings; in ``ack`` mode the response (202) is sent before
+    the reading is committed.
+    """
     try:
+        if ingest_buffer.enabled:
+            return _buffer_sensor_reading(reading, db, response)
+
         with transaction(db):
             # Verify unit exists
-            unit = db.query(models.DacUnit).filter(models.DacUnit.id == reading.unit_id).first()
+            unit = db.execute(queries.UNIT_EXISTS, {"unit_id": reading.unit_id}).first()
             if not unit:
                 logger.warning(f"Unit not found for sensor reading creation: {reading.unit_id}")
                 raise HTTPException(status_code=404, detail="Unit not found")
             
-            db_reading = models.SensorReading(
-                unit_id=reading.unit_id,
-                sensor_type=reading.sensor_type,
-                value=reading.value,
-                unit=reading.unit,
-                timestamp=reading.timestamp
-            )
-            db.add(db_reading)
+            # A retried reading resolves to the copy already stored
+            row, result = prepare_reading(reading)
+            inserted = db.execute(insert_ignoring_duplicates().values(**row)).scalar()
+            if inserted is None:
+                result = find_stored_readings(db, [reading_key(row)]).get(reading_key(row), result)
             
             logger.info(
-                "Created sensor reading",
+                "Created sensor reading" if inserted else "Ignored duplicate sensor reading",
                 extra={
                     "unit_id": str(reading.unit_id),
                     "sensor_type": reading.sensor_type.value if hasattr(reading.sensor_type, 'value') else str(reading.sensor_type),
                 }
             )
             
-            return transform_sensor_reading(db_reading)
+        # Only publish to the caches once the reading is committed
+        if inserted:
+            timeseries_cache.append(result)
+            get_cache().publish(READINGS_CHANNEL, result)
+        return result
             
     except HTTPException:
         raise
@@ -151,3 +362,66 @@ def create_sensor_reading(
         )
         raise HTTPException(status_code=500, detail="Failed to create sensor reading")
 
+
+@router.post("/import", response_model=schemas.SensorReadingImport)
+def import_sensor_readings(
+    file: UploadFile = File(..., description="Parquet file with unit_id, sensor_type, value, unit and timestamp columns"),
+):
+    """Bulk-load a Parquet file of readings through COPY.
+
+    The upload is spooled to disk and read in batches of IMPORT_BATCH_ROWS,
+    each committed on its own, so memory stays flat for files of any size.
+    Rows with unknown units or sensor types are skipped, as are readings
+    already stored, so a failed import can simply be retried.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Parquet import is not available on this server")
+
+    started = time.perf_counter()
+    imported = skipped = batches = 0
+    conn = get_engine().raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM dac_units")
+            known_unit_ids = [str(row[0]).lower() for row in cursor.fetchall()]
+
+        created_at = datetime.utcnow()
+        for batch in iter_import_batches(file.file, IMPORT_BATCH_ROWS):
+            batch_imported, batch_skipped = import_batch(conn, batch, known_unit_ids, created_at)
+            imported += batch_imported
+            skipped += batch_skipped
+            batches += 1
+    except (ValueError, pa.ArrowException) as e:
+        conn.rollback()
+        logger.warning("Rejected sensor reading import", extra={"error": str(e), "rows_imported": imported})
+        raise HTTPException(status_code=422, detail=f"Invalid import file: {e}")
+    except Exception as e:
+        conn.rollback()
+        logger.error(
+            "Failed to import sensor readings",
+            extra={"error": str(e), "rows_imported": imported},
+            exc_info=True
+        )
+        raise HTTPException(status_code=500, detail="Failed to import sensor readings")
+    finally:
+        conn.close()
+
+    # Imported readings may fall inside cached windows, in every worker
+    if imported:
+        invalidate_series(get_cache())
+        get_cache().invalidate(READINGS_CACHE_NAMESPACE)
+        get_cache().invalidate(SENSOR_TYPES_CACHE_NAMESPACE)
+
+    logger.info(
+        "Imported sensor readings",
+        extra={
+            "upload": file.filename,
+            "rows_imported": imported,
+            "rows_skipped": skipped,
+            "batches": batches,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    )
+    return {"rows_imported": imported, "rows_skipped": skipped, "batches": batches}
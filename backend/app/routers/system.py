@@ -0,0 +1,35 @@
+"""Operational introspection endpoints."""
+from fastapi import APIRouter
+from app.services.timeseries_cache import timeseries_cache
+from app.cache import get_cache
+from app.middleware.coalescing import coalescing_metrics
+from app.middleware.compression import compression_metrics
+from app.utils.query_profiler import query_profiler
+from app.utils.replicas import replica_router
+from app.services.test_executor import stored_window_loader
+from app.services.ingest_buffer import ingest_buffer
+from app.services.archive import sensor_archive
+from app.services.warmup import warmup_state
+from app.services.db_health import db_health
+from app.logging_config import get_logger
+
+logger = get_logger("routers.system")
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/stats")
+def get_system_stats():
+    """Get runtime statistics for in-process caches and optimizations."""
+    return {
+        "timeseries_cache": timeseries_cache.stats(),
+        "cache": get_cache().stats(),
+        "request_coalescing": coalescing_metrics.as_dict(),
+        "compression": compression_metrics.as_dict(),
+        "queries": query_profiler.stats(),
+        "stored_test_windows": stored_window_loader.stats(),
+        "ingest_buffer": ingest_buffer.stats(),
+        "archive": sensor_archive.stats(),
+        "read_replicas": replica_router.stats(),
+        "warmup": warmup_state.stats(),
+        "database_health": db_health.stats(),
+    }
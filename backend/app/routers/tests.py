@@ -1,43 +1,99 @@
 """Test runs API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from sqlalchemy.orm import Session, joinedload
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime
-from app.database import get_db
+from datetime import datetime, timedelta
+from app.database import get_db, get_session_factory
 from app import models, schemas
+from app.services.test_analytics import compute_test_analytics, TREND_INTERVALS
+from app.services.test_batches import (
+    BatchError,
+    UnknownUnitsError,
+    create_batch,
+    get_batch_progress,
+    test_run_dispatcher,
+)
 from app.services.test_executor import execute_test_run
+from app.services.timeseries_cache import to_utc_naive
 from app.utils.transformers import transform_test_run, transform_test_result
+from app.utils import queries
 from app.utils.database import transaction
+from app.utils.replicas import get_read_db, first_or_primary, replica_router
+from app.utils.export import (
+    EXPORT_FORMATS,
+    MEDIA_TYPES,
+    content_disposition,
+    iter_query_batches,
+    stream_export,
+)
+from app.cache import get_cache
+from app.cache.base import json_default
 from app.logging_config import get_logger
 
 logger = get_logger("routers.tests")
 router = APIRouter(prefix="/tests", tags=["tests"])
 
+# Test runs change state within seconds, so keep cached reads short-lived
+CACHE_NAMESPACE = "test_runs"
+CACHE_TTL_SECONDS = 5
+
+ANALYTICS_DEFAULT_DAYS = 30
+
+# Seconds between progress checks on the batch event stream
+BATCH_EVENTS_POLL_SECONDS = 1.0
+
+# One row per (run, metric); runs without results export a single row
+EXPORT_COLUMNS = [
+    ("run_id", "string"),
+    ("unit_id", "string"),
+    ("unit_name", "string"),
+    ("status", "string"),
+    ("started_at", "timestamp"),
+    ("completed_at", "timestamp"),
+    ("error", "string"),
+    ("passed", "bool"),
+    ("summary", "string"),
+    ("metric_name", "string"),
+    ("metric_value", "float"),
+    ("metric_unit", "string"),
+    ("threshold_min", "float"),
+    ("threshold_max", "float"),
+]
+
 
 @router.get("/runs", response_model=List[schemas.TestRunWithResults])
 def get_test_runs(
     unit_id: Optional[UUID] = Query(None, alias="unitId", description="Filter by unit ID"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get test runs, optionally filtered by unit."""
     try:
         # Cap limit at reasonable maximum
         limit = min(limit, 1000)
         
-        query = db.query(models.TestRun)
+        def load_test_runs():
+            # Results and metrics are eager loaded to prevent N+1 queries
+            if unit_id:
+                statement = queries.TEST_RUNS_PAGE_FOR_UNIT
+                params = {"unit_id": unit_id, "skip": skip, "limit": limit}
+            else:
+                statement = queries.TEST_RUNS_PAGE
+                params = {"skip": skip, "limit": limit}
+            test_runs = db.execute(statement, params).unique().scalars().all()
         
-        if unit_id:
-            query = query.filter(models.TestRun.unit_id == unit_id)
+            return [transform_test_run(test_run) for test_run in test_runs]
         
-        # Use eager loading to prevent N+1 queries
-        test_runs = query.options(
-            joinedload(models.TestRun.result).joinedload(models.TestResult.metrics)
-        ).order_by(models.TestRun.started_at.desc()).offset(skip).limit(limit).all()
-        
-        result = [transform_test_run(test_run) for test_run in test_runs]
+        result = get_cache().get_or_set(
+            CACHE_NAMESPACE, f"list:{unit_id}:{skip}:{limit}", load_test_runs, ttl=CACHE_TTL_SECONDS
+        )
         
         logger.debug(
             f"Retrieved {len(result)} test runs",
@@ -51,6 +107,99 @@ def get_test_runs(
         raise HTTPException(status_code=500, detail="Failed to retrieve test runs")
 
 
+@router.get("/analytics", response_model=schemas.TestAnalytics)
+def get_test_analytics(
+    start_time: Optional[datetime] = Query(None, alias="startTime", description="Start time (ISO format)"),
+    end_time: Optional[datetime] = Query(None, alias="endTime", description="End time (ISO format)"),
+    unit_id: Optional[UUID] = Query(None, alias="unitId", description="Filter by unit ID"),
+    interval: str = Query("day", description="Trend bucket size: day or week"),
+    db: Session = Depends(get_read_db)
+):
+    """Get pass rate, metric distributions and per-unit trends for a time range.
+
+    Defaults to the last 30 days. Aggregation happens in the database.
+    """
+    if interval not in TREND_INTERVALS:
+        raise HTTPException(status_code=422, detail=f"interval must be one of {', '.join(TREND_INTERVALS)}")
+    end = to_utc_naive(end_time) if end_time else datetime.utcnow()
+    start = to_utc_naive(start_time) if start_time else end - timedelta(days=ANALYTICS_DEFAULT_DAYS)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="startTime must be before endTime")
+
+    try:
+        return get_cache().get_or_set(
+            CACHE_NAMESPACE,
+            f"analytics:{unit_id}:{start.isoformat()}:{end.isoformat()}:{interval}",
+            lambda: compute_test_analytics(db, start, end, unit_id, interval),
+            ttl=CACHE_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.error("Failed to compute test analytics", extra={"error": str(e)}, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to compute test analytics")
+
+
+# Declared before /runs/{run_id} so "export" is not parsed as a run ID
+@router.get("/runs/export")
+def export_test_runs(
+    export_format: str = Query("csv", alias="format", description="csv, parquet or arrow"),
+    start_time: Optional[datetime] = Query(None, alias="startTime", description="Start time (ISO format)"),
+    end_time: Optional[datetime] = Query(None, alias="endTime", description="End time (ISO format)"),
+    unit_id: Optional[UUID] = Query(None, alias="unitId", description="Filter by unit ID"),
+):
+    """Stream every test run with its result and metrics as CSV, Parquet or Arrow IPC."""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if export_format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"{export_format} export is not available on this server")
+
+    statement = (
+        select(
+            models.TestRun.id,
+            models.TestRun.unit_id,
+            models.DacUnit.name,
+            models.TestRun.status,
+            models.TestRun.started_at,
+            models.TestRun.completed_at,
+            models.TestRun.error,
+            models.TestResult.passed,
+            models.TestResult.summary,
+            models.TestMetric.name,
+            models.TestMetric.value,
+            models.TestMetric.unit,
+            models.TestMetric.threshold_min,
+            models.TestMetric.threshold_max,
+        )
+        .select_from(models.TestRun)
+        .join(models.DacUnit, models.DacUnit.id == models.TestRun.unit_id)
+        .outerjoin(models.TestResult, models.TestResult.test_run_id == models.TestRun.id)
+        .outerjoin(models.TestMetric, models.TestMetric.test_result_id == models.TestResult.id)
+        .order_by(models.TestRun.started_at, models.TestRun.id, models.TestMetric.name)
+    )
+    if start_time:
+        statement = statement.where(models.TestRun.started_at >= to_utc_naive(start_time))
+    if end_time:
+        statement = statement.where(models.TestRun.started_at < to_utc_naive(end_time))
+    if unit_id:
+        statement = statement.where(models.TestRun.unit_id == unit_id)
+
+    logger.info(
+        "Exporting test runs",
+        extra={"format": export_format, "unit_id": str(unit_id) if unit_id else None},
+    )
+    return StreamingResponse(
+        stream_export(
+            export_format,
+            EXPORT_COLUMNS,
+            iter_query_batches(statement, session_factory=replica_router.session),
+        ),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": content_disposition("test_runs", export_format)},
+    )
+
+
 @router.post("/runs", response_model=schemas.TestRun)
 def create_test_run(
     test_run: schemas.TestRunCreate,
@@ -61,7 +210,7 @@ def create_test_run(
     try:
         with transaction(db):
             # Verify unit exists
-            unit = db.query(models.DacUnit).filter(models.DacUnit.id == test_run.unit_id).first()
+            unit = db.execute(queries.UNIT_EXISTS, {"unit_id": test_run.unit_id}).first()
             if not unit:
                 logger.warning(f"Unit not found for test run creation: {test_run.unit_id}")
                 raise HTTPException(status_code=404, detail="Unit not found")
@@ -75,7 +224,7 @@ def create_test_run(
             db.flush()  # Get ID without committing
             
             # Start test execution in the background
-            background_tasks.add_task(execute_test_run, db_test_run.id, test_run.unit_id, db)
+            background_tasks.add_task(execute_test_run, db_test_run.id, test_run.unit_id)
             
             logger.info(
                 "Created test run",
@@ -85,7 +234,10 @@ def create_test_run(
                 }
             )
             
-            return transform_test_run(db_test_run)
+            result = transform_test_run(db_test_run)
+        
+        get_cache().invalidate(CACHE_NAMESPACE)
+        return result
             
     except HTTPException:
         raise
@@ -98,20 +250,134 @@ def create_test_run(
         raise HTTPException(status_code=500, detail="Failed to create test run")
 
 
+@router.post("/runs:batch", response_model=schemas.TestRunBatch)
+def create_test_run_batch(
+    batch_request: schemas.TestRunBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Create test runs for many units in one transaction and queue their execution.
+
+    Executions are throttled by TEST_BATCH_CONCURRENCY; poll
+    ``/tests/batches/{batch_id}`` or stream ``/tests/batches/{batch_id}/events``
+    for progress.
+    """
+    try:
+        with transaction(db):
+            batch, runs = create_batch(
+                db,
+                unit_ids=batch_request.unit_ids,
+                status=models.UnitStatusEnum(batch_request.status.value) if batch_request.status else None,
+                location=batch_request.location,
+            )
+            run_ids = [(run.id, run.unit_id) for run in runs]
+            batch_id = batch.id
+
+        # Hand the runs to the dispatcher on the event loop once the response is sent
+        background_tasks.add_task(test_run_dispatcher.dispatch, run_ids)
+        get_cache().invalidate(CACHE_NAMESPACE)
+
+        logger.info(
+            "Created test run batch",
+            extra={"batch_id": str(batch_id), "runs": len(run_ids)},
+        )
+
+        result = get_batch_progress(db, batch_id)
+        result["test_run_ids"] = [run_id for run_id, _ in run_ids]
+        return result
+
+    except UnknownUnitsError as e:
+        logger.warning("Rejected test run batch", extra={"error": str(e)})
+        raise HTTPException(status_code=404, detail=str(e))
+    except BatchError as e:
+        logger.warning("Rejected test run batch", extra={"error": str(e)})
+        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to create test run batch", extra={"error": str(e)}, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to create test run batch")
+
+
+@router.get("/batches/{batch_id}", response_model=schemas.TestRunBatchProgress)
+def get_test_run_batch(batch_id: UUID, db: Session = Depends(get_db)):
+    """Get aggregate progress of a test run batch."""
+    try:
+        progress = get_batch_progress(db, batch_id)
+        if progress is None:
+            logger.warning(f"Test run batch not found: {batch_id}")
+            raise HTTPException(status_code=404, detail="Test run batch not found")
+        return progress
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to retrieve test run batch {batch_id}", extra={"error": str(e)}, exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to retrieve test run batch")
+
+
+def _load_batch_progress(batch_id: UUID):
+    db = get_session_factory()()
+    try:
+        return get_batch_progress(db, batch_id)
+    finally:
+        db.close()
+
+
+@router.get("/batches/{batch_id}/events")
+async def stream_test_run_batch(batch_id: UUID, request: Request):
+    """Stream batch progress as Server-Sent Events until every run has finished."""
+    progress = await run_in_threadpool(_load_batch_progress, batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Test run batch not found")
+
+    async def events():
+        nonlocal progress
+        last_sent = None
+        while True:
+            payload = json.dumps(progress, default=json_default)
+            if payload != last_sent:
+                yield f"event: progress\ndata: {payload}\n\n"
+                last_sent = payload
+            else:
+                # Comment line keeps proxies from timing out an idle stream
+                yield ": keep-alive\n\n"
+            if progress["done"] or await request.is_disconnected():
+                break
+            await asyncio.sleep(BATCH_EVENTS_POLL_SECONDS)
+            progress = await run_in_threadpool(_load_batch_progress, batch_id)
+            if progress is None:
+                break
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/runs/{run_id}", response_model=schemas.TestRunWithResults)
-def get_test_run(run_id: UUID, db: Session = Depends(get_db)):
+def get_test_run(run_id: UUID, db: Session = Depends(get_read_db)):
     """Get a single test run by ID."""
     try:
-        # Use eager loading to prevent N+1 queries
-        test_run = db.query(models.TestRun).options(
-            joinedload(models.TestRun.result).joinedload(models.TestResult.metrics)
-        ).filter(models.TestRun.id == run_id).first()
-        
-        if not test_run:
-            logger.warning(f"Test run not found: {run_id}")
-            raise HTTPException(status_code=404, detail="Test run not found")
+        def find_test_run(session: Session):
+            # Results and metrics are eager loaded to prevent N+1 queries
+            test_run = session.execute(
+                queries.TEST_RUN_BY_ID, {"run_id": run_id}
+            ).unique().scalar_one_or_none()
+            return transform_test_run(test_run) if test_run else None
+
+        def load_test_run():
+            # A run created moments ago may not have reached the replica yet
+            test_run = first_or_primary(db, find_test_run)
+            if not test_run:
+                logger.warning(f"Test run not found: {run_id}")
+                raise HTTPException(status_code=404, detail="Test run not found")
+            return test_run
         
-        return transform_test_run(test_run)
+        return get_cache().get_or_set(
+            CACHE_NAMESPACE, f"run:{run_id}", load_test_run, ttl=CACHE_TTL_SECONDS
+        )
         
     except HTTPException:
         raise
@@ -153,7 +419,10 @@ def update_test_run_status(
                 }
             )
             
-            return transform_test_run(test_run)
+            result = transform_test_run(test_run)
+        
+        get_cache().invalidate(CACHE_NAMESPACE)
+        return result
             
     except HTTPException:
         raise
@@ -215,7 +484,10 @@ def create_test_result(
             )
             
             # Reload with metrics
-            return transform_test_result(db_result)
+            result = transform_test_result(db_result)
+        
+        get_cache().invalidate(CACHE_NAMESPACE)
+        return result
             
     except HTTPException:
         raise
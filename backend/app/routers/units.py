@@ -6,43 +6,52 @@ from typing import List
 from uuid import UUID
 from datetime import datetime
 from app.database import get_db
+from app.utils.replicas import get_read_db, first_or_primary
 from app import models, schemas
 from app.utils.transformers import transform_dac_unit
+from app.utils import queries
 from app.utils.database import transaction
+from app.cache import get_cache
 from app.logging_config import get_logger
 
 logger = get_logger("routers.units")
 router = APIRouter(prefix="/units", tags=["units"])
 
+CACHE_NAMESPACE = "units"
+
 
 @router.get("", response_model=List[schemas.DacUnit])
-def get_units(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_units(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     """Get all DAC units, showing only the newest for each unique name+location."""
     try:
         # Cap limit at reasonable maximum
         limit = min(limit, 1000)
         
-        query = text("""
-            SELECT DISTINCT ON (name, COALESCE(location, ''))
-                id, name, status, location, last_updated, created_at, updated_at
-            FROM dac_units
-            ORDER BY name, COALESCE(location, ''), updated_at DESC
-            LIMIT :limit OFFSET :skip
-        """)
+        def load_units():
+            query = text("""
+                SELECT DISTINCT ON (name, COALESCE(location, ''))
+                    id, name, status, location, last_updated, created_at, updated_at
+                FROM dac_units
+                ORDER BY name, COALESCE(location, ''), updated_at DESC
+                LIMIT :limit OFFSET :skip
+            """)
         
-        result = db.execute(query, {"limit": limit, "skip": skip})
+            result = db.execute(query, {"limit": limit, "skip": skip})
         
-        units = []
-        for row in result:
-            units.append({
-                "id": row.id,
-                "name": row.name,
-                "status": row.status.value if hasattr(row.status, 'value') else row.status,
-                "location": row.location,
-                "last_updated": row.last_updated,
-                "created_at": row.created_at,
-                "updated_at": row.updated_at,
-            })
+            units = []
+            for row in result:
+                units.append({
+                    "id": row.id,
+                    "name": row.name,
+                    "status": row.status.value if hasattr(row.status, 'value') else row.status,
+                    "location": row.location,
+                    "last_updated": row.last_updated,
+                    "created_at": row.created_at,
+                    "updated_at": row.updated_at,
+                })
+            return units
+
+        units = get_cache().get_or_set(CACHE_NAMESPACE, f"list:{skip}:{limit}", load_units)
         
         logger.debug(f"Retrieved {len(units)} units", extra={"skip": skip, "limit": limit})
         return units
@@ -53,15 +62,22 @@ def get_units(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
 
 
 @router.get("/{unit_id}", response_model=schemas.DacUnit)
-def get_unit(unit_id: UUID, db: Session = Depends(get_db)):
+def get_unit(unit_id: UUID, db: Session = Depends(get_read_db)):
     """Get a single DAC unit by ID."""
     try:
-        unit = db.query(models.DacUnit).filter(models.DacUnit.id == unit_id).first()
-        if not unit:
-            logger.warning(f"Unit not found: {unit_id}")
-            raise HTTPException(status_code=404, detail="Unit not found")
+        def find_unit(session: Session):
+            unit = session.execute(queries.UNIT_BY_ID, {"unit_id": unit_id}).scalar_one_or_none()
+            return transform_dac_unit(unit) if unit else None
+
+        def load_unit():
+            # A unit created moments ago may not have reached the replica yet
+            unit = first_or_primary(db, find_unit)
+            if not unit:
+                logger.warning(f"Unit not found: {unit_id}")
+                raise HTTPException(status_code=404, detail="Unit not found")
+            return unit
         
-        return transform_dac_unit(unit)
+        return get_cache().get_or_set(CACHE_NAMESPACE, f"unit:{unit_id}", load_unit)
         
     except HTTPException:
         raise
@@ -97,7 +113,10 @@ def update_unit_status(
                 }
             )
             
-            return transform_dac_unit(unit)
+            result = transform_dac_unit(unit)
+        
+        get_cache().invalidate(CACHE_NAMESPACE)
+        return result
             
     except HTTPException:
         raise
@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation."""
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, Optional, List
 from datetime import datetime
 from uuid import UUID
 
@@ -85,6 +85,13 @@ class SensorReading(SensorReadingBase):
         populate_by_name = True
 
 
+class SensorReadingImport(BaseModel):
+    """Outcome of a bulk Parquet import."""
+    rows_imported: int
+    rows_skipped: int = Field(..., description="Invalid rows, unknown units and readings already stored")
+    batches: int
+
+
 # Test Run Schemas
 class TestRunBase(BaseModel):
     status: TestRunStatus
@@ -177,3 +184,86 @@ class TestRunWithResults(TestRun):
     class Config:
         from_attributes = True
 
+
+# Test Run Batch Schemas
+class TestRunBatchCreate(BaseModel):
+    unit_ids: Optional[List[UUID]] = Field(None, alias="unitIds", min_length=1)
+    status: Optional[UnitStatus] = Field(None, description="Run every unit with this status")
+    location: Optional[str] = Field(None, max_length=255, description="Run every unit at this location")
+
+    class Config:
+        populate_by_name = True
+
+    @model_validator(mode="after")
+    def validate_target(self) -> "TestRunBatchCreate":
+        """Require either a unit list or a filter, not both."""
+        has_filter = self.status is not None or self.location is not None
+        if self.unit_ids and has_filter:
+            raise ValueError("Provide either unitIds or a status/location filter, not both")
+        if not self.unit_ids and not has_filter:
+            raise ValueError("Provide unitIds or a status/location filter")
+        return self
+
+
+class TestRunBatchProgress(BaseModel):
+    id: UUID
+    total_runs: int
+    pending: int
+    running: int
+    completed: int
+    failed: int
+    passed: int
+    progress: float
+    done: bool
+    created_at: datetime
+
+
+class TestRunBatch(TestRunBatchProgress):
+    test_run_ids: List[UUID]
+
+
+# Test Analytics Schemas
+class TestAnalyticsSummary(BaseModel):
+    runs: int
+    completed: int
+    failed: int
+    in_progress: int
+    with_results: int
+    passed: int
+    pass_rate: Optional[float] = None
+    avg_duration_seconds: Optional[float] = None
+
+
+class MetricDistribution(BaseModel):
+    name: str
+    unit: str
+    count: int
+    mean: Optional[float] = None
+    stddev: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    percentiles: Dict[str, Optional[float]]
+    out_of_threshold: int
+
+
+class UnitTrendPoint(BaseModel):
+    bucket_start: datetime
+    runs: int
+    passed: int
+    failed: int
+    pass_rate: Optional[float] = None
+    metric_means: Dict[str, Optional[float]]
+
+
+class UnitTrend(BaseModel):
+    unit_id: UUID
+    points: List[UnitTrendPoint]
+
+
+class TestAnalytics(BaseModel):
+    start: datetime
+    end: datetime
+    interval: str
+    summary: TestAnalyticsSummary
+    metrics: List[MetricDistribution]
+    unit_trends: List[UnitTrend]
@@ -0,0 +1,484 @@
+"""Memory-mapped file archive for cold sensor readings.
+
+With ``ARCHIVE_ENABLED`` the retention job moves closed UTC days of raw
+readings older than ``ARCHIVE_AFTER_DAYS`` out of ``sensor_readings`` into
+one directory per day under ``ARCHIVE_DIR``:
+
+    2024-01-15 -> .2024-01-15.<version>/
+        timestamps.npy   int64 microseconds since the epoch
+        values.npy       float64
+        created_at.npy   int64 microseconds since the epoch
+        ids.npy          16-byte reading UUIDs
+        index.json       series -> [offset, count, measurement unit]
+
+Rows are sorted by (unit_id, sensor_type, timestamp), so each series' day
+is one contiguous slice of the fixed-width columns at 40 bytes per reading,
+with no per-row overhead and no indexes. Readers open the columns with
+``np.load(mmap_mode="r")`` (a ``numpy.memmap``) and binary-search the
+slice's timestamps, so only the pages of the requested range are read.
+
+Each day is a symlink to a hidden version directory. A day is written to a
+new version directory and the symlink is replaced with one rename, so
+readers always see either the old or the new version, never a missing day.
+Readings that arrive late for an archived day are merged into a rewritten
+copy. Processes holding the old files keep reading them until they notice
+the link has moved.
+
+``GET /api/sensors/export`` merges archived days into its stream with
+``SensorArchive.iter_export`` and ``merge_export_batches``.
+"""
+import heapq
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from itertools import chain
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+from app import models
+from app.database import get_settings
+from app.logging_config import get_logger
+from app.services.timeseries_cache import to_utc_naive
+from app.utils.lazy import LazySingleton
+
+logger = get_logger("services.archive")
+
+_EPOCH = datetime(1970, 1, 1)
+
+COLUMN_FILES = ("timestamps", "values", "created_at", "ids")
+INDEX_FILE = "index.json"
+ARCHIVE_VERSION = 1
+
+# Row layout passed to write_day, as selected from sensor_readings
+ARCHIVE_ROW_COLUMNS = ("unit_id", "sensor_type", "unit", "timestamp", "value", "id", "created_at")
+
+# Declaration order of the sensortypeenum type, which PostgreSQL sorts by
+_SENSOR_TYPE_ORDER = {sensor_type.value: rank for rank, sensor_type in enumerate(models.SensorTypeEnum)}
+
+# Attempts to open a day whose version is replaced (and removed) while opening it
+_OPEN_ATTEMPTS = 3
+
+
+def _series_key(unit_id: Any, sensor_type: str) -> str:
+    return f"{str(unit_id).lower()}:{sensor_type}"
+
+
+def _micros(values) -> "Any":
+    """datetime list or array -> int64 microseconds since the epoch."""
+    import numpy as np
+
+    return np.asarray(values, dtype="datetime64[us]").astype(np.int64)
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def export_order(row: Sequence[Any]) -> tuple:
+    """Sort key of an export row (unit_id, sensor_type, timestamp, ...), as the database orders it."""
+    return row[0], _SENSOR_TYPE_ORDER.get(row[1], len(_SENSOR_TYPE_ORDER)), row[2]
+
+
+class _ArchivedDay:
+    """Index and memory-mapped columns of one version of an archived day."""
+
+    def __init__(self, path: str, version: str):
+        import numpy as np
+
+        self.version = version
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.series: Dict[str, List[Any]] = json.load(f)["series"]
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMN_FILES
+        }
+
+
+class SensorArchive:
+    """Day directories of archived readings under ``root``."""
+
+    def __init__(self, root: str, open_days: int = 64):
+        self.root = root
+        self.open_days = open_days
+        self._lock = threading.Lock()
+        self._open: "OrderedDict[date, _ArchivedDay]" = OrderedDict()
+        self._days: List[date] = []
+        self._days_mtime: Optional[int] = None
+        self.reads = 0
+        self.rows_read = 0
+        self.days_written = 0
+
+    @classmethod
+    def from_settings(cls) -> "SensorArchive":
+        settings = get_settings()
+        return cls(settings.archive_dir, settings.archive_open_days)
+
+    def _day_path(self, day: date) -> str:
+        return os.path.join(self.root, day.isoformat())
+
+    def days(self) -> List[date]:
+        """Archived days, oldest first; rescanned only when the root directory changes."""
+        try:
+            mtime = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if mtime != self._days_mtime:
+                days = []
+                for entry in os.scandir(self.root):
+                    if entry.is_dir() and not entry.name.startswith("."):
+                        try:
+                            days.append(date.fromisoformat(entry.name))
+                        except ValueError:
+                            continue
+                self._days = sorted(days)
+                self._days_mtime = mtime
+            return self._days
+
+    def covers(self, start: Optional[datetime]) -> bool:
+        """Whether a range starting at ``start`` (None: unbounded) may include archived readings."""
+        days = self.days()
+        return bool(days) and (start is None or to_utc_naive(start).date() <= days[-1])
+
+    def _get_day(self, day: date) -> Optional[_ArchivedDay]:
+        path = self._day_path(day)
+        for attempt in range(1, _OPEN_ATTEMPTS + 1):
+            try:
+                version = os.readlink(path)
+            except FileNotFoundError:
+                return None
+            with self._lock:
+                archived = self._open.get(day)
+                if archived is not None and archived.version == version:
+                    self._open.move_to_end(day)
+                    return archived
+            try:
+                archived = _ArchivedDay(os.path.join(self.root, version), version)
+                break
+            except FileNotFoundError:
+                # Replaced and removed since readlink; the link points at the new version
+                if attempt == _OPEN_ATTEMPTS:
+                    raise
+        with self._lock:
+            self._open[day] = archived
+            self._open.move_to_end(day)
+            while len(self._open) > self.open_days:
+                self._open.popitem(last=False)
+        return archived
+
+    def read(self, unit_id: UUID, sensor_type: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Archived readings of one series with start <= timestamp <= end, oldest first."""
+        import numpy as np
+
+        start, end = to_utc_naive(start), to_utc_naive(end)
+        start_us, end_us = int(_micros([start])[0]), int(_micros([end])[0])
+        key = _series_key(unit_id, sensor_type)
+        readings: List[Dict[str, Any]] = []
+
+        for day in self.days():
+            if day < start.date() or day > end.date():
+                continue
+            archived = self._get_day(day)
+            entry = archived.series.get(key) if archived else None
+            if entry is None:
+                continue
+            offset, count, measurement_unit = entry
+            # Views into the mapped files; only the touched pages are read
+            timestamps = archived.columns["timestamps"][offset:offset + count]
+            lo = offset + int(np.searchsorted(timestamps, start_us, side="left"))
+            hi = offset + int(np.searchsorted(timestamps, end_us, side="right"))
+            if lo >= hi:
+                continue
+
+            columns = archived.columns
+            for ts, value, created, reading_id in zip(
+                columns["timestamps"][lo:hi].tolist(),
+                columns["values"][lo:hi].tolist(),
+                columns["created_at"][lo:hi].tolist(),
+                columns["ids"][lo:hi].tolist(),
+            ):
+                readings.append({
+                    "id": UUID(bytes=bytes(reading_id)),
+                    "unit_id": unit_id,
+                    "sensor_type": sensor_type,
+                    "value": value,
+                    "unit": measurement_unit,
+                    "timestamp": _from_micros(ts),
+                    "created_at": _from_micros(created),
+                })
+
+        self.reads += 1
+        self.rows_read += len(readings)
+        return readings
+
+    def _load_day_rows(self, day: date):
+        """Rows of an archived day as column arrays, for merging late readings."""
+        import numpy as np
+
+        archived = self._get_day(day)
+        if archived is None:
+            return None
+        order = sorted(archived.series.items(), key=lambda item: item[1][0])
+        counts = [entry[1] for _, entry in order]
+        unit_ids = np.repeat([key.split(":", 1)[0] for key, _ in order], counts)
+        sensor_types = np.repeat([key.split(":", 1)[1] for key, _ in order], counts)
+        units = np.repeat([entry[2] for _, entry in order], counts)
+        columns = {name: np.array(archived.columns[name]) for name in COLUMN_FILES}
+        return unit_ids, sensor_types, units, columns
+
+    def write_day(self, day: date, batches: Iterable[Sequence[tuple]]) -> int:
+        """
+        Archive one day of readings, merged with any already archived for it.
+
+        Args:
+            day: UTC day the readings belong to
+            batches: lists of rows laid out as ARCHIVE_ROW_COLUMNS
+
+        Returns:
+            Rows read from batches
+        """
+        import numpy as np
+
+        parts: Dict[str, List[Any]] = {name: [] for name in ARCHIVE_ROW_COLUMNS}
+        rows = 0
+        for batch in batches:
+            if not batch:
+                continue
+            rows += len(batch)
+            unit_ids, sensor_types, units, timestamps, values, ids, created = zip(*batch)
+            parts["unit_id"].append(np.array([str(unit_id).lower() for unit_id in unit_ids]))
+            parts["sensor_type"].append(np.array([getattr(t, "value", t) for t in sensor_types]))
+            parts["unit"].append(np.array(units))
+            parts["timestamp"].append(_micros(timestamps))
+            parts["value"].append(np.array([float(value) for value in values], dtype=np.float64))
+            parts["id"].append(np.frombuffer(b"".join(UUID(str(i)).bytes for i in ids), dtype="V16"))
+            parts["created_at"].append(_micros(created))
+        if not rows:
+            return 0
+
+        unit_ids = np.concatenate(parts["unit_id"])
+        sensor_types = np.concatenate(parts["sensor_type"])
+        units = np.concatenate(parts["unit"])
+        columns = {
+            "timestamps": np.concatenate(parts["timestamp"]),
+            "values": np.concatenate(parts["value"]),
+            "created_at": np.concatenate(parts["created_at"]),
+            "ids": np.concatenate(parts["id"]),
+        }
+
+        # Already archived rows go first so they win over late duplicates
+        existing = self._load_day_rows(day)
+        if existing is not None:
+            old_unit_ids, old_types, old_units, old_columns = existing
+            unit_ids = np.concatenate([old_unit_ids, unit_ids])
+            sensor_types = np.concatenate([old_types, sensor_types])
+            units = np.concatenate([old_units, units])
+            columns = {name: np.concatenate([old_columns[name], columns[name]]) for name in COLUMN_FILES}
+
+        # Stable sort by series then time; drop repeated (series, timestamp)
+        order = np.lexsort((columns["timestamps"], sensor_types, unit_ids))
+        unit_ids, sensor_types, units = unit_ids[order], sensor_types[order], units[order]
+        columns = {name: column[order] for name, column in columns.items()}
+        same_series = (unit_ids[1:] == unit_ids[:-1]) & (sensor_types[1:] == sensor_types[:-1])
+        keep = np.concatenate(([True], ~(same_series & (columns["timestamps"][1:] == columns["timestamps"][:-1]))))
+        unit_ids, sensor_types, units = unit_ids[keep], sensor_types[keep], units[keep]
+        columns = {name: column[keep] for name, column in columns.items()}
+
+        new_series = np.concatenate((
+            [True], (unit_ids[1:] != unit_ids[:-1]) | (sensor_types[1:] != sensor_types[:-1])
+        ))
+        starts = np.flatnonzero(new_series)
+        counts = np.diff(np.append(starts, len(unit_ids)))
+        series = {
+            _series_key(unit_ids[offset], sensor_types[offset]): [int(offset), int(count), str(units[offset])]
+            for offset, count in zip(starts, counts)
+        }
+
+        self._replace_day(day, columns, series)
+        self.days_written += 1
+        logger.info(
+            "Archived sensor readings",
+            extra={"day": day.isoformat(), "rows": rows, "archived_rows": len(unit_ids), "series": len(series)},
+        )
+        return rows
+
+    def _replace_day(self, day: date, columns: Dict[str, Any], series: Dict[str, List[Any]]) -> None:
+        """Write a day to a new version directory, fsync it and switch the day's link to it."""
+        import numpy as np
+
+        os.makedirs(self.root, exist_ok=True)
+        final = self._day_path(day)
+        version = f".{day.isoformat()}.{uuid.uuid4().hex}"
+        staging = os.path.join(self.root, version)
+        link = f"{staging}.link"
+        os.makedirs(staging)
+        try:
+            for name in COLUMN_FILES:
+                with open(os.path.join(staging, f"{name}.npy"), "wb") as f:
+                    np.save(f, columns[name])
+                    f.flush()
+                    os.fsync(f.fileno())
+            with open(os.path.join(staging, INDEX_FILE), "w") as f:
+                json.dump(
+                    {"version": ARCHIVE_VERSION, "day": day.isoformat(), "rows": len(columns["timestamps"]),
+                     "series": series},
+                    f,
+                )
+                f.flush()
+                os.fsync(f.fileno())
+
+            try:
+                previous = os.path.join(self.root, os.readlink(final))
+            except FileNotFoundError:
+                previous = None
+            # rename() over the old link is atomic: the day never goes missing
+            os.symlink(version, link)
+            os.replace(link, final)
+            dir_fd = os.open(self.root, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except Exception:
+            if os.path.lexists(link):
+                os.unlink(link)
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if previous:
+            # Open memory maps of the old files stay valid after unlinking
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def iter_export(
+        self,
+        unit_ids: Optional[Sequence[Any]] = None,
+        sensor_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_rows: int = 5000,
+    ) -> Iterator[List[tuple]]:
+        """
+        Yield archived readings as export rows in lists of up to batch_rows.
+
+        Rows are (unit_id, sensor_type, timestamp, value, unit) with
+        start <= timestamp < end, in ``export_order``, like the export query.
+        """
+        import numpy as np
+
+        start = to_utc_naive(start) if start is not None else None
+        end = to_utc_naive(end) if end is not None else None
+        days = [
+            day for day in self.days()
+            if (start is None or day >= start.date()) and (end is None or day <= end.date())
+        ]
+        opened = [archived for archived in map(self._get_day, days) if archived is not None]
+
+        wanted_units = {str(unit_id).lower() for unit_id in unit_ids} if unit_ids else None
+        wanted_types = set(sensor_types) if sensor_types else None
+        keys = set()
+        for archived in opened:
+            for key in archived.series:
+                unit_id, sensor_type = key.split(":", 1)
+                if (wanted_units is None or unit_id in wanted_units) and (
+                    wanted_types is None or sensor_type in wanted_types
+                ):
+                    keys.add((unit_id, sensor_type))
+
+        start_us = int(_micros([start])[0]) if start is not None else None
+        end_us = int(_micros([end])[0]) if end is not None else None
+        batch: List[tuple] = []
+        for unit_id, sensor_type in sorted(keys, key=lambda key: export_order(key + (None,))):
+            key = _series_key(unit_id, sensor_type)
+            # Days in order, timestamps sorted within each: the series comes out in time order
+            for archived in opened:
+                entry = archived.series.get(key)
+                if entry is None:
+                    continue
+                offset, count, measurement_unit = entry
+                timestamps = archived.columns["timestamps"][offset:offset + count]
+                lo = offset + (int(np.searchsorted(timestamps, start_us, side="left")) if start_us is not None else 0)
+                hi = offset + (int(np.searchsorted(timestamps, end_us, side="left")) if end_us is not None else count)
+                for ts, value in zip(
+                    archived.columns["timestamps"][lo:hi].tolist(),
+                    archived.columns["values"][lo:hi].tolist(),
+                ):
+                    batch.append((unit_id, sensor_type, _from_micros(ts), value, measurement_unit))
+                    if len(batch) >= batch_rows:
+                        self.rows_read += len(batch)
+                        yield batch
+                        batch = []
+        if batch:
+            self.rows_read += len(batch)
+            yield batch
+        self.reads += 1
+
+    def stats(self) -> Dict[str, Any]:
+        days = self.days()
+        return {
+            "days": len(days),
+            "oldest_day": days[0].isoformat() if days else None,
+            "newest_day": days[-1].isoformat() if days else None,
+            "open_days": len(self._open),
+            "reads": self.reads,
+            "rows_read": self.rows_read,
+            "days_written": self.days_written,
+        }
+
+
+def merge_readings(
+    database_readings: List[Dict[str, Any]],
+    archived_readings: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Combine readings from the database and the archive in timestamp order.
+
+    A reading can briefly exist in both (archived, not yet deleted); the
+    database copy is kept.
+    """
+    if not archived_readings:
+        return database_readings
+    stored = {reading["timestamp"] for reading in database_readings}
+    merged = database_readings + [r for r in archived_readings if r["timestamp"] not in stored]
+    merged.sort(key=lambda reading: reading["timestamp"])
+    return merged
+
+
+def merge_export_batches(
+    database_batches: Iterable[List[tuple]],
+    archived_batches: Iterable[List[tuple]],
+    batch_rows: int = 5000,
+) -> Iterator[List[tuple]]:
+    """Merge two streams of export rows, each in ``export_order``, into one.
+
+    A reading archived but not yet deleted appears in both; the database
+    copy is kept.
+    """
+    rows = heapq.merge(
+        chain.from_iterable(database_batches), chain.from_iterable(archived_batches), key=export_order
+    )
+    batch: List[tuple] = []
+    previous = None
+    for row in rows:
+        key = row[:3]
+        if key == previous:
+            continue
+        previous = key
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def archive_cutoff(now: datetime, after_days: int) -> datetime:
+    """Start of the newest day that is not archived yet.
+
+    Never inside the sensor window cache's range, which is filled from the
+    database only.
+    """
+    latest = min(now - timedelta(days=after_days), now - timedelta(hours=get_settings().timeseries_cache_window_hours))
+    return datetime.combine(latest.date(), datetime.min.time())
+
+
+sensor_archive = LazySingleton(SensorArchive.from_settings)
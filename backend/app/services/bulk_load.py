@@ -0,0 +1,286 @@
+"""Bulk loading of sensor readings through PostgreSQL COPY.
+
+Readings are generated or read as NumPy column arrays, formatted into
+COPY text with vectorized string operations and streamed with
+``COPY ... FROM STDIN``. Used by the ``backfill.py`` CLI and the benchmark
+data generator; heavy dependencies (NumPy, PyArrow) are imported lazily.
+
+COPY cannot skip conflicting rows, so rows are copied into a per-connection
+staging table and moved into ``sensor_readings`` with
+``INSERT ... SELECT ... ON CONFLICT DO NOTHING``. Re-running a backfill or
+importing overlapping files therefore never duplicates readings.
+"""
+import io
+import math
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, Optional, Sequence, Tuple, Union
+from sqlalchemy.engine import make_url
+from app.logging_config import get_logger
+
+logger = get_logger("services.bulk_load")
+
+# Mirrors the sensor profiles used by seed_data.py
+SENSOR_PROFILES = {
+    "co2": {"base": 420, "variation": 50, "unit": "ppm"},
+    "temperature": {"base": 25, "variation": 5, "unit": "°C"},
+    "airflow": {"base": 45, "variation": 10, "unit": "m³/s"},
+    "efficiency": {"base": 85, "variation": 8, "unit": "%"},
+}
+
+# ``id`` is filled in by the column's server default (gen_random_uuid())
+COPY_COLUMNS = ("unit_id", "sensor_type", "value", "unit", "timestamp", "created_at")
+_COLUMN_LIST = ", ".join(COPY_COLUMNS)
+
+# Emptied on every commit, so one staging table serves all batches of a connection
+STAGING_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS sensor_readings_staging ON COMMIT DELETE ROWS AS "
+    f"SELECT {_COLUMN_LIST} FROM sensor_readings WITH NO DATA"
+)
+COPY_SQL = f"COPY sensor_readings_staging ({_COLUMN_LIST}) FROM STDIN"
+MERGE_SQL = (
+    f"INSERT INTO sensor_readings ({_COLUMN_LIST}) "
+    f"SELECT {_COLUMN_LIST} FROM sensor_readings_staging "
+    "ON CONFLICT (unit_id, sensor_type, timestamp) DO NOTHING"
+)
+
+# Columns an import file must provide (after applying the column map)
+IMPORT_COLUMNS = ("unit_id", "sensor_type", "value", "unit", "timestamp")
+
+# sensor_readings.unit is String(50); longer values would fail the whole COPY
+UNIT_MAX_LENGTH = 50
+
+# COPY text format escapes; the backslash must be escaped first
+_COPY_ESCAPES = (("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r"))
+
+
+def to_psycopg2_dsn(database_url: str) -> str:
+    """Convert a SQLAlchemy URL (possibly with a +driver suffix) to a libpq DSN."""
+    url = make_url(database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+def _copy_text(column):
+    """A string column (or scalar) with COPY text delimiters escaped."""
+    import numpy as np
+
+    text = np.asarray(column, dtype=str)
+    for raw, escaped in _COPY_ESCAPES:
+        # Checking first is much cheaper than replacing when nothing matches
+        if (np.char.find(text, raw) >= 0).any():
+            text = np.char.replace(text, raw, escaped)
+    return text
+
+
+def format_copy_rows(
+    unit_ids,
+    sensor_types,
+    values,
+    units,
+    timestamps,
+    created_at: datetime,
+) -> bytes:
+    """
+    Format column arrays as COPY text rows.
+
+    Args:
+        unit_ids, sensor_types, units: string arrays (or scalars to broadcast);
+            tabs, newlines and backslashes are escaped
+        values: float array
+        timestamps: ``datetime64`` array (naive UTC)
+        created_at: value for every row's created_at
+
+    Returns:
+        UTF-8 encoded, newline-terminated COPY text
+    """
+    import numpy as np
+
+    if len(values) == 0:
+        return b""
+    value_text = np.round(np.asarray(values, dtype=np.float64), 2).astype(str)
+    ts_text = np.datetime_as_string(np.asarray(timestamps, dtype="datetime64[us]"), unit="us")
+
+    add = np.char.add
+    line = add(add(_copy_text(unit_ids), "\t"), _copy_text(sensor_types))
+    line = add(add(line, "\t"), value_text)
+    line = add(add(line, "\t"), _copy_text(units))
+    line = add(add(line, "\t"), ts_text)
+    line = add(line, f"\t{created_at.isoformat(sep=' ')}\n")
+    return "".join(line.tolist()).encode("utf-8")
+
+
+def copy_rows(conn, payload: bytes) -> int:
+    """
+    COPY preformatted rows into sensor_readings and commit.
+
+    Returns:
+        Rows inserted; rows whose reading is already stored are skipped
+    """
+    if not payload:
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute(STAGING_SQL)
+        cursor.copy_expert(COPY_SQL, io.BytesIO(payload))
+        cursor.execute(MERGE_SQL)
+        inserted = cursor.rowcount
+    conn.commit()
+    return inserted
+
+
+def generate_unit_readings(
+    start: datetime,
+    end: datetime,
+    cadence_seconds: int,
+    seed: Optional[int] = None,
+) -> Iterator[Tuple[str, "object", "object", str]]:
+    """
+    Generate synthetic readings for every sensor of a unit in [start, end).
+
+    Yields:
+        (sensor_type, timestamps, values, measurement unit) per sensor type
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(
+        np.datetime64(start, "s"), np.datetime64(end, "s"), np.timedelta64(cadence_seconds, "s")
+    )
+    elapsed_hours = (timestamps - np.datetime64(start, "s")).astype(np.float64) / 3600
+    phase = rng.random() * math.tau
+    trend = np.sin(elapsed_hours + phase) * 0.3
+    for sensor_type, profile in SENSOR_PROFILES.items():
+        noise = (rng.random(len(timestamps)) - 0.5) * profile["variation"]
+        values = np.maximum(0.0, profile["base"] + trend * profile["variation"] + noise)
+        yield sensor_type, timestamps, values, profile["unit"]
+
+
+def backfill_unit(
+    conn,
+    unit_id: str,
+    start: datetime,
+    end: datetime,
+    cadence_seconds: int,
+    seed: Optional[int] = None,
+) -> int:
+    """Generate and COPY one unit's readings for [start, end); returns rows written."""
+    created_at = datetime.utcnow()
+    chunks = [
+        format_copy_rows(unit_id, sensor_type, values, unit, timestamps, created_at)
+        for sensor_type, timestamps, values, unit in generate_unit_readings(
+            start, end, cadence_seconds, seed
+        )
+    ]
+    return copy_rows(conn, b"".join(chunks))
+
+
+def iter_import_batches(
+    path: Union[str, BinaryIO],
+    batch_rows: int = 250_000,
+    row_groups: Optional[Sequence[int]] = None,
+    column_map: Optional[Dict[str, str]] = None,
+):
+    """
+    Stream record batches from a CSV or Parquet export.
+
+    Args:
+        path: ``.csv``/``.csv.gz`` or ``.parquet`` file, or an open Parquet file
+        batch_rows: rows per batch (bounds memory)
+        row_groups: Parquet row groups to read (default: all)
+        column_map: source column name -> sensor_readings column name
+
+    Yields:
+        ``pyarrow.RecordBatch`` objects with IMPORT_COLUMNS names
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    column_map = column_map or {}
+    string_targets = ("unit_id", "sensor_type", "unit")
+    string_columns = [source for source, target in column_map.items() if target in string_targets]
+    string_columns += [name for name in string_targets if name not in column_map.values()]
+
+    def _rename(batch):
+        names = [column_map.get(name, name) for name in batch.schema.names]
+        return pa.RecordBatch.from_arrays(batch.columns, names=names)
+
+    if not isinstance(path, str) or path.endswith(".parquet"):
+        parquet = pq.ParquetFile(path)
+        source_columns = [
+            name for name in parquet.schema_arrow.names
+            if column_map.get(name, name) in IMPORT_COLUMNS
+        ]
+        for batch in parquet.iter_batches(
+            batch_size=batch_rows, row_groups=row_groups, columns=source_columns
+        ):
+            yield _rename(batch)
+    else:
+        reader = pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(block_size=64 * 1024 * 1024),
+            # Keep IDs and labels as text instead of letting type inference guess
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in string_columns}
+            ),
+        )
+        for batch in reader:
+            yield _rename(batch)
+
+
+def import_batch(conn, batch, known_unit_ids, created_at: Optional[datetime] = None) -> Tuple[int, int]:
+    """
+    Validate one imported batch and COPY its valid rows.
+
+    Rows with an unknown unit, unknown sensor type, missing value, or a
+    missing or over-long measurement unit are rejected rather than failing
+    the whole COPY. Repeated readings of the
+    same sensor and instant are dropped in memory, and readings that are
+    already stored are skipped by the insert.
+
+    Returns:
+        (rows inserted, rows rejected or skipped as duplicates)
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    missing = [name for name in IMPORT_COLUMNS if name not in batch.schema.names]
+    if missing:
+        raise ValueError(f"Import file is missing columns: {', '.join(missing)}")
+
+    table = pa.Table.from_batches([batch])
+    unit_ids = np.asarray(
+        pc.utf8_lower(pc.cast(table["unit_id"], pa.string())).to_numpy(zero_copy_only=False), dtype=str
+    )
+    sensor_types = np.asarray(
+        pc.utf8_lower(pc.cast(table["sensor_type"], pa.string())).to_numpy(zero_copy_only=False), dtype=str
+    )
+    unit_text = pc.cast(table["unit"], pa.string())
+    unit_lengths = pc.fill_null(pc.utf8_length(unit_text), 0).to_numpy(zero_copy_only=False)
+    units = np.asarray(pc.fill_null(unit_text, "").to_numpy(zero_copy_only=False), dtype=str)
+    values = pc.cast(table["value"], pa.float64()).to_numpy(zero_copy_only=False)
+    timestamps = pc.cast(table["timestamp"], pa.timestamp("us")).to_numpy(zero_copy_only=False)
+
+    valid = (
+        np.isin(unit_ids, known_unit_ids)
+        & np.isin(sensor_types, list(SENSOR_PROFILES))
+        & ~np.isnan(values)
+        & ~np.isnat(timestamps)
+        & (unit_lengths > 0)
+        & (unit_lengths <= UNIT_MAX_LENGTH)
+    )
+    keep = np.flatnonzero(valid)
+
+    # First occurrence of each (unit_id, sensor_type, timestamp) within the batch
+    key = np.char.add(
+        np.char.add(unit_ids[keep], sensor_types[keep]),
+        timestamps[keep].astype(np.int64).astype(str),
+    )
+    _, first = np.unique(key, return_index=True)
+    keep = keep[np.sort(first)]
+
+    payload = format_copy_rows(
+        unit_ids[keep], sensor_types[keep], values[keep], units[keep], timestamps[keep],
+        created_at or datetime.utcnow(),
+    )
+    inserted = copy_rows(conn, payload)
+    return inserted, len(valid) - inserted
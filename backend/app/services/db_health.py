@@ -0,0 +1,142 @@
+"""Background-refreshed database health for the readiness probe.
+
+Orchestrators probe every worker every few seconds; running ``SELECT 1`` on
+each probe adds steady load and takes pool connections away from requests.
+Instead one background job per process checks the primary every
+``HEALTH_CHECK_INTERVAL_SECONDS`` and ``/readyz`` reads the cached result,
+so a probe never touches the database.
+
+A process is not ready when warmup has not finished, the last check failed,
+the last successful check is older than ``HEALTH_STALE_AFTER_CHECKS``
+intervals (the check itself is stuck, e.g. waiting for a pool connection),
+or the share of pool connections checked out reaches
+``HEALTH_POOL_SATURATION``, so the load balancer shifts traffic to workers
+that can take it.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import text
+from app.database import get_engine, get_settings, pool_sizes
+from app.logging_config import get_logger
+from app.utils.lazy import LazySingleton
+
+logger = get_logger("services.db_health")
+
+_CHECK_SQL = text("SELECT 1")
+
+
+class DatabaseHealthMonitor:
+    """Last known health of the primary database and this process's pool."""
+
+    def __init__(self, interval_seconds: float, stale_after_checks: int, pool_saturation: float):
+        self.interval_seconds = interval_seconds
+        self.stale_after_checks = stale_after_checks
+        self.pool_saturation = pool_saturation
+        self.healthy: Optional[bool] = None  # None until the first check
+        self.latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[datetime] = None
+        self._last_success: Optional[float] = None  # time.monotonic()
+        self.checks = 0
+        self.failures = 0
+
+    @classmethod
+    def from_settings(cls) -> "DatabaseHealthMonitor":
+        settings = get_settings()
+        return cls(
+            interval_seconds=settings.health_check_interval_seconds,
+            stale_after_checks=settings.health_stale_after_checks,
+            pool_saturation=settings.health_pool_saturation,
+        )
+
+    def check(self) -> None:
+        """Run one connectivity check against the primary and record the result."""
+        started = time.perf_counter()
+        try:
+            with get_engine().connect() as conn:
+                conn.execute(_CHECK_SQL)
+            healthy, error = True, None
+            self._last_success = time.monotonic()
+        except Exception as e:
+            healthy, error = False, str(e)
+            self.failures += 1
+        self.checks += 1
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_error = error
+        self.last_checked = datetime.utcnow()
+
+        if healthy != self.healthy:
+            log = logger.info if healthy else logger.error
+            log(
+                "Database reachable" if healthy else "Database health check failed",
+                extra={"latency_ms": self.latency_ms, "error": error},
+            )
+        self.healthy = healthy
+
+    def pool_usage(self) -> Dict[str, Any]:
+        """Connections checked out of this process's primary pool against its capacity."""
+        pool = get_engine().pool
+        pool_size, max_overflow = pool_sizes()
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        capacity = pool_size + max_overflow if max_overflow >= 0 else None
+        return {
+            "checked_out": checked_out,
+            "capacity": capacity,
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+        }
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """Whether this process should receive traffic, and why; never touches the database."""
+        from app.services.warmup import warmup_state
+
+        pool = self.pool_usage()
+        age = None if self._last_success is None else time.monotonic() - self._last_success
+
+        if warmup_state.status == "failed":
+            status = "schema_behind"
+        elif not warmup_state.ready or self.healthy is None:
+            status = "starting"
+        elif not self.healthy:
+            status = "database_unreachable"
+        elif age > self.interval_seconds * self.stale_after_checks:
+            status = "database_check_stale"
+        elif pool["saturation"] is not None and pool["saturation"] >= self.pool_saturation:
+            status = "pool_saturated"
+        else:
+            status = "ready"
+
+        return status == "ready", {
+            "status": status,
+            "warmup": warmup_state.status,
+            "database": {
+                "healthy": self.healthy,
+                "latency_ms": self.latency_ms,
+                "last_success_seconds_ago": None if age is None else round(age, 1),
+                "error": self.last_error,
+            },
+            "pool": pool,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "checks": self.checks,
+            "failures": self.failures,
+            "latency_ms": self.latency_ms,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+            "last_error": self.last_error,
+            "pool": self.pool_usage(),
+        }
+
+
+db_health = LazySingleton(DatabaseHealthMonitor.from_settings)
+
+
+async def run_health_checks() -> None:
+    """Check the database now and then every interval, off the event loop."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.to_thread(db_health.check)
+        await asyncio.sleep(max(0.0, db_health.interval_seconds - (time.perf_counter() - started)))
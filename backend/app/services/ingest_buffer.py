@@ -0,0 +1,352 @@
+"""Group commit for single-reading POSTs.
+
+Gateways that send one reading per request would otherwise pay a full
+transaction (and WAL fsync) per reading. With ``INGEST_GROUP_COMMIT``
+enabled, ``create_sensor_reading`` hands the reading to this buffer instead;
+a background thread writes everything buffered in one multi-row INSERT
+every ``INGEST_FLUSH_INTERVAL_MS`` or as soon as ``INGEST_FLUSH_MAX_ROWS``
+readings are waiting.
+
+Modes:
+    durable: the request waits for the flush that commits its reading
+    ack: the request returns as soon as the reading is buffered; readings
+        still buffered when the process dies are lost
+
+Each flush drops duplicates within the batch in memory and inserts with
+``ON CONFLICT DO NOTHING`` on (unit_id, sensor_type, timestamp), so a
+gateway retry resolves to the reading that is already stored. Readings are
+only appended to the time-series cache and published to other workers after
+their flush commits. Every reading's future is resolved, with its result or
+an exception, even if a flush fails unexpectedly, and the flush thread is
+restarted if it ever dies.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import models, schemas
+from app.cache import get_cache
+from app.database import get_session_factory, get_settings
+from app.logging_config import get_logger
+from app.services.timeseries_cache import timeseries_cache, to_utc_naive, READINGS_CHANNEL
+from app.utils import queries
+from app.utils.database import transaction
+from app.utils.lazy import LazySingleton
+from app.utils.transformers import transform_sensor_reading
+
+logger = get_logger("services.ingest_buffer")
+
+GROUP_COMMIT_MODES = ("off", "durable", "ack")
+
+# A reading is identified by its sensor and instant (unique index on sensor_readings)
+DEDUP_COLUMNS = ("unit_id", "sensor_type", "timestamp")
+
+ReadingKey = Tuple[UUID, models.SensorTypeEnum, datetime]
+
+
+class BufferFullError(RuntimeError):
+    """Too many readings are waiting to be flushed."""
+
+
+class UnitNotFoundError(LookupError):
+    """The reading's unit does not exist."""
+
+
+def prepare_reading(reading: schemas.SensorReadingCreate) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build the insert row and API response for a new reading.
+
+    ID and created_at are assigned here rather than by the database so the
+    response can be built without reading the row back.
+
+    Returns:
+        (sensor_readings row, reading in transformer format)
+    """
+    sensor_type = reading.sensor_type.value if hasattr(reading.sensor_type, 'value') else str(reading.sensor_type)
+    row = {
+        "id": uuid.uuid4(),
+        "unit_id": reading.unit_id,
+        "sensor_type": models.SensorTypeEnum(sensor_type),
+        "value": round(reading.value, 2),  # Numeric(10, 2)
+        "unit": reading.unit,
+        "timestamp": to_utc_naive(reading.timestamp),
+        "created_at": datetime.utcnow(),
+    }
+    return row, {**row, "sensor_type": sensor_type}
+
+
+def reading_key(row: Dict[str, Any]) -> ReadingKey:
+    return row["unit_id"], row["sensor_type"], row["timestamp"]
+
+
+def insert_ignoring_duplicates():
+    """INSERT into sensor_readings that skips already stored readings and returns inserted IDs."""
+    return (
+        insert(models.SensorReading)
+        .on_conflict_do_nothing(index_elements=list(DEDUP_COLUMNS))
+        .returning(models.SensorReading.id)
+    )
+
+
+def find_stored_readings(db: Session, keys: Iterable[ReadingKey]) -> Dict[ReadingKey, Dict[str, Any]]:
+    """Load the stored readings for the given keys (transformer format)."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    reading = models.SensorReading
+    stored = db.execute(
+        select(reading).where(tuple_(reading.unit_id, reading.sensor_type, reading.timestamp).in_(keys))
+    ).scalars()
+    return {
+        (r.unit_id, r.sensor_type, r.timestamp): transform_sensor_reading(r)
+        for r in stored
+    }
+
+
+class GroupCommitBuffer:
+    """Collect single readings and commit them in multi-row batches."""
+
+    def __init__(
+        self,
+        mode: str = "durable",
+        flush_interval_ms: int = 10,
+        max_batch_rows: int = 500,
+        max_pending_rows: int = 50_000,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ):
+        if mode not in GROUP_COMMIT_MODES:
+            raise ValueError(f"mode must be one of {', '.join(GROUP_COMMIT_MODES)}")
+        self.mode = mode
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_rows = max_batch_rows
+        self.max_pending_rows = max_pending_rows
+        self.session_factory = session_factory
+
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[Dict[str, Any], Dict[str, Any], Future, float]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._known_units: Set[UUID] = set()
+
+        self.flushes = 0
+        self.rows_committed = 0
+        self.rows_duplicate = 0
+        self.rows_failed = 0
+        self.flush_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "GroupCommitBuffer":
+        settings = get_settings()
+        return cls(
+            mode=settings.ingest_group_commit,
+            flush_interval_ms=settings.ingest_flush_interval_ms,
+            max_batch_rows=settings.ingest_flush_max_rows,
+            max_pending_rows=settings.ingest_max_pending_rows,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def unit_exists(self, db: Session, unit_id: UUID) -> bool:
+        """Check a unit exists, remembering hits so steady ingest skips the lookup."""
+        if unit_id in self._known_units:
+            return True
+        exists = db.execute(queries.UNIT_EXISTS, {"unit_id": unit_id}).first() is not None
+        if exists:
+            self._known_units.add(unit_id)
+        return exists
+
+    def remember_units(self, unit_ids: Iterable[UUID]) -> None:
+        """Mark units as known, e.g. from startup warmup."""
+        self._known_units.update(unit_ids)
+
+    def submit(self, reading: schemas.SensorReadingCreate) -> Tuple[Dict[str, Any], Future]:
+        """
+        Buffer a reading for the next flush.
+
+        Returns:
+            The reading as the API returns it and a future resolved once it
+            is committed (with the stored reading if it was a duplicate)
+
+        Raises:
+            BufferFullError: if max_pending_rows readings are already waiting
+        """
+        row, result = prepare_reading(reading)
+        future: Future = Future()
+
+        with self._cond:
+            if len(self._pending) >= self.max_pending_rows:
+                raise BufferFullError(f"{len(self._pending)} readings are waiting to be flushed")
+            if self._thread is None or not self._thread.is_alive():
+                self._start()
+            self._pending.append((row, result, future, time.monotonic()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_rows:
+                self._cond.notify()
+        return result, future
+
+    def _start(self) -> None:
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="ingest-group-commit", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Give the oldest reading up to flush_interval to gather company
+                deadline = self._pending[0][3] + self.flush_interval
+                while len(self._pending) < self.max_batch_rows and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_rows]
+                del self._pending[:self.max_batch_rows]
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[Dict[str, Any], Dict[str, Any], Future, float]]) -> None:
+        """Write a batch; never raises, so the flush thread survives any failure."""
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            unresolved = [future for _, _, future, _ in batch if not future.done()]
+            self.rows_failed += len(unresolved)
+            logger.error(
+                "Dropped acknowledged sensor readings" if self.mode == "ack" else "Group commit flush failed",
+                extra={"rows": len(unresolved), "error": str(e)},
+                exc_info=True,
+            )
+            for future in unresolved:
+                future.set_exception(e)
+
+    def _write_batch(self, batch: List[Tuple[Dict[str, Any], Dict[str, Any], Future, float]]) -> None:
+        started = time.perf_counter()
+        # Retries of the same reading within the batch share the first copy
+        first_index: Dict[ReadingKey, int] = {}
+        for index, (row, _, _, _) in enumerate(batch):
+            first_index.setdefault(reading_key(row), index)
+        unique = list(first_index.values())
+
+        inserted: Set[UUID] = set()
+        errors: Dict[int, Exception] = {}
+        stored: Dict[ReadingKey, Dict[str, Any]] = {}
+        db = (self.session_factory or get_session_factory())()
+        try:
+            try:
+                with transaction(db):
+                    inserted.update(db.execute(
+                        insert_ignoring_duplicates(), [batch[index][0] for index in unique]
+                    ).scalars())
+            except Exception as e:
+                # One bad row (e.g. its unit was just deleted) must not fail
+                # the whole group: retry row by row
+                logger.warning(
+                    "Group commit failed, retrying readings individually",
+                    extra={"rows": len(unique), "error": str(e)},
+                )
+                for index in unique:
+                    row = batch[index][0]
+                    try:
+                        with transaction(db):
+                            inserted.update(db.execute(insert_ignoring_duplicates(), [row]).scalars())
+                    except IntegrityError:
+                        errors[index] = UnitNotFoundError(f"Unit not found: {row['unit_id']}")
+                        self._known_units.discard(row["unit_id"])
+                    except Exception as row_error:
+                        errors[index] = row_error
+
+            duplicates = [
+                reading_key(batch[index][0]) for index in unique
+                if index not in errors and batch[index][0]["id"] not in inserted
+            ]
+            if duplicates:
+                try:
+                    stored = find_stored_readings(db, duplicates)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logger.warning("Failed to load stored duplicates", extra={"error": str(e)})
+        finally:
+            db.close()
+
+        committed = [batch[index][1] for index in unique if batch[index][0]["id"] in inserted]
+        self.flushes += 1
+        self.rows_committed += len(committed)
+        self.rows_duplicate += len(batch) - len(committed) - len(errors)
+        self.rows_failed += len(errors)
+        self.flush_seconds += time.perf_counter() - started
+
+        if committed:
+            self._publish(committed)
+
+        for row, result, future, _ in batch:
+            key = reading_key(row)
+            index = first_index[key]
+            if index in errors:
+                if self.mode == "ack":
+                    logger.error(
+                        "Dropped acknowledged sensor reading",
+                        extra={"unit_id": str(row["unit_id"]), "error": str(errors[index])},
+                    )
+                future.set_exception(errors[index])
+            elif batch[index][0]["id"] in inserted:
+                future.set_result(batch[index][1])
+            else:
+                future.set_result(stored.get(key, batch[index][1]))
+
+        logger.debug(
+            "Flushed sensor readings",
+            extra={"rows": len(committed), "duplicates": len(batch) - len(committed) - len(errors)},
+        )
+
+    def _publish(self, committed: List[Dict[str, Any]]) -> None:
+        """Hand committed readings to the caches; the readings are stored either way."""
+        try:
+            timeseries_cache.append_many(committed)
+        except Exception as e:
+            logger.error("Failed to append readings to the sensor window cache", extra={"error": str(e)})
+            # The cached series may now lack these readings; reload them from the database
+            for result in committed:
+                timeseries_cache.invalidate(result["unit_id"], result["sensor_type"])
+        try:
+            cache = get_cache()
+            for result in committed:
+                cache.publish(READINGS_CHANNEL, result)
+        except Exception as e:
+            logger.warning("Failed to publish committed readings", extra={"error": str(e)})
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush everything still buffered and stop the flush thread."""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._thread = None
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "rows_committed": self.rows_committed,
+            "rows_duplicate": self.rows_duplicate,
+            "rows_failed": self.rows_failed,
+            "avg_batch_rows": round(self.rows_committed / self.flushes, 1) if self.flushes else None,
+            "avg_flush_ms": round(self.flush_seconds / self.flushes * 1000, 2) if self.flushes else None,
+        }
+
+
+ingest_buffer = LazySingleton(GroupCommitBuffer.from_settings)
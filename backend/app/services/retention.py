@@ -0,0 +1,464 @@
+"""Sensor reading retention and tiered downsampling.
+
+Readings age through three tiers: raw rows in ``sensor_readings``, 1-minute
+aggregates and hourly aggregates in ``sensor_reading_rollups``. When a tier
+ages past its retention window its rows are folded into the next tier and
+deleted; the last tier is simply pruned. With the archive enabled, closed
+days of raw readings are first moved to the file archive
+(``app.services.archive``), rolled up on the way out.
+
+Work is done one time slice at a time, each slice in its own short
+transaction, so the job never holds long locks or writes one huge WAL burst.
+Rollups are merged additively, so re-running the job or receiving late
+readings for an already rolled-up bucket never loses counts.
+
+``rollup_readings`` serves the rolled-up tiers back as readings, so ranges
+older than raw retention still return data.
+
+Run once from the command line:
+    python -m app.services.retention
+"""
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import get_engine, get_session_factory, get_settings
+from app.logging_config import get_logger
+from app.services.archive import archive_cutoff, sensor_archive
+from app.services.timeseries_cache import to_utc_naive
+from app.utils.database import transaction
+
+logger = get_logger("services.retention")
+
+# Arbitrary application-wide key; only one worker runs the job at a time
+_ADVISORY_LOCK_KEY = 72_601
+
+# Namespace for the stable IDs given to rollup buckets served as readings
+_ROLLUP_ID_NAMESPACE = uuid.UUID("5b0f6d7e-3c1a-4f2e-9a8d-6e4b2c1f0a93")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """How long each tier is kept. ``None`` keeps a tier forever."""
+    raw_days: Optional[int] = 7
+    minute_days: Optional[int] = 90
+    hourly_days: Optional[int] = None
+    slice_minutes: int = 60
+    batch_size: int = 5000
+    batch_pause_ms: int = 50
+    archive_after_days: Optional[int] = None  # None: no archive tier
+
+    @classmethod
+    def from_settings(cls) -> "RetentionPolicy":
+        """Build the policy from application settings."""
+        settings = get_settings()
+        return cls(
+            raw_days=settings.retention_raw_days,
+            minute_days=settings.retention_minute_days,
+            hourly_days=settings.retention_hourly_days,
+            slice_minutes=settings.retention_slice_minutes,
+            batch_size=settings.retention_batch_size,
+            batch_pause_ms=settings.retention_batch_pause_ms,
+            archive_after_days=settings.archive_after_days if settings.archive_enabled else None,
+        )
+
+
+@dataclass
+class TierReport:
+    """Outcome of retention for a single tier."""
+    tier: str
+    cutoff: Optional[datetime] = None
+    rows_rolled_up: int = 0
+    rows_pruned: int = 0
+    rows_archived: int = 0
+    batches: int = 0
+
+
+@dataclass
+class RetentionReport:
+    """Outcome of a retention job run."""
+    started_at: datetime
+    duration_ms: float = 0.0
+    skipped: bool = False
+    tiers: List[TierReport] = field(default_factory=list)
+
+    @property
+    def rows_pruned(self) -> int:
+        return sum(tier.rows_pruned for tier in self.tiers)
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["rows_pruned"] = self.rows_pruned
+        return data
+
+
+# Raw readings -> 1-minute buckets. Merging is additive so a slice can be
+# rolled up more than once (e.g. late readings) without losing counts.
+_ROLLUP_RAW_SQL = text("""
+    INSERT INTO sensor_reading_rollups (
+        resolution, unit_id, sensor_type, bucket_start, unit,
+        value_count, value_sum, value_min, value_max
+    )
+    SELECT 'minute', unit_id, sensor_type, date_trunc('minute', timestamp), max(unit),
+           count(*), sum(value), min(value), max(value)
+    FROM sensor_readings
+    WHERE timestamp >= :lo AND timestamp < :hi
+    GROUP BY unit_id, sensor_type, date_trunc('minute', timestamp)
+    ON CONFLICT (resolution, unit_id, sensor_type, bucket_start) DO UPDATE SET
+        value_count = sensor_reading_rollups.value_count + EXCLUDED.value_count,
+        value_sum = sensor_reading_rollups.value_sum + EXCLUDED.value_sum,
+        value_min = LEAST(sensor_reading_rollups.value_min, EXCLUDED.value_min),
+        value_max = GREATEST(sensor_reading_rollups.value_max, EXCLUDED.value_max)
+""")
+
+_DELETE_RAW_SQL = text("""
+    DELETE FROM sensor_readings WHERE timestamp >= :lo AND timestamp < :hi
+""")
+
+_OLDEST_RAW_SQL = text("""
+    SELECT min(timestamp) FROM sensor_readings WHERE timestamp < :cutoff
+""")
+
+# Laid out as archive.ARCHIVE_ROW_COLUMNS
+_ARCHIVE_RAW_SQL = text("""
+    SELECT unit_id, sensor_type, unit, timestamp, value, id, created_at
+    FROM sensor_readings
+    WHERE timestamp >= :lo AND timestamp < :hi
+""")
+
+# 1-minute buckets -> hourly buckets
+_ROLLUP_MINUTE_SQL = text("""
+    INSERT INTO sensor_reading_rollups (
+        resolution, unit_id, sensor_type, bucket_start, unit,
+        value_count, value_sum, value_min, value_max
+    )
+    SELECT 'hour', unit_id, sensor_type, date_trunc('hour', bucket_start), max(unit),
+           sum(value_count), sum(value_sum), min(value_min), max(value_max)
+    FROM sensor_reading_rollups
+    WHERE resolution = 'minute' AND bucket_start >= :lo AND bucket_start < :hi
+    GROUP BY unit_id, sensor_type, date_trunc('hour', bucket_start)
+    ON CONFLICT (resolution, unit_id, sensor_type, bucket_start) DO UPDATE SET
+        value_count = sensor_reading_rollups.value_count + EXCLUDED.value_count,
+        value_sum = sensor_reading_rollups.value_sum + EXCLUDED.value_sum,
+        value_min = LEAST(sensor_reading_rollups.value_min, EXCLUDED.value_min),
+        value_max = GREATEST(sensor_reading_rollups.value_max, EXCLUDED.value_max)
+""")
+
+_DELETE_ROLLUP_SLICE_SQL = text("""
+    DELETE FROM sensor_reading_rollups
+    WHERE resolution = :resolution AND bucket_start >= :lo AND bucket_start < :hi
+""")
+
+_OLDEST_ROLLUP_SQL = text("""
+    SELECT min(bucket_start) FROM sensor_reading_rollups
+    WHERE resolution = :resolution AND bucket_start < :cutoff
+""")
+
+# Both tiers of one series; a bucket is only ever in one of them
+_ROLLUP_READINGS_SQL = text("""
+    SELECT resolution, bucket_start, unit, value_sum / value_count AS value
+    FROM sensor_reading_rollups
+    WHERE resolution IN ('minute', 'hour') AND unit_id = :unit_id AND sensor_type = :sensor_type
+      AND bucket_start >= :start AND bucket_start <= :end
+    ORDER BY bucket_start
+""")
+
+# Terminal tier: nothing to fold into, so delete in bounded batches
+_DELETE_ROLLUP_BATCH_SQL = text("""
+    DELETE FROM sensor_reading_rollups
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM sensor_reading_rollups
+        WHERE resolution = :resolution AND bucket_start < :cutoff
+        LIMIT :batch_size
+    ))
+""")
+
+
+def _floor(value: datetime, bucket: timedelta) -> datetime:
+    """Floor a datetime to a bucket boundary (minute or hour)."""
+    if bucket >= timedelta(hours=1):
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(second=0, microsecond=0)
+
+
+def _pause(policy: RetentionPolicy) -> None:
+    """Yield between batches so replicas and autovacuum can keep up."""
+    if policy.batch_pause_ms > 0:
+        time.sleep(policy.batch_pause_ms / 1000)
+
+
+def _fold_raw_into_minutes(policy: RetentionPolicy, cutoff: datetime) -> TierReport:
+    """Roll raw readings older than cutoff into 1-minute buckets and delete them."""
+    report = TierReport(tier="raw", cutoff=cutoff)
+    slice_width = timedelta(minutes=policy.slice_minutes)
+    db = get_session_factory()()
+    try:
+        while True:
+            oldest = db.execute(_OLDEST_RAW_SQL, {"cutoff": cutoff}).scalar()
+            db.commit()
+            if oldest is None:
+                break
+
+            lo = _floor(oldest, timedelta(minutes=1))
+            hi = min(lo + slice_width, cutoff)
+            with transaction(db):
+                report.rows_rolled_up += db.execute(_ROLLUP_RAW_SQL, {"lo": lo, "hi": hi}).rowcount
+                report.rows_pruned += db.execute(_DELETE_RAW_SQL, {"lo": lo, "hi": hi}).rowcount
+            report.batches += 1
+            _pause(policy)
+    finally:
+        db.close()
+    return report
+
+
+def _archive_raw(policy: RetentionPolicy, cutoff: datetime) -> TierReport:
+    """Move raw readings older than cutoff (a day boundary) to the archive, one day at a time."""
+    report = TierReport(tier="archive", cutoff=cutoff)
+    db = get_session_factory()()
+    try:
+        while True:
+            oldest = db.execute(_OLDEST_RAW_SQL, {"cutoff": cutoff}).scalar()
+            db.commit()
+            if oldest is None:
+                break
+
+            lo = datetime.combine(oldest.date(), datetime.min.time())
+            params = {"lo": lo, "hi": lo + timedelta(days=1)}
+            with transaction(db):
+                # One snapshot for archiving, rolling up and deleting the day, so
+                # readings committed meanwhile are neither lost nor deleted unarchived
+                db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+                result = db.execute(
+                    _ARCHIVE_RAW_SQL, params, execution_options={"yield_per": policy.batch_size}
+                )
+                report.rows_archived += sensor_archive.write_day(lo.date(), result.partitions())
+                if policy.minute_days != 0:
+                    report.rows_rolled_up += db.execute(_ROLLUP_RAW_SQL, params).rowcount
+                report.rows_pruned += db.execute(_DELETE_RAW_SQL, params).rowcount
+            report.batches += 1
+            _pause(policy)
+    finally:
+        db.close()
+    return report
+
+
+def _prune_raw(policy: RetentionPolicy, cutoff: datetime) -> TierReport:
+    """Delete raw readings older than cutoff without rolling them up."""
+    report = TierReport(tier="raw", cutoff=cutoff)
+    delete_sql = text("""
+        DELETE FROM sensor_readings
+        WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM sensor_readings WHERE timestamp < :cutoff LIMIT :batch_size
+        ))
+    """)
+    db = get_session_factory()()
+    try:
+        while True:
+            with transaction(db):
+                deleted = db.execute(
+                    delete_sql, {"cutoff": cutoff, "batch_size": policy.batch_size}
+                ).rowcount
+            if not deleted:
+                break
+            report.rows_pruned += deleted
+            report.batches += 1
+            _pause(policy)
+    finally:
+        db.close()
+    return report
+
+
+def _fold_minutes_into_hours(policy: RetentionPolicy, cutoff: datetime) -> TierReport:
+    """Roll 1-minute buckets older than cutoff into hourly buckets and delete them."""
+    report = TierReport(tier="minute", cutoff=cutoff)
+    # Minute buckets are ~60x sparser than raw readings, so use wider slices
+    slice_width = timedelta(minutes=policy.slice_minutes * 24)
+    db = get_session_factory()()
+    try:
+        while True:
+            oldest = db.execute(
+                _OLDEST_ROLLUP_SQL, {"resolution": "minute", "cutoff": cutoff}
+            ).scalar()
+            db.commit()
+            if oldest is None:
+                break
+
+            lo = _floor(oldest, timedelta(hours=1))
+            hi = min(lo + slice_width, cutoff)
+            params = {"resolution": "minute", "lo": lo, "hi": hi}
+            with transaction(db):
+                report.rows_rolled_up += db.execute(_ROLLUP_MINUTE_SQL, params).rowcount
+                report.rows_pruned += db.execute(_DELETE_ROLLUP_SLICE_SQL, params).rowcount
+            report.batches += 1
+            _pause(policy)
+    finally:
+        db.close()
+    return report
+
+
+def _prune_rollups(policy: RetentionPolicy, resolution: str, cutoff: datetime) -> TierReport:
+    """Delete rollups of one resolution older than cutoff in bounded batches."""
+    report = TierReport(tier=resolution, cutoff=cutoff)
+    db = get_session_factory()()
+    try:
+        while True:
+            with transaction(db):
+                deleted = db.execute(
+                    _DELETE_ROLLUP_BATCH_SQL,
+                    {"resolution": resolution, "cutoff": cutoff, "batch_size": policy.batch_size},
+                ).rowcount
+            if not deleted:
+                break
+            report.rows_pruned += deleted
+            report.batches += 1
+            _pause(policy)
+    finally:
+        db.close()
+    return report
+
+
+def rollup_readings(
+    db: Session, unit_id: uuid.UUID, sensor_type: str, start: datetime, end: datetime
+) -> List[Dict[str, Any]]:
+    """Rolled-up buckets of one series with start <= bucket_start <= end, as readings.
+
+    Each bucket becomes one reading holding its mean value, timestamped at
+    the bucket start, oldest first.
+    """
+    rows = db.execute(_ROLLUP_READINGS_SQL, {
+        "unit_id": unit_id, "sensor_type": sensor_type,
+        "start": to_utc_naive(start), "end": to_utc_naive(end),
+    }).all()
+    return [
+        {
+            "id": uuid.uuid5(_ROLLUP_ID_NAMESPACE, f"{row.resolution}:{unit_id}:{sensor_type}:{row.bucket_start.isoformat()}"),
+            "unit_id": unit_id,
+            "sensor_type": sensor_type,
+            "value": float(row.value),
+            "unit": row.unit,
+            "timestamp": row.bucket_start,
+            "created_at": row.bucket_start,
+        }
+        for row in rows
+    ]
+
+
+def merge_rollups(
+    readings: List[Dict[str, Any]], rollups: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Prepend rollups to raw readings, keeping only buckets older than the oldest reading.
+
+    Raw readings (stored or archived) cover everything from the oldest one
+    onwards; a bucket at or after it only holds readings that arrived late.
+    """
+    if readings:
+        rollups = [r for r in rollups if r["timestamp"] < readings[0]["timestamp"]]
+    return rollups + readings if rollups else readings
+
+
+def run_retention_job(policy: Optional[RetentionPolicy] = None) -> RetentionReport:
+    """
+    Apply the retention policy once.
+
+    Tiers are processed oldest-first in the direction data flows (raw, then
+    minute, then hour) so rows folded into a tier in this run are subject to
+    that tier's own retention window in the same run.
+
+    Only one process runs the job at a time; others return a skipped report.
+
+    Args:
+        policy: Retention policy to apply (defaults to the configured settings)
+
+    Returns:
+        Report with rows rolled up and pruned per tier, and the time taken
+    """
+    policy = policy or RetentionPolicy.from_settings()
+    report = RetentionReport(started_at=datetime.utcnow())
+    start = time.perf_counter()
+
+    with get_engine().connect() as lock_conn:
+        acquired = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}
+        ).scalar()
+        lock_conn.commit()
+        if not acquired:
+            logger.info("Retention job already running elsewhere, skipping")
+            report.skipped = True
+            return report
+
+        try:
+            now = report.started_at
+            if policy.archive_after_days is not None:
+                if policy.raw_days is not None and policy.raw_days <= policy.archive_after_days:
+                    logger.warning(
+                        "Raw readings are rolled up before they are old enough to archive",
+                        extra={"raw_days": policy.raw_days, "archive_after_days": policy.archive_after_days},
+                    )
+                report.tiers.append(_archive_raw(policy, archive_cutoff(now, policy.archive_after_days)))
+
+            if policy.raw_days is not None:
+                cutoff = _floor(now - timedelta(days=policy.raw_days), timedelta(minutes=1))
+                if policy.minute_days == 0:
+                    report.tiers.append(_prune_raw(policy, cutoff))
+                else:
+                    report.tiers.append(_fold_raw_into_minutes(policy, cutoff))
+
+            if policy.minute_days is not None:
+                cutoff = _floor(now - timedelta(days=policy.minute_days), timedelta(hours=1))
+                if policy.hourly_days == 0:
+                    report.tiers.append(_prune_rollups(policy, "minute", cutoff))
+                else:
+                    report.tiers.append(_fold_minutes_into_hours(policy, cutoff))
+
+            if policy.hourly_days is not None:
+                cutoff = _floor(now - timedelta(days=policy.hourly_days), timedelta(hours=1))
+                report.tiers.append(_prune_rollups(policy, "hour", cutoff))
+        finally:
+            lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY}
+            )
+            lock_conn.commit()
+
+    report.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(
+        "Retention job completed",
+        extra={
+            "rows_pruned": report.rows_pruned,
+            "duration_ms": report.duration_ms,
+            "tiers": {
+                tier.tier: {
+                    "rolled_up": tier.rows_rolled_up,
+                    "pruned": tier.rows_pruned,
+                    "archived": tier.rows_archived,
+                }
+                for tier in report.tiers
+            },
+        },
+    )
+    return report
+
+
+async def run_periodically(interval_seconds: float) -> None:
+    """Run the retention job forever, every ``interval_seconds``, off the event loop."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(run_retention_job)
+        except Exception as e:
+            logger.error(
+                "Retention job failed",
+                extra={"error": str(e), "error_type": type(e).__name__},
+                exc_info=True,
+            )
+
+
+if __name__ == "__main__":
+    from app.logging_config import setup_logging
+
+    setup_logging()
+    print(json.dumps(run_retention_job().as_dict(), default=str, indent=2))
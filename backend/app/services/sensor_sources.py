@@ -0,0 +1,171 @@
+"""Pluggable sources of live sensor values for the test executor.
+
+``SensorSource.fetch`` returns one metric for one unit. The executor fetches
+all metrics of a run concurrently, each bounded by a timeout, so a run takes
+as long as its slowest sensor rather than the sum of them.
+
+Backends (``SENSOR_SOURCE``):
+    simulator: random values within realistic ranges after a simulated delay
+    http: JSON sensor API over a pooled ``httpx.AsyncClient``
+"""
+import asyncio
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+from app.database import get_settings
+from app.logging_config import get_logger
+
+logger = get_logger("services.sensor_sources")
+
+# Metrics collected for every test run
+TEST_METRICS = ("co2_capture_rate", "energy_efficiency", "system_pressure")
+
+
+class SensorFetchError(RuntimeError):
+    """A sensor value could not be fetched."""
+
+
+class SensorSource(ABC):
+    """Async source of live sensor values."""
+
+    @abstractmethod
+    async def fetch(self, unit_id: UUID, metric: str) -> float:
+        """Return the current value of metric for unit."""
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+class SimulatedSensorSource(SensorSource):
+    """
+    Simulated sensors: values drawn from realistic ranges after a delay.
+
+    The delay stands in for a real sensor round-trip (a test run used to
+    block a thread for 2-5 seconds); it is awaited, so concurrent runs
+    overlap instead of queueing for threads.
+    """
+
+    RANGES: Dict[str, Tuple[float, float]] = {
+        "co2_capture_rate": (70, 95),
+        "energy_efficiency": (75, 98),
+        "system_pressure": (0.8, 2.0),
+    }
+
+    def __init__(self, latency: Tuple[float, float] = (2.0, 5.0)):
+        self.latency = latency
+
+    async def fetch(self, unit_id: UUID, metric: str) -> float:
+        if metric not in self.RANGES:
+            raise SensorFetchError(f"Unknown metric: {metric}")
+        await asyncio.sleep(random.uniform(*self.latency))
+        return random.uniform(*self.RANGES[metric])
+
+
+class HttpSensorSource(SensorSource):
+    """
+    Sensor API client: ``GET {base_url}/units/{unit_id}/metrics/{metric}``
+    returning ``{"value": <number>}``.
+
+    One ``httpx.AsyncClient`` is shared by all runs in the process, so
+    connections are pooled and kept alive across fetches.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 100, timeout: float = 5.0):
+        try:
+            import httpx
+        except ImportError as e:
+            raise RuntimeError(
+                "SENSOR_SOURCE=http requires the 'httpx' package. "
+                "Install it with: pip install httpx"
+            ) from e
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def fetch(self, unit_id: UUID, metric: str) -> float:
+        response = await self.client.get(f"/units/{unit_id}/metrics/{metric}")
+        if response.status_code != 200:
+            raise SensorFetchError(
+                f"Sensor API returned {response.status_code} for {metric} on unit {unit_id}"
+            )
+        try:
+            return float(response.json()["value"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise SensorFetchError(f"Malformed sensor API response for {metric}: {e}") from e
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_sensor_source() -> SensorSource:
+    """Build the source configured by ``SENSOR_SOURCE`` (simulator or http)."""
+    settings = get_settings()
+    name = settings.sensor_source.lower()
+    if name == "simulator":
+        return SimulatedSensorSource()
+    if name == "http":
+        if not settings.sensor_api_url:
+            raise ValueError("SENSOR_API_URL must be set when SENSOR_SOURCE=http")
+        return HttpSensorSource(
+            settings.sensor_api_url,
+            max_connections=settings.sensor_api_max_connections,
+            timeout=settings.sensor_fetch_timeout_seconds,
+        )
+    raise ValueError(f"Unknown SENSOR_SOURCE: {settings.sensor_source}")
+
+
+_source: Optional[SensorSource] = None
+
+
+def get_sensor_source() -> SensorSource:
+    """Return the process-wide sensor source, creating it on first use.
+
+    Only called from the event loop, so no lock is needed.
+    """
+    global _source
+    if _source is None:
+        _source = create_sensor_source()
+    return _source
+
+
+def set_sensor_source(source: Optional[SensorSource]) -> None:
+    """Replace the process-wide sensor source (e.g. with a simulator in tests)."""
+    global _source
+    _source = source
+
+
+async def close_sensor_source() -> None:
+    global _source
+    if _source is not None:
+        await _source.close()
+        _source = None
+
+
+async def collect_sensor_data(
+    unit_id: UUID,
+    source: Optional[SensorSource] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, float]:
+    """
+    Fetch every test metric for a unit concurrently.
+
+    Raises:
+        SensorFetchError: if any metric fails or exceeds ``timeout`` seconds
+    """
+    source = source or get_sensor_source()
+    timeout = timeout if timeout is not None else get_settings().sensor_fetch_timeout_seconds
+
+    async def _fetch(metric: str) -> float:
+        try:
+            return await asyncio.wait_for(source.fetch(unit_id, metric), timeout)
+        except asyncio.TimeoutError:
+            raise SensorFetchError(f"Timed out after {timeout}s fetching {metric}")
+
+    values = await asyncio.gather(*(_fetch(metric) for metric in TEST_METRICS))
+    return dict(zip(TEST_METRICS, values))
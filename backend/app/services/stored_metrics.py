@@ -0,0 +1,217 @@
+"""Test metrics computed from stored sensor readings.
+
+With ``TEST_EXECUTOR_MODE=stored`` the executor evaluates a unit from its
+most recent window of ``sensor_readings`` instead of live sensor fetches.
+The window ends at the unit's latest stored reading, not at the current
+time, so a unit that was briefly offline is still evaluated on its last
+``TEST_STORED_WINDOW_MINUTES`` of data. Runs that start within the same
+short tick share one query: their unit IDs are collected, the windows of
+all of them are loaded with a single query, and metrics are computed with
+vectorized NumPy per unit. A unit with no raw readings left (all rolled up
+or archived) fails with ``InsufficientDataError``.
+
+Metric derivation (until dedicated capture and pressure sensors are stored):
+    co2_capture_rate: % of samples where the unit was operating normally,
+        i.e. airflow at or above MIN_OPERATING_AIRFLOW and CO₂ within
+        CO2_OPERATING_BAND
+    energy_efficiency: mean of the ``efficiency`` sensor
+    system_pressure: mean airflow scaled by the nominal fan curve
+        (NOMINAL_AIRFLOW at NOMINAL_PRESSURE)
+"""
+import asyncio
+from datetime import timedelta
+from typing import Dict, List, Optional, Union
+from uuid import UUID
+from sqlalchemy import Float, cast, func, select
+from app import models
+from app.database import get_session_factory, get_settings
+from app.logging_config import get_logger
+
+logger = get_logger("services.stored_metrics")
+
+MIN_OPERATING_AIRFLOW = 30.0  # m³/s
+CO2_OPERATING_BAND = (350.0, 500.0)  # ppm
+NOMINAL_AIRFLOW = 45.0  # m³/s
+NOMINAL_PRESSURE = 1.4  # bar
+
+REQUIRED_SENSORS = ("co2", "airflow", "efficiency")
+
+# unit -> sensor type -> (timestamps as epoch seconds, values)
+Window = Dict[str, tuple]
+
+
+class InsufficientDataError(RuntimeError):
+    """A unit has no stored readings for a required sensor in the window."""
+
+
+def _group_rows(rows) -> Dict[UUID, Window]:
+    """Split rows ordered by (unit, sensor type, timestamp) into per-series arrays."""
+    import numpy as np
+
+    if not rows:
+        return {}
+    unit_ids, sensor_types, values, timestamps = zip(*rows)
+    # Object arrays keep UUIDs and enum members intact for the boundary comparison
+    unit_ids = np.array(unit_ids, dtype=object)
+    sensor_types = np.array(sensor_types, dtype=object)
+    values = np.asarray(values, dtype=np.float64)
+    # Naive UTC datetimes -> epoch seconds
+    seconds = np.asarray(timestamps, dtype="datetime64[us]").astype(np.int64) / 1e6
+
+    # Series boundaries: wherever the unit or sensor type changes
+    starts = np.flatnonzero(
+        np.concatenate(([True], (unit_ids[1:] != unit_ids[:-1]) | (sensor_types[1:] != sensor_types[:-1])))
+    )
+    ends = np.append(starts[1:], len(values))
+
+    windows: Dict[UUID, Window] = {}
+    for lo, hi in zip(starts.tolist(), ends.tolist()):
+        sensor_type = sensor_types[lo]
+        key = sensor_type.value if hasattr(sensor_type, 'value') else str(sensor_type)
+        windows.setdefault(unit_ids[lo], {})[key] = (seconds[lo:hi], values[lo:hi])
+    return windows
+
+
+def load_windows(unit_ids: List[UUID], window: timedelta) -> Dict[UUID, Window]:
+    """Load each unit's readings in the ``window`` before its latest reading, in one query."""
+    db = get_session_factory()()
+    try:
+        unit = models.DacUnit
+        reading = models.SensorReading
+        # Latest reading per unit: one probe of the unique index per sensor type
+        latest = [
+            select(reading.timestamp)
+            .where(reading.unit_id == unit.id, reading.sensor_type == sensor_type)
+            .order_by(reading.timestamp.desc())
+            .limit(1)
+            .scalar_subquery()
+            for sensor_type in REQUIRED_SENSORS
+        ]
+        anchors = (
+            select(unit.id.label("unit_id"), func.greatest(*latest).label("newest"))
+            .where(unit.id.in_(unit_ids))
+            .cte("anchors")
+        )
+        rows = db.execute(
+            select(reading.unit_id, reading.sensor_type, cast(reading.value, Float), reading.timestamp)
+            .join(anchors, reading.unit_id == anchors.c.unit_id)
+            .where(
+                reading.timestamp > anchors.c.newest - window,
+                reading.timestamp <= anchors.c.newest,
+            )
+            .order_by(reading.unit_id, reading.sensor_type, reading.timestamp)
+        ).all()
+        return _group_rows(rows)
+    finally:
+        db.close()
+
+
+def compute_metrics(window: Window) -> Dict[str, float]:
+    """
+    Compute test metrics from one unit's window.
+
+    Raises:
+        InsufficientDataError: if a required sensor has no samples
+    """
+    import numpy as np
+
+    for sensor_type in REQUIRED_SENSORS:
+        if sensor_type not in window or len(window[sensor_type][1]) == 0:
+            raise InsufficientDataError(f"No stored {sensor_type} readings in the test window")
+
+    co2_times, co2 = window["co2"]
+    airflow_times, airflow = window["airflow"]
+    _, efficiency = window["efficiency"]
+
+    # Align airflow to the CO₂ sample times (both series are time-ordered)
+    airflow_at_co2 = np.interp(co2_times, airflow_times, airflow)
+    operating = (
+        (airflow_at_co2 >= MIN_OPERATING_AIRFLOW)
+        & (co2 >= CO2_OPERATING_BAND[0])
+        & (co2 <= CO2_OPERATING_BAND[1])
+    )
+
+    return {
+        "co2_capture_rate": float(operating.mean() * 100),
+        "energy_efficiency": float(efficiency.mean()),
+        "system_pressure": float(airflow.mean() / NOMINAL_AIRFLOW * NOMINAL_PRESSURE),
+    }
+
+
+def _load_and_compute(
+    unit_ids: List[UUID], window: timedelta
+) -> Dict[UUID, Union[Dict[str, float], Exception]]:
+    windows = load_windows(unit_ids, window)
+    results: Dict[UUID, Union[Dict[str, float], Exception]] = {}
+    for unit_id in unit_ids:
+        try:
+            results[unit_id] = compute_metrics(windows.get(unit_id, {}))
+        except Exception as e:
+            results[unit_id] = e
+    return results
+
+
+class StoredWindowLoader:
+    """
+    Coalesce metric requests from runs starting in the same tick into one query.
+
+    ``load`` parks the caller on a future; the first request of a tick
+    schedules a flush ``tick_seconds`` later that loads every pending unit
+    at once in a worker thread and resolves all the futures.
+    """
+
+    def __init__(self, window_minutes: int = 60, tick_seconds: float = 0.05):
+        self.window_minutes = window_minutes
+        self.tick_seconds = tick_seconds
+        self._pending: Dict[UUID, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.requests = 0
+
+    @classmethod
+    def from_settings(cls) -> "StoredWindowLoader":
+        settings = get_settings()
+        return cls(
+            window_minutes=settings.test_stored_window_minutes,
+            tick_seconds=settings.test_stored_tick_ms / 1000,
+        )
+
+    async def load(self, unit_id: UUID) -> Dict[str, float]:
+        """Return computed metrics for a unit's most recent window."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(unit_id, []).append(future)
+        self.requests += 1
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_tick())
+        return await future
+
+    async def _flush_after_tick(self) -> None:
+        await asyncio.sleep(self.tick_seconds)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        self.batches += 1
+
+        window = timedelta(minutes=self.window_minutes)
+        try:
+            results = await asyncio.to_thread(_load_and_compute, list(pending), window)
+        except Exception as e:
+            logger.error(
+                "Failed to load stored sensor windows",
+                extra={"units": len(pending), "error": str(e)},
+                exc_info=True,
+            )
+            results = {unit_id: e for unit_id in pending}
+
+        logger.debug("Loaded stored sensor windows", extra={"units": len(pending)})
+        for unit_id, futures in pending.items():
+            result = results[unit_id]
+            for future in futures:
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "batches": self.batches}
@@ -0,0 +1,211 @@
+"""Fleet-wide test run analytics computed in SQL.
+
+Pass rates, metric distributions and per-unit trends are aggregated by
+PostgreSQL (``count``/``avg``/``percentile_cont``) so only summary rows
+leave the database, however many runs fall in the range.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from app import models
+from app.logging_config import get_logger
+
+logger = get_logger("services.test_analytics")
+
+PERCENTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+TREND_INTERVALS = ("day", "week")
+
+# Metrics recorded by the test executor, averaged per trend bucket
+TREND_METRICS = ("CO₂ Capture Rate", "Energy Efficiency", "System Pressure")
+
+
+def _run_filters(start: datetime, end: datetime, unit_id: Optional[UUID]) -> List[Any]:
+    filters = [models.TestRun.started_at >= start, models.TestRun.started_at < end]
+    if unit_id:
+        filters.append(models.TestRun.unit_id == unit_id)
+    return filters
+
+
+def _rate(numerator: Optional[int], denominator: Optional[int]) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def _float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _summary(db: Session, filters: List[Any]) -> Dict[str, Any]:
+    status = models.TestRun.status
+    passed = models.TestResult.passed
+    row = db.execute(
+        select(
+            func.count(models.TestRun.id).label("runs"),
+            func.count(case((status == models.TestRunStatusEnum.completed, 1))).label("completed"),
+            func.count(case((status == models.TestRunStatusEnum.failed, 1))).label("failed"),
+            func.count(case((status.in_([
+                models.TestRunStatusEnum.pending, models.TestRunStatusEnum.running
+            ]), 1))).label("in_progress"),
+            func.count(models.TestResult.id).label("with_results"),
+            func.count(case((passed.is_(True), 1))).label("passed"),
+            func.avg(
+                func.extract("epoch", models.TestRun.completed_at - models.TestRun.started_at)
+            ).label("avg_duration_seconds"),
+        )
+        .select_from(models.TestRun)
+        .outerjoin(models.TestResult, models.TestResult.test_run_id == models.TestRun.id)
+        .where(*filters)
+    ).one()
+    return {
+        "runs": row.runs,
+        "completed": row.completed,
+        "failed": row.failed,
+        "in_progress": row.in_progress,
+        "with_results": row.with_results,
+        "passed": row.passed,
+        "pass_rate": _rate(row.passed, row.with_results),
+        "avg_duration_seconds": round(float(row.avg_duration_seconds), 2)
+        if row.avg_duration_seconds is not None else None,
+    }
+
+
+def _metric_distributions(db: Session, filters: List[Any]) -> List[Dict[str, Any]]:
+    metric = models.TestMetric
+    value = metric.value
+    out_of_range = func.count(case((
+        (metric.threshold_min.isnot(None) & (value < metric.threshold_min))
+        | (metric.threshold_max.isnot(None) & (value > metric.threshold_max)),
+        1,
+    )))
+    percentile_columns = [
+        func.percentile_cont(p).within_group(value).label(f"p{round(p * 100):02d}")
+        for p in PERCENTILES
+    ]
+    rows = db.execute(
+        select(
+            metric.name,
+            func.min(metric.unit).label("unit"),
+            func.count(metric.id).label("count"),
+            func.avg(value).label("mean"),
+            func.stddev_samp(value).label("stddev"),
+            func.min(value).label("min"),
+            func.max(value).label("max"),
+            out_of_range.label("out_of_threshold"),
+            *percentile_columns,
+        )
+        .select_from(metric)
+        .join(models.TestResult, models.TestResult.id == metric.test_result_id)
+        .join(models.TestRun, models.TestRun.id == models.TestResult.test_run_id)
+        .where(*filters)
+        .group_by(metric.name)
+        .order_by(metric.name)
+    ).all()
+
+    distributions = []
+    for row in rows:
+        mapping = row._mapping
+        distributions.append({
+            "name": row.name,
+            "unit": row.unit,
+            "count": row.count,
+            "mean": _float(row.mean),
+            "stddev": _float(row.stddev),
+            "min": _float(row.min),
+            "max": _float(row.max),
+            "percentiles": {
+                column.name: _float(mapping[column.name]) for column in percentile_columns
+            },
+            "out_of_threshold": row.out_of_threshold,
+        })
+    return distributions
+
+
+def _unit_trends(db: Session, filters: List[Any], interval: str) -> List[Dict[str, Any]]:
+    bucket = func.date_trunc(interval, models.TestRun.started_at).label("bucket")
+    metric_avgs = {
+        name: func.avg(case((models.TestMetric.name == name, models.TestMetric.value)))
+        for name in TREND_METRICS
+    }
+    # Metrics fan out to one row per metric; count runs and results distinctly
+    rows = db.execute(
+        select(
+            models.TestRun.unit_id,
+            bucket,
+            func.count(func.distinct(models.TestRun.id)).label("runs"),
+            func.count(func.distinct(models.TestResult.id)).label("with_results"),
+            func.count(func.distinct(case((
+                models.TestResult.passed.is_(True), models.TestResult.id
+            )))).label("passed"),
+            func.count(func.distinct(case((
+                models.TestRun.status == models.TestRunStatusEnum.failed, models.TestRun.id
+            )))).label("failed"),
+            *[avg.label(f"metric_{index}") for index, avg in enumerate(metric_avgs.values())],
+        )
+        .select_from(models.TestRun)
+        .outerjoin(models.TestResult, models.TestResult.test_run_id == models.TestRun.id)
+        .outerjoin(models.TestMetric, models.TestMetric.test_result_id == models.TestResult.id)
+        .where(*filters)
+        .group_by(models.TestRun.unit_id, bucket)
+        .order_by(models.TestRun.unit_id, bucket)
+    ).all()
+
+    trends: Dict[UUID, List[Dict[str, Any]]] = {}
+    for row in rows:
+        mapping = row._mapping
+        trends.setdefault(row.unit_id, []).append({
+            "bucket_start": row.bucket,
+            "runs": row.runs,
+            "passed": row.passed,
+            "failed": row.failed,
+            "pass_rate": _rate(row.passed, row.with_results),
+            "metric_means": {
+                name: _float(mapping[f"metric_{index}"])
+                for index, name in enumerate(metric_avgs)
+            },
+        })
+    return [{"unit_id": unit_id, "points": points} for unit_id, points in trends.items()]
+
+
+def compute_test_analytics(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    unit_id: Optional[UUID] = None,
+    interval: str = "day",
+) -> Dict[str, Any]:
+    """
+    Aggregate test runs started in [start, end).
+
+    Args:
+        db: Database session
+        start: Range start (naive UTC)
+        end: Range end (naive UTC)
+        unit_id: Restrict to one unit
+        interval: Trend bucket size, ``day`` or ``week``
+
+    Returns:
+        Summary counts and pass rate, per-metric distributions and per-unit trends
+    """
+    if interval not in TREND_INTERVALS:
+        raise ValueError(f"interval must be one of {', '.join(TREND_INTERVALS)}")
+    filters = _run_filters(start, end, unit_id)
+    analytics = {
+        "start": start,
+        "end": end,
+        "interval": interval,
+        "summary": _summary(db, filters),
+        "metrics": _metric_distributions(db, filters),
+        "unit_trends": _unit_trends(db, filters, interval),
+    }
+    logger.debug(
+        "Computed test analytics",
+        extra={
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "unit_id": str(unit_id) if unit_id else None,
+            "runs": analytics["summary"]["runs"],
+        }
+    )
+    return analytics
@@ -0,0 +1,178 @@
+"""Batch test runs: create many runs in one transaction and dispatch them with a cap.
+
+A batch targets either an explicit list of units or every unit matching a
+status/location filter. All runs are inserted in one transaction, then
+handed to a dispatcher that keeps at most TEST_BATCH_CONCURRENCY runs in
+flight on the event loop.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+from datetime import datetime
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from app import models
+from app.database import get_settings
+from app.logging_config import get_logger
+from app.services.test_executor import execute_test_run, fail_unfinished_runs
+from app.utils.lazy import LazySingleton
+
+logger = get_logger("services.test_batches")
+
+
+class BatchError(ValueError):
+    """The batch request cannot be satisfied (no matching units, too many units)."""
+
+
+class UnknownUnitsError(BatchError):
+    """Some of the listed unit IDs do not exist."""
+
+
+class TestRunDispatcher:
+    """Run test executions as event-loop tasks, at most max_concurrency at once."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._queued: Set[UUID] = set()
+        self.dispatched = 0
+
+    @classmethod
+    def from_settings(cls) -> "TestRunDispatcher":
+        return cls(get_settings().test_batch_concurrency)
+
+    async def dispatch(self, runs: Sequence[Tuple[UUID, UUID]]) -> None:
+        """Start (test_run_id, unit_id) pairs; runs beyond the cap wait for a slot."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        for test_run_id, unit_id in runs:
+            task = asyncio.create_task(self._run(test_run_id, unit_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self.dispatched += len(runs)
+        logger.debug(
+            "Dispatched test runs",
+            extra={"runs": len(runs), "max_concurrency": self.max_concurrency},
+        )
+
+    async def _run(self, test_run_id: UUID, unit_id: UUID) -> None:
+        # Cancelled while waiting for a slot: stays in _queued for shutdown to fail
+        self._queued.add(test_run_id)
+        await self._slots.acquire()
+        self._queued.discard(test_run_id)
+        try:
+            # Marks the run failed itself if cancelled from here on
+            await execute_test_run(test_run_id, unit_id)
+        finally:
+            self._slots.release()
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """Cancel every run in flight or queued and mark them failed as interrupted."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        queued, self._queued = list(self._queued), set()
+        if queued:
+            # One UPDATE for the runs that never got a slot
+            await asyncio.to_thread(fail_unfinished_runs, queued)
+            logger.info("Marked queued test runs interrupted", extra={"runs": len(queued)})
+
+
+test_run_dispatcher = LazySingleton(TestRunDispatcher.from_settings)
+
+
+def create_batch(
+    db: Session,
+    unit_ids: Optional[List[UUID]] = None,
+    status: Optional[models.UnitStatusEnum] = None,
+    location: Optional[str] = None,
+) -> Tuple[models.TestRunBatch, List[models.TestRun]]:
+    """
+    Insert a batch and one pending run per target unit (caller commits).
+
+    Raises:
+        UnknownUnitsError: if any listed unit does not exist
+        BatchError: if nothing matches or the batch exceeds the maximum size
+    """
+    query = select(models.DacUnit.id)
+    if unit_ids:
+        requested = set(unit_ids)
+        query = query.where(models.DacUnit.id.in_(requested))
+    else:
+        if status is not None:
+            query = query.where(models.DacUnit.status == status)
+        if location is not None:
+            query = query.where(models.DacUnit.location == location)
+    target_ids = list(db.execute(query.order_by(models.DacUnit.id)).scalars())
+
+    if unit_ids:
+        missing = requested.difference(target_ids)
+        if missing:
+            raise UnknownUnitsError(f"Units not found: {', '.join(sorted(str(m) for m in missing))}")
+    if not target_ids:
+        raise BatchError("No units match the batch filter")
+    max_units = get_settings().test_batch_max_units
+    if len(target_ids) > max_units:
+        raise BatchError(
+            f"Batch targets {len(target_ids)} units; the maximum is {max_units}"
+        )
+
+    batch = models.TestRunBatch(
+        total_runs=len(target_ids),
+        filter_status=None if unit_ids else status,
+        filter_location=None if unit_ids else location,
+    )
+    db.add(batch)
+    db.flush()
+
+    started_at = datetime.utcnow()
+    runs = [
+        models.TestRun(
+            unit_id=unit_id,
+            status=models.TestRunStatusEnum.pending,
+            started_at=started_at,
+            batch_id=batch.id,
+        )
+        for unit_id in target_ids
+    ]
+    db.add_all(runs)
+    db.flush()  # Assign run IDs in one multi-row INSERT
+    return batch, runs
+
+
+def get_batch_progress(db: Session, batch_id: UUID) -> Optional[Dict[str, Any]]:
+    """Aggregate status counts for a batch, or None if it does not exist."""
+    batch = db.query(models.TestRunBatch).filter(models.TestRunBatch.id == batch_id).first()
+    if not batch:
+        return None
+
+    status = models.TestRun.status
+    row = db.execute(
+        select(
+            func.count(case((status == models.TestRunStatusEnum.pending, 1))).label("pending"),
+            func.count(case((status == models.TestRunStatusEnum.running, 1))).label("running"),
+            func.count(case((status == models.TestRunStatusEnum.completed, 1))).label("completed"),
+            func.count(case((status == models.TestRunStatusEnum.failed, 1))).label("failed"),
+            func.count(case((models.TestResult.passed.is_(True), 1))).label("passed"),
+        )
+        .select_from(models.TestRun)
+        .outerjoin(models.TestResult, models.TestResult.test_run_id == models.TestRun.id)
+        .where(models.TestRun.batch_id == batch_id)
+    ).one()
+
+    finished = row.completed + row.failed
+    return {
+        "id": batch.id,
+        "total_runs": batch.total_runs,
+        "pending": row.pending,
+        "running": row.running,
+        "completed": row.completed,
+        "failed": row.failed,
+        "passed": row.passed,
+        "progress": round(finished / batch.total_runs, 4) if batch.total_runs else 1.0,
+        "done": finished >= batch.total_runs,
+        "created_at": batch.created_at,
+    }
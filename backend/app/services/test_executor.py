@@ -1,40 +1,71 @@
-"""Test execution service - simulates running tests and generating results.
+"""Test execution service - collects sensor data and generates test results.
 
-This service simulates test execution by generating mock sensor data.
-In production, this would be replaced with actual sensor API calls.
+Runs are coroutines on the event loop: sensor values are fetched
+concurrently from the configured ``SensorSource`` (simulated by default)
+and database writes run in worker threads, so one process can drive
+hundreds of concurrent test runs without holding a thread per run.
+
+With ``TEST_EXECUTOR_MODE=stored`` metrics are computed from the unit's
+stored readings instead (see ``stored_metrics``).
+
+A run cancelled by shutdown is marked failed as interrupted. Runs a process
+could not mark (killed, or stopped before dispatching a batch) are failed
+by ``fail_stale_runs_periodically`` once ``TEST_RUN_STALE_MINUTES`` old, so
+batches always finish.
 """
-import time
-import random
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
 from uuid import UUID
-from sqlalchemy.orm import Session
-from app import models, schemas
-from app.database import SessionLocal
+from sqlalchemy import update
+from app import models
+from app.database import get_session_factory, get_settings
 from app.logging_config import get_logger
 from app.utils.database import transaction
+from app.cache import get_cache
+from app.services.sensor_sources import collect_sensor_data
+from app.services.stored_metrics import StoredWindowLoader
+from app.utils.lazy import LazySingleton
 
 logger = get_logger("services.test_executor")
 
+# Shared with the tests router so status changes show up on the next poll
+TEST_RUNS_CACHE_NAMESPACE = "test_runs"
+
+INTERRUPTED_ERROR = "Interrupted: the server stopped before the test run finished"
+
+# Seconds between sweeps for runs left pending or running by a stopped process
+STALE_RUN_SWEEP_SECONDS = 60.0
+
+# Bounds concurrent DB writes to what the connection pool can serve
+_db_slots: Optional[asyncio.Semaphore] = None
+
+# Shares one readings query between runs starting in the same tick (stored mode)
+stored_window_loader = LazySingleton(StoredWindowLoader.from_settings)
+
 
-def execute_test_run(test_run_id: UUID, unit_id: UUID, db: Session):
+async def _run_db(fn, *args):
+    """Run a blocking database function in a worker thread."""
+    global _db_slots
+    if _db_slots is None:
+        _db_slots = asyncio.Semaphore(get_settings().test_executor_db_concurrency)
+    async with _db_slots:
+        return await asyncio.to_thread(fn, *args)
+
+
+async def execute_test_run(test_run_id: UUID, unit_id: UUID):
     """
-    Execute a test run by simulating sensor data collection.
-    
-    In production, this would:
-    1. Call actual sensor APIs to collect real-time data
-    2. Perform calculations and validations
-    3. Generate test results based on actual sensor readings
-    
-    This function runs in a background task, so it needs to create its own DB session.
-    
+    Execute a test run: mark it running, collect sensor data, store results.
+
+    In production, sensor data comes from the sensor API (``SENSOR_SOURCE=http``)
+    or from stored readings (``TEST_EXECUTOR_MODE=stored``); by default it is
+    simulated. Any failure, including a sensor fetch timing out or missing
+    stored readings, marks the run as failed with the error message.
+
     Args:
         test_run_id: The ID of the test run to execute
         unit_id: The ID of the DAC unit being tested
-        db: Database session (will create a new one for background task)
     """
-    # Create a new database session for the background task
-    background_db = SessionLocal()
-    
     try:
         logger.info(
             "Starting test execution",
@@ -43,65 +74,26 @@ def execute_test_run(test_run_id: UUID, unit_id: UUID, db: Session):
                 "unit_id": str(unit_id),
             }
         )
-        
-        # Simulate test execution time (2-5 seconds)
-        execution_time = random.uniform(2.0, 5.0)
-        time.sleep(execution_time)
-        
-        # Update test run status to running
-        with transaction(background_db):
-            test_run = background_db.query(models.TestRun).filter(models.TestRun.id == test_run_id).first()
-            if not test_run:
-                logger.warning(f"Test run not found: {test_run_id}")
-                return
-            
-            test_run.status = models.TestRunStatusEnum.running
-            background_db.refresh(test_run)
-        
+
+        if not await _run_db(_mark_running, test_run_id):
+            logger.warning(f"Test run not found: {test_run_id}")
+            return
         logger.debug(f"Test run {test_run_id} status updated to running")
-        
-        # Simulate collecting sensor data
-        # In production, replace this with actual sensor API calls:
-        # sensor_data = collect_sensor_data(unit_id)
-        sensor_data = _simulate_sensor_data_collection()
-        
+
+        if get_settings().test_executor_mode == "stored":
+            # Evaluate the unit's most recent stored readings window
+            sensor_data = await stored_window_loader.load(unit_id)
+        else:
+            # Fetch every metric concurrently, each bounded by a timeout
+            sensor_data = await collect_sensor_data(unit_id)
+
         # Process the sensor data and generate test results
-        # In production, replace this with actual data processing:
-        # results = process_sensor_data(sensor_data)
         results = _generate_test_results(sensor_data)
-        
-        # Create test result record
-        with transaction(background_db):
-            test_run = background_db.query(models.TestRun).filter(models.TestRun.id == test_run_id).first()
-            if not test_run:
-                logger.warning(f"Test run not found during result creation: {test_run_id}")
-                return
-            
-            # Create test result record
-            db_result = models.TestResult(
-                test_run_id=test_run_id,
-                passed=results['passed'],
-                summary=results['summary']
-            )
-            background_db.add(db_result)
-            background_db.flush()
-            
-            # Create test metrics
-            for metric in results['metrics']:
-                db_metric = models.TestMetric(
-                    test_result_id=db_result.id,
-                    name=metric['name'],
-                    value=metric['value'],
-                    unit=metric['unit'],
-                    threshold_min=metric.get('threshold_min'),
-                    threshold_max=metric.get('threshold_max')
-                )
-                background_db.add(db_metric)
-            
-            # Update test run to completed
-            test_run.status = models.TestRunStatusEnum.completed
-            test_run.completed_at = datetime.utcnow()
-        
+
+        if not await _run_db(_store_results, test_run_id, results):
+            logger.warning(f"Test run not found during result creation: {test_run_id}")
+            return
+
         logger.info(
             "Test execution completed successfully",
             extra={
@@ -110,7 +102,17 @@ def execute_test_run(test_run_id: UUID, unit_id: UUID, db: Session):
                 "passed": results['passed'],
             }
         )
-        
+
+    except asyncio.CancelledError:
+        # Shutdown or worker recycling: nothing will resume the run, so close it
+        try:
+            await asyncio.to_thread(fail_unfinished_runs, [test_run_id])
+        except Exception as e:
+            logger.error(
+                f"Failed to mark interrupted test run: {test_run_id}",
+                extra={"error": str(e)},
+            )
+        raise
     except Exception as e:
         # If test execution fails, mark test run as failed
         logger.error(
@@ -123,56 +125,153 @@ def execute_test_run(test_run_id: UUID, unit_id: UUID, db: Session):
             },
             exc_info=True
         )
-        
+
         try:
-            with transaction(background_db):
-                test_run = background_db.query(models.TestRun).filter(models.TestRun.id == test_run_id).first()
-                if test_run:
-                    test_run.status = models.TestRunStatusEnum.failed
-                    test_run.error = str(e)
-                    test_run.completed_at = datetime.utcnow()
+            await _run_db(_mark_failed, test_run_id, str(e))
         except Exception as inner_e:
             logger.error(
                 f"Failed to update test run status to failed: {test_run_id}",
                 extra={"error": str(inner_e)},
                 exc_info=True
             )
+
+
+def _mark_running(test_run_id: UUID) -> bool:
+    db = get_session_factory()()
+    try:
+        with transaction(db):
+            test_run = db.query(models.TestRun).filter(models.TestRun.id == test_run_id).first()
+            if not test_run:
+                return False
+            test_run.status = models.TestRunStatusEnum.running
     finally:
-        background_db.close()
+        db.close()
+    get_cache().invalidate(TEST_RUNS_CACHE_NAMESPACE)
+    return True
 
 
-def _simulate_sensor_data_collection() -> dict:
+def _store_results(test_run_id: UUID, results: dict) -> bool:
+    db = get_session_factory()()
+    try:
+        with transaction(db):
+            test_run = db.query(models.TestRun).filter(models.TestRun.id == test_run_id).first()
+            if not test_run:
+                return False
+
+            # Create test result record
+            db_result = models.TestResult(
+                test_run_id=test_run_id,
+                passed=results['passed'],
+                summary=results['summary']
+            )
+            db.add(db_result)
+            db.flush()
+
+            # Create test metrics
+            for metric in results['metrics']:
+                db_metric = models.TestMetric(
+                    test_result_id=db_result.id,
+                    name=metric['name'],
+                    value=metric['value'],
+                    unit=metric['unit'],
+                    threshold_min=metric.get('threshold_min'),
+                    threshold_max=metric.get('threshold_max')
+                )
+                db.add(db_metric)
+
+            # Update test run to completed
+            test_run.status = models.TestRunStatusEnum.completed
+            test_run.completed_at = datetime.utcnow()
+    finally:
+        db.close()
+    get_cache().invalidate(TEST_RUNS_CACHE_NAMESPACE)
+    return True
+
+
+def _mark_failed(test_run_id: UUID, error: str) -> None:
+    db = get_session_factory()()
+    try:
+        with transaction(db):
+            test_run = db.query(models.TestRun).filter(models.TestRun.id == test_run_id).first()
+            if test_run:
+                test_run.status = models.TestRunStatusEnum.failed
+                test_run.error = error
+                test_run.completed_at = datetime.utcnow()
+    finally:
+        db.close()
+    get_cache().invalidate(TEST_RUNS_CACHE_NAMESPACE)
+
+
+def fail_unfinished_runs(
+    run_ids: Optional[Sequence[UUID]] = None,
+    started_before: Optional[datetime] = None,
+    error: str = INTERRUPTED_ERROR,
+) -> int:
     """
-    Simulate collecting sensor data from a DAC unit.
-    
-    In production, replace this with actual sensor API calls:
-    
-    Example:
-        async def collect_sensor_data(unit_id: UUID) -> dict:
-            co2_data = await sensor_api.get_co2_reading(unit_id)
-            temp_data = await sensor_api.get_temperature(unit_id)
-            airflow_data = await sensor_api.get_airflow(unit_id)
-            efficiency_data = await sensor_api.get_efficiency(unit_id)
-            
-            return {
-                'co2': co2_data,
-                'temperature': temp_data,
-                'airflow': airflow_data,
-                'efficiency': efficiency_data
-            }
+    Mark pending or running test runs as failed.
+
+    Args:
+        run_ids: Only these runs (default: any)
+        started_before: Only runs started before this time (default: any)
+        error: Error message stored on the runs
+
+    Returns:
+        Number of runs marked failed
     """
-    return {
-        'co2_capture_rate': random.uniform(70, 95),
-        'energy_efficiency': random.uniform(75, 98),
-        'system_pressure': random.uniform(0.8, 2.0),
-    }
+    statement = (
+        update(models.TestRun)
+        .where(models.TestRun.status.in_([models.TestRunStatusEnum.pending, models.TestRunStatusEnum.running]))
+        .values(status=models.TestRunStatusEnum.failed, error=error, completed_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if run_ids is not None:
+        if not run_ids:
+            return 0
+        statement = statement.where(models.TestRun.id.in_(list(run_ids)))
+    if started_before is not None:
+        statement = statement.where(models.TestRun.started_at < started_before)
+
+    db = get_session_factory()()
+    try:
+        with transaction(db):
+            failed = db.execute(statement).rowcount
+    finally:
+        db.close()
+    if failed:
+        get_cache().invalidate(TEST_RUNS_CACHE_NAMESPACE)
+    return failed
+
+
+async def fail_stale_runs_periodically(stale_after: timedelta) -> None:
+    """
+    Fail runs left pending or running for longer than ``stale_after``, now and every minute.
+
+    Covers runs of processes that were killed or stopped before they ran
+    them; live runs finish within seconds, so they are never this old.
+    """
+    while True:
+        try:
+            failed = await asyncio.to_thread(fail_unfinished_runs, None, datetime.utcnow() - stale_after)
+            if failed:
+                logger.warning(
+                    "Failed stale test runs",
+                    extra={"runs": failed, "stale_minutes": stale_after.total_seconds() / 60},
+                )
+        except Exception as e:
+            logger.error(
+                "Stale test run sweep failed",
+                extra={"error": str(e), "error_type": type(e).__name__},
+                exc_info=True,
+            )
+        await asyncio.sleep(STALE_RUN_SWEEP_SECONDS)
 
 
 def _generate_test_results(sensor_data: dict) -> dict:
     """
     Generate test results from sensor data.
     
-    In production, replace this with actual data processing:
+    Sensor data maps each of ``TEST_METRICS`` to its current value.
+    In production, extend this with actual data processing:
     
     Example:
         def process_sensor_data(sensor_data: dict) -> dict:
@@ -0,0 +1,424 @@
+"""In-memory cache of recent sensor reading windows.
+
+Each (unit_id, sensor_type) series is held in a ring buffer of parallel
+arrays (timestamps, values, created_at, ids) covering the most recent
+``window`` of data. Dashboard requests for windows that start inside the
+cached range are answered without touching the database, and new readings
+are appended to the tail instead of invalidating the series.
+
+Series are evicted least-recently-used once the total memory cap is reached.
+With several worker processes, readings stored by one worker reach the
+others through the shared cache's pub/sub channel, and so do series dropped
+with ``invalidate_series`` (see ``subscribe_to_remote_readings``).
+"""
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from app.database import get_settings
+from app.logging_config import get_logger
+from app.utils.lazy import LazySingleton
+
+logger = get_logger("services.timeseries_cache")
+
+_EPOCH = datetime(1970, 1, 1)
+_CENTS = Decimal("0.01")
+
+SeriesKey = Tuple[UUID, str]
+
+# Pub/sub channel on which workers announce newly stored readings
+READINGS_CHANNEL = "sensor_readings"
+# Pub/sub channel on which workers announce series to drop (e.g. after an import)
+SERIES_INVALIDATION_CHANNEL = "sensor_series_invalidate"
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalize a datetime to naive UTC, matching how readings are stored."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_micros(value: datetime) -> int:
+    delta = to_utc_naive(value) - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _as_stored_value(value: Any) -> float:
+    """Round to the Numeric(10, 2) precision the database stores."""
+    return float(Decimal(str(value)).quantize(_CENTS, rounding=ROUND_HALF_UP))
+
+
+class _SeriesBuffer:
+    """Ring buffer of readings for one series, ordered by timestamp."""
+
+    __slots__ = (
+        "unit_id", "sensor_type", "unit", "capacity", "head",
+        "timestamps", "values", "created", "ids", "covered_from", "loaded_at",
+    )
+
+    def __init__(self, unit_id: UUID, sensor_type: str, unit: str, capacity: int, covered_from: int):
+        self.unit_id = unit_id
+        self.sensor_type = sensor_type
+        self.unit = unit
+        self.capacity = capacity
+        self.head = 0  # physical index of the oldest point once the ring is full
+        self.timestamps = array("q")
+        self.values = array("d")
+        self.created = array("q")
+        self.ids = bytearray()
+        # Every reading with timestamp >= covered_from (µs) is in the buffer
+        self.covered_from = covered_from
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            len(self.timestamps) * 8 + len(self.values) * 8
+            + len(self.created) * 8 + len(self.ids)
+        )
+
+    def _physical(self, index: int) -> int:
+        return (self.head + index) % len(self.timestamps)
+
+    def last_timestamp(self) -> Optional[int]:
+        if not self.timestamps:
+            return None
+        return self.timestamps[self._physical(len(self) - 1)]
+
+    def push(self, ts: int, value: float, created: int, reading_id: bytes) -> None:
+        """Append a point at the tail, overwriting the oldest once full."""
+        if len(self) < self.capacity:
+            self.timestamps.append(ts)
+            self.values.append(value)
+            self.created.append(created)
+            self.ids += reading_id
+            return
+
+        slot = self.head
+        # Dropping the oldest point shrinks the range we can answer for
+        self.covered_from = max(self.covered_from, self.timestamps[slot] + 1)
+        self.timestamps[slot] = ts
+        self.values[slot] = value
+        self.created[slot] = created
+        self.ids[slot * 16:(slot + 1) * 16] = reading_id
+        self.head = (slot + 1) % self.capacity
+
+    def _lower_bound(self, ts: int) -> int:
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._physical(mid)] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _upper_bound(self, ts: int) -> int:
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamps[self._physical(mid)] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """Return readings with start <= timestamp <= end in the transformer format."""
+        result = []
+        for index in range(self._lower_bound(start), self._upper_bound(end)):
+            slot = self._physical(index)
+            result.append({
+                "id": UUID(bytes=bytes(self.ids[slot * 16:(slot + 1) * 16])),
+                "unit_id": self.unit_id,
+                "sensor_type": self.sensor_type,
+                "value": self.values[slot],
+                "unit": self.unit,
+                "timestamp": _from_micros(self.timestamps[slot]),
+                "created_at": _from_micros(self.created[slot]),
+            })
+        return result
+
+
+class TimeSeriesCache:
+    """LRU cache of recent reading windows, one ring buffer per series."""
+
+    def __init__(
+        self,
+        window: timedelta,
+        series_capacity: int,
+        max_bytes: int,
+        ttl_seconds: float,
+        enabled: bool = True,
+    ):
+        self.window = window
+        self.series_capacity = series_capacity
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._series: "OrderedDict[SeriesKey, _SeriesBuffer]" = OrderedDict()
+        self._versions: Dict[SeriesKey, int] = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bypasses = 0
+        self._appends = 0
+        self._evictions = 0
+
+    @classmethod
+    def from_settings(cls) -> "TimeSeriesCache":
+        settings = get_settings()
+        return cls(
+            window=timedelta(hours=settings.timeseries_cache_window_hours),
+            series_capacity=settings.timeseries_cache_series_capacity,
+            max_bytes=settings.timeseries_cache_max_mb * 1024 * 1024,
+            ttl_seconds=settings.timeseries_cache_ttl_seconds,
+            enabled=settings.timeseries_cache_enabled,
+        )
+
+    def window_start(self) -> datetime:
+        """Oldest timestamp a cached series is loaded from."""
+        return datetime.utcnow() - self.window
+
+    def accepts(self, start_time: datetime) -> bool:
+        """Whether a request starting at start_time is recent enough to cache."""
+        return self.enabled and to_utc_naive(start_time) >= self.window_start()
+
+    def get(
+        self, unit_id: UUID, sensor_type: str, start_time: datetime, end_time: datetime
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return cached readings for the range, or None if it is not fully cached."""
+        if not self.accepts(start_time):
+            with self._lock:
+                self._bypasses += 1
+            return None
+
+        key = (unit_id, sensor_type)
+        start, end = _to_micros(start_time), _to_micros(end_time)
+        with self._lock:
+            series = self._series.get(key)
+            if series is not None and time.monotonic() - series.loaded_at > self.ttl_seconds:
+                self._drop(key)
+                series = None
+            if series is None or start < series.covered_from:
+                self._misses += 1
+                return None
+            self._series.move_to_end(key)
+            self._hits += 1
+            return series.read(start, end)
+
+    def begin_fill(self, unit_id: UUID, sensor_type: str) -> int:
+        """Mark the start of a database load; pass the token to ``fill``."""
+        with self._lock:
+            return self._versions.get((unit_id, sensor_type), 0)
+
+    def fill(
+        self,
+        unit_id: UUID,
+        sensor_type: str,
+        readings: List[Dict[str, Any]],
+        window_start: datetime,
+        token: int,
+    ) -> None:
+        """
+        Load a series from readings ordered by timestamp.
+
+        The load is discarded if a reading was appended to the series since
+        ``begin_fill``, because the query may not have seen it.
+        """
+        if not self.enabled:
+            return
+        key = (unit_id, sensor_type)
+        units = {reading["unit"] for reading in readings}
+        if len(units) > 1:
+            # Mixed measurement units are rare; don't cache rather than lose them
+            return
+
+        series = _SeriesBuffer(
+            unit_id, sensor_type, units.pop() if units else "",
+            self.series_capacity, _to_micros(window_start),
+        )
+        for reading in readings:
+            series.push(
+                _to_micros(reading["timestamp"]),
+                float(reading["value"]),
+                _to_micros(reading["created_at"]),
+                reading["id"].bytes,
+            )
+
+        with self._lock:
+            if self._versions.get(key, 0) != token:
+                return
+            self._drop(key)
+            self._series[key] = series
+            self._nbytes += series.nbytes
+            self._enforce_memory_cap(keep=key)
+
+    def append(self, reading: Dict[str, Any]) -> None:
+        """Append a newly stored reading (transformer format) to its series."""
+        self.append_many([reading])
+
+    def append_many(self, readings: Iterable[Dict[str, Any]]) -> None:
+        """Append newly stored readings, e.g. from a bulk insert, to their series."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for reading in readings:
+                key = (reading["unit_id"], reading["sensor_type"])
+                self._versions[key] = self._versions.get(key, 0) + 1
+                series = self._series.get(key)
+                if series is None:
+                    continue
+
+                ts = _to_micros(reading["timestamp"])
+                last = series.last_timestamp()
+                if ts < series.covered_from:
+                    # Older than anything we answer for; nothing to update
+                    continue
+                if reading["unit"] != series.unit or (last is not None and ts < last):
+                    # Out-of-order insert inside the cached range
+                    self._drop(key)
+                    continue
+
+                before = series.nbytes
+                series.push(
+                    ts,
+                    _as_stored_value(reading["value"]),
+                    _to_micros(reading["created_at"]),
+                    reading["id"].bytes,
+                )
+                self._nbytes += series.nbytes - before
+                self._appends += 1
+            self._enforce_memory_cap()
+
+    def invalidate(self, unit_id: UUID, sensor_type: Optional[str] = None) -> None:
+        """Drop one series, or every series of a unit."""
+        with self._lock:
+            keys = [
+                key for key in self._series
+                if key[0] == unit_id and (sensor_type is None or key[1] == sensor_type)
+            ]
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._series):
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self._series.clear()
+            self._nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio, memory usage and series counts."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "series": len(self._series),
+                "points": sum(len(series) for series in self._series.values()),
+                "memory_bytes": self._nbytes,
+                "memory_limit_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypasses": self._bypasses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+                "appends": self._appends,
+                "evictions": self._evictions,
+            }
+
+    def _drop(self, key: SeriesKey) -> None:
+        series = self._series.pop(key, None)
+        if series is not None:
+            self._nbytes -= series.nbytes
+
+    def _enforce_memory_cap(self, keep: Optional[SeriesKey] = None) -> None:
+        while self._nbytes > self.max_bytes and self._series:
+            key = next(iter(self._series))
+            if key == keep:
+                if len(self._series) == 1:
+                    break
+                self._series.move_to_end(key)
+                continue
+            self._drop(key)
+            self._evictions += 1
+
+
+timeseries_cache = LazySingleton(TimeSeriesCache.from_settings)
+
+
+def _uuid(value: Any) -> UUID:
+    return value if isinstance(value, UUID) else UUID(value)
+
+
+def _parse_remote_reading(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a transformer-format reading from its JSON pub/sub form."""
+    def _datetime(value: Any) -> datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+    return {
+        "id": _uuid(data["id"]),
+        "unit_id": _uuid(data["unit_id"]),
+        "sensor_type": data["sensor_type"],
+        "value": data["value"],
+        "unit": data["unit"],
+        "timestamp": _datetime(data["timestamp"]),
+        "created_at": _datetime(data["created_at"]),
+    }
+
+
+def _drop_series(unit_id: Optional[UUID], sensor_type: Optional[str]) -> None:
+    if unit_id is None:
+        timeseries_cache.clear()
+    else:
+        timeseries_cache.invalidate(unit_id, sensor_type)
+
+
+def invalidate_series(cache, unit_id: Optional[UUID] = None, sensor_type: Optional[str] = None) -> None:
+    """
+    Drop cached series in this process and in every other worker.
+
+    With no unit_id every series is dropped; with no sensor_type every
+    series of the unit. Used when readings are written without going
+    through the append path (bulk imports), so no worker keeps a window
+    that misses them.
+    """
+    _drop_series(unit_id, sensor_type)
+    cache.publish(
+        SERIES_INVALIDATION_CHANNEL,
+        {"unit_id": str(unit_id) if unit_id is not None else None, "sensor_type": sensor_type},
+    )
+
+
+def subscribe_to_remote_readings(cache) -> None:
+    """Apply readings stored and series dropped by other worker processes to this process's cache."""
+    def _on_reading(data: Dict[str, Any]) -> None:
+        try:
+            timeseries_cache.append(_parse_remote_reading(data))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Ignoring malformed remote reading", extra={"error": str(e)})
+
+    def _on_series_invalidation(data: Dict[str, Any]) -> None:
+        try:
+            unit_id = data.get("unit_id")
+            _drop_series(_uuid(unit_id) if unit_id is not None else None, data.get("sensor_type"))
+        except (TypeError, ValueError) as e:
+            # Unparseable: dropping everything is always safe
+            logger.warning("Malformed series invalidation; clearing the cache", extra={"error": str(e)})
+            timeseries_cache.clear()
+
+    cache.subscribe(READINGS_CHANNEL, _on_reading)
+    cache.subscribe(SERIES_INVALIDATION_CHANNEL, _on_series_invalidation)
@@ -0,0 +1,216 @@
+"""Startup warmup.
+
+Without it the first requests after a deploy pay for opening pool
+connections, configuring the SQLAlchemy mappers, compiling statements and
+filling empty caches, so p99 latency spikes on every rollout. The app's
+lifespan starts ``run_warmup`` as a background task and ``/readyz`` answers
+503 until it finishes, so the load balancer keeps traffic away meanwhile.
+
+Steps, in order:
+    mappers: configure all ORM mappers
+    pool: open ``WARMUP_POOL_CONNECTIONS`` connections on the primary and
+        every replica and return them to the pool
+    schema: compare the database's Alembic revision with the migrations
+        shipped with this code
+    units: load unit IDs into the group-commit buffer's known-unit set
+    endpoints: one in-process request per read endpoint, plus recent
+        readings of every sensor type for ``WARMUP_CACHE_UNITS`` units, which
+        fills the sensor window and response caches
+
+A failing step is logged and skipped. Only a schema that is behind the
+code keeps the process unready, since its queries would fail anyway; a
+schema that is ahead (a newer release has already migrated) is logged.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import configure_mappers
+from app import models, schemas
+from app.database import get_engine, get_session_factory, get_settings, pool_sizes
+from app.logging_config import get_logger
+
+logger = get_logger("services.warmup")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+
+# Page size used for the warmup requests to list endpoints
+WARMUP_PAGE_SIZE = 20
+
+
+class WarmupState:
+    """Progress of this process's warmup, reported by /readyz and /api/system/stats."""
+
+    def __init__(self):
+        self.status = "pending"  # pending, running, ready, failed or disabled
+        self.schema: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.step_ms: Dict[str, float] = {}
+        self.errors: List[str] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "disabled")
+
+    def stats(self) -> Dict[str, Any]:
+        duration = None
+        if self.started_at is not None and self.finished_at is not None:
+            duration = round((self.finished_at - self.started_at) * 1000, 1)
+        return {
+            "status": self.status,
+            "schema": self.schema,
+            "duration_ms": duration,
+            "step_ms": dict(self.step_ms),
+            "errors": list(self.errors),
+        }
+
+
+warmup_state = WarmupState()
+
+
+def prefill_pool(engine: Engine, connections: int) -> int:
+    """Open connections at once so they all stay pooled, then return them."""
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+def check_schema() -> str:
+    """"current", "behind" (migrations not applied) or "ahead" of this code's migrations."""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(Config(ALEMBIC_INI))
+    with get_engine().connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current == set(script.get_heads()):
+        return "current"
+    known = {revision.revision for revision in script.walk_revisions()}
+    return "ahead" if current - known else "behind"
+
+
+def load_unit_ids() -> List[UUID]:
+    """All unit IDs, also remembered by the group-commit buffer."""
+    from app.services.ingest_buffer import ingest_buffer
+
+    db = get_session_factory()()
+    try:
+        unit_ids = list(db.execute(select(models.DacUnit.id).order_by(models.DacUnit.name)).scalars())
+    finally:
+        db.close()
+    ingest_buffer.remember_units(unit_ids)
+    return unit_ids
+
+
+async def warm_endpoints(app, unit_ids: List[UUID]) -> int:
+    """Send one request per read endpoint through the app in-process; returns the request count."""
+    import httpx
+
+    requests = 0
+    failures = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+        async def get(path: str, **params) -> Optional[Any]:
+            nonlocal requests
+            requests += 1
+            response = await client.get(path, params=params)
+            if response.status_code >= 500:
+                failures.append(f"GET {path} returned {response.status_code}")
+                return None
+            return response.json()
+
+        await get("/api/units", limit=WARMUP_PAGE_SIZE)
+        runs = await get("/api/tests/runs", limit=WARMUP_PAGE_SIZE)
+        await get("/api/tests/analytics")
+        if runs:
+            await get(f"/api/tests/runs/{runs[0]['id']}")
+
+        if unit_ids:
+            await get(f"/api/units/{unit_ids[0]}")
+            await get("/api/tests/runs", unitId=str(unit_ids[0]), limit=WARMUP_PAGE_SIZE)
+
+        # Recent windows of the first units, as the dashboard first loads them
+        end = datetime.utcnow()
+        start = end - timedelta(hours=1)
+        for unit_id in unit_ids[:get_settings().warmup_cache_units]:
+            await get(f"/api/sensors/types/{unit_id}")
+            for sensor_type in schemas.SensorType:
+                await get(
+                    "/api/sensors/readings",
+                    unitId=str(unit_id),
+                    sensorType=sensor_type.value,
+                    startTime=start.isoformat(),
+                    endTime=end.isoformat(),
+                )
+
+    if failures:
+        raise RuntimeError("; ".join(failures[:5]))
+    return requests
+
+
+async def _run_steps(app) -> None:
+    from app.utils.replicas import replica_router
+
+    async def step(name: str, fn, *args) -> Any:
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*args)
+            return await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            warmup_state.errors.append(f"{name}: {e}")
+            logger.warning("Warmup step failed", extra={"step": name, "error": str(e)}, exc_info=True)
+            return None
+        finally:
+            warmup_state.step_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    await step("mappers", configure_mappers)
+
+    # Connections beyond the pool size would be closed again on return
+    pool_size = pool_sizes()[0]
+    pool_connections = get_settings().warmup_pool_connections
+    connections = pool_size if pool_connections is None else min(pool_connections, pool_size)
+    if connections > 0:
+        await step("pool", prefill_pool, get_engine(), connections)
+        for replica in replica_router.replicas:
+            await step(f"pool:{replica.name}", prefill_pool, replica.engine, connections)
+
+    warmup_state.schema = await step("schema", check_schema)
+    if warmup_state.schema == "ahead":
+        logger.warning("Database schema is ahead of this release's migrations")
+
+    unit_ids = await step("units", load_unit_ids) or []
+    await step("endpoints", warm_endpoints, app, unit_ids)
+
+
+async def run_warmup(app) -> None:
+    """Warm this process up, then mark it ready (or failed if the schema is behind)."""
+    warmup_state.status = "running"
+    warmup_state.started_at = time.monotonic()
+    timeout_seconds = get_settings().warmup_timeout_seconds
+    try:
+        await asyncio.wait_for(_run_steps(app), timeout=timeout_seconds)
+    except asyncio.TimeoutError:
+        warmup_state.errors.append(f"timed out after {timeout_seconds}s")
+        logger.warning("Warmup timed out", extra={"timeout_seconds": timeout_seconds})
+    finally:
+        warmup_state.finished_at = time.monotonic()
+
+    if warmup_state.schema == "behind":
+        warmup_state.status = "failed"
+        logger.error("Database schema is behind this release; run `alembic upgrade head`")
+        return
+    warmup_state.status = "ready"
+    logger.info("Warmup complete", extra=warmup_state.stats())
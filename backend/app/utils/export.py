@@ -0,0 +1,190 @@
+"""Streaming CSV/Parquet/Arrow export of query results.
+
+Rows are fetched in batches from a server-side cursor on a dedicated
+session and encoded batch by batch, so exports of any size run in bounded
+memory and the first bytes reach the client before the query finishes.
+PyArrow is only imported for Parquet and Arrow IPC output.
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy.sql import Select
+from app.database import get_session_factory
+
+EXPORT_FORMATS = ("csv", "parquet", "arrow")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# (name, type) with type one of string, float, int, bool, timestamp
+Column = Tuple[str, str]
+
+
+def to_cell(value: Any) -> Any:
+    """Convert a database value to a plain CSV/Arrow-friendly value."""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def iter_query_batches(
+    statement: Select,
+    batch_size: int = 5000,
+    session_factory: Optional[Callable] = None,
+) -> Iterator[List[tuple]]:
+    """
+    Yield result rows of statement in lists of up to batch_size.
+
+    Uses its own session so the stream outlives the request's session, and
+    ``yield_per`` so PostgreSQL streams rows through a named cursor.
+    """
+    db = (session_factory or get_session_factory())()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield [tuple(to_cell(value) for value in row) for row in partition]
+    finally:
+        db.close()
+
+
+def iter_csv(columns: Sequence[Column], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode batches of rows as CSV with a header row, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in batches:
+        writer.writerows(
+            [
+                [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+                for row in batch
+            ]
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def arrow_schema(columns: Sequence[Column]):
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "float": pa.float64(),
+        "int": pa.int64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def record_batch(schema, rows: List[tuple]):
+    """Build an Arrow record batch from row tuples, one array per column."""
+    import pyarrow as pa
+
+    values = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(values, schema)],
+        schema=schema,
+    )
+
+
+def iter_parquet(
+    columns: Sequence[Column],
+    batches: Iterable[List[tuple]],
+    compression: str = "zstd",
+) -> Iterator[bytes]:
+    """Encode batches of rows as a Parquet file, one row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_batches([record_batch(schema, batch)]))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_arrow(columns: Sequence[Column], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """Encode batches of rows as an Arrow IPC stream, one record batch per batch."""
+    import pyarrow as pa
+
+    schema = arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(record_batch(schema, batch))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_export(
+    export_format: str,
+    columns: Sequence[Column],
+    batches: Iterable[List[tuple]],
+) -> Iterator[bytes]:
+    """Encode batches in export_format (``csv``, ``parquet`` or ``arrow``)."""
+    if export_format == "parquet":
+        return iter_parquet(columns, batches)
+    if export_format == "arrow":
+        return iter_arrow(columns, batches)
+    return iter_csv(columns, batches)
+
+
+def content_disposition(basename: str, export_format: str) -> str:
+    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    return f'attachment; filename="{basename}_{timestamp}.{export_format}"'
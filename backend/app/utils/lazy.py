@@ -0,0 +1,45 @@
+"""Process-wide singletons built on first use instead of at import."""
+import threading
+from typing import Any, Callable
+
+
+class LazySingleton:
+    """
+    Stand-in for a module-level singleton that is built on first attribute access.
+
+    ``ingest_buffer = LazySingleton(GroupCommitBuffer.from_settings)`` lets
+    other modules keep ``from ... import ingest_buffer`` while importing them
+    reads no settings and opens no engines. Attribute reads and writes are
+    forwarded to the instance.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_instance", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _lazy_resolve(self) -> Any:
+        instance = self._lazy_instance
+        if instance is None:
+            with self._lazy_lock:
+                instance = self._lazy_instance
+                if instance is None:
+                    instance = self._lazy_factory()
+                    object.__setattr__(self, "_lazy_instance", instance)
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._lazy_resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_resolve(), name, value)
+
+    def __repr__(self) -> str:
+        if self._lazy_instance is None:
+            return f"<LazySingleton {getattr(self._lazy_factory, '__qualname__', self._lazy_factory)!r} (not built)>"
+        return repr(self._lazy_instance)
+
+
+def initialized(singleton: LazySingleton) -> bool:
+    """Whether the singleton has been built (e.g. to skip cleanup of one never used)."""
+    return singleton._lazy_instance is not None
@@ -0,0 +1,80 @@
+"""Prebuilt statements for the hot read paths.
+
+Each statement is constructed once at import time with bound parameters
+instead of being rebuilt as an ORM ``Query`` on every request. Executing
+the same statement object lets SQLAlchemy reuse its compiled form from the
+engine's compiled cache, and the readings statements select plain columns
+so rows skip ORM identity-map bookkeeping.
+
+Server-side prepared statements depend on the driver: psycopg2 has none,
+while psycopg 3 (``postgresql+psycopg://`` URLs) prepares statements that
+run ``DATABASE_PREPARE_THRESHOLD`` times on a connection.
+"""
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import joinedload
+from app import models
+
+_reading = models.SensorReading
+
+# Columns read by transform_sensor_reading
+_READING_COLUMNS = (
+    _reading.id,
+    _reading.unit_id,
+    _reading.sensor_type,
+    _reading.value,
+    _reading.unit,
+    _reading.timestamp,
+    _reading.created_at,
+)
+
+UNIT_BY_ID = select(models.DacUnit).where(models.DacUnit.id == bindparam("unit_id"))
+
+UNIT_EXISTS = select(models.DacUnit.id).where(models.DacUnit.id == bindparam("unit_id"))
+
+# Params: unit_id, sensor_type, start
+READINGS_SINCE = (
+    select(*_READING_COLUMNS)
+    .where(
+        _reading.unit_id == bindparam("unit_id"),
+        _reading.sensor_type == bindparam("sensor_type"),
+        _reading.timestamp >= bindparam("start"),
+    )
+    .order_by(_reading.timestamp)
+)
+
+# Params: unit_id, sensor_type, start, end
+READINGS_BETWEEN = READINGS_SINCE.where(_reading.timestamp <= bindparam("end"))
+
+SENSOR_TYPES_FOR_UNIT = (
+    select(_reading.sensor_type)
+    .where(_reading.unit_id == bindparam("unit_id"))
+    .distinct()
+)
+
+# Collection eager loads: execute with ``.unique()`` on the result
+_TEST_RUN_LOAD = joinedload(models.TestRun.result).joinedload(models.TestResult.metrics)
+
+TEST_RUN_BY_ID = (
+    select(models.TestRun)
+    .options(_TEST_RUN_LOAD)
+    .where(models.TestRun.id == bindparam("run_id"))
+)
+
+# Params: skip, limit
+TEST_RUNS_PAGE = (
+    select(models.TestRun)
+    .options(_TEST_RUN_LOAD)
+    .order_by(models.TestRun.started_at.desc())
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+# Params: unit_id, skip, limit
+TEST_RUNS_PAGE_FOR_UNIT = (
+    select(models.TestRun)
+    .options(_TEST_RUN_LOAD)
+    .where(models.TestRun.unit_id == bindparam("unit_id"))
+    .order_by(models.TestRun.started_at.desc())
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
@@ -0,0 +1,165 @@
+"""Per-request SQL query profiling and slow-query logging.
+
+``query_profiler.install`` hooks SQLAlchemy's cursor execution events on an
+engine. Each HTTP request gets a ``QueryStats`` (via ``begin_request``)
+stored in a context variable; sync route handlers run in the threadpool
+with a copy of the request's context, so they update the same object.
+Statements slower than the threshold are logged with their EXPLAIN plan.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.logging_config import get_logger
+
+logger = get_logger("database.queries")
+
+_EXPLAIN_SAVEPOINT = "query_profiler_explain"
+
+
+class QueryStats:
+    """Query count and database time accumulated for one request."""
+
+    __slots__ = ("count", "total_seconds", "slow", "_statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slow = 0
+        self._statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_seconds += elapsed
+        self._statements[statement] = self._statements.get(statement, 0) + 1
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_seconds * 1000, 2)
+
+    @property
+    def repeated(self) -> int:
+        """Queries that repeated an earlier statement verbatim (N+1 candidates)."""
+        return self.count - len(self._statements)
+
+    def as_log_fields(self) -> Dict[str, Any]:
+        return {
+            "db_queries": self.count,
+            "db_time_ms": self.total_ms,
+            "db_repeated_queries": self.repeated,
+            "db_slow_queries": self.slow,
+        }
+
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def begin_request() -> QueryStats:
+    """Start collecting query stats for the current request context."""
+    stats = QueryStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def end_request() -> None:
+    """Stop collecting for the current context (e.g. before background tasks run)."""
+    _request_stats.set(None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _request_stats.get()
+
+
+class QueryProfiler:
+    """SQLAlchemy event listeners feeding request stats and the slow-query log."""
+
+    def __init__(self):
+        self.slow_query_seconds: Optional[float] = None
+        self.explain_slow_queries = False
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.slow_queries = 0
+
+    def install(self, engine: Engine, slow_query_ms: int = 500, explain_slow_queries: bool = True) -> None:
+        """Attach to engine; a ``slow_query_ms`` of 0 disables the slow-query log.
+
+        Safe to call again for the same engine (every ``create_app`` does):
+        the thresholds are updated and the listeners are added only once, so
+        queries are not counted twice.
+        """
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms > 0 else None
+        self.explain_slow_queries = explain_slow_queries
+        for identifier, listener in (
+            ("before_cursor_execute", self._before_cursor_execute),
+            ("after_cursor_execute", self._after_cursor_execute),
+        ):
+            if not event.contains(engine, identifier, listener):
+                event.listen(engine, identifier, listener)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "slow_queries": self.slow_queries,
+            "slow_query_ms": round(self.slow_query_seconds * 1000) if self.slow_query_seconds else None,
+        }
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        with self._lock:
+            self.queries += 1
+
+        if self.slow_query_seconds is None or elapsed < self.slow_query_seconds:
+            return
+        with self._lock:
+            self.slow_queries += 1
+        if stats is not None:
+            stats.slow += 1
+
+        fields: Dict[str, Any] = {
+            "statement": statement,
+            "duration_ms": round(elapsed * 1000, 2),
+            "executemany": executemany,
+        }
+        if self.explain_slow_queries and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            fields["plan"] = self._explain(conn, statement, parameters)
+        logger.warning("slow_query", extra=fields)
+
+    def _explain(self, conn, statement: str, parameters) -> Optional[str]:
+        """
+        EXPLAIN a statement on the same connection and transaction.
+
+        Uses the raw DBAPI cursor so the EXPLAIN itself is not profiled, inside
+        a savepoint so a failing EXPLAIN cannot abort the caller's transaction.
+        """
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+        except Exception:
+            return None
+        try:
+            cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            try:
+                cursor.execute(f"EXPLAIN {statement}", parameters)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+                return plan
+            except Exception as e:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+                logger.debug("EXPLAIN of slow query failed", extra={"error": str(e)})
+                return None
+        except Exception as e:
+            # No transaction to hold a savepoint (e.g. autocommit); skip the plan
+            logger.debug("EXPLAIN of slow query skipped", extra={"error": str(e)})
+            return None
+        finally:
+            cursor.close()
+
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,216 @@
+"""Read-replica routing for read-only endpoints.
+
+``get_read_db`` hands out sessions on the configured read replicas
+(``DATABASE_REPLICA_URLS``) in round-robin order, so chart and list queries
+stop competing with ingest writes on the primary. A background check
+measures every replica's replication lag; replicas that are unreachable or
+lag more than ``REPLICA_MAX_LAG_SECONDS`` are skipped, and with no usable
+replica reads go to the primary.
+
+Writes, and reads that must see a write made moments earlier, keep using
+``get_db``. Lookups by ID that find nothing on a replica are retried on the
+primary with ``first_or_primary``, since the row may not have replicated yet.
+Loads whose result is kept beyond the request (e.g. filling the sensor
+window cache) use ``on_primary``: a lagging replica could miss recently
+committed rows, and the cache would keep that gap.
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import engine_options, get_session_factory, get_settings
+from app.logging_config import get_logger
+from app.utils.lazy import LazySingleton, initialized
+
+logger = get_logger("utils.replicas")
+
+T = TypeVar("T")
+
+# Seconds since the last replayed transaction; 0 when fully caught up or
+# when the server is not a standby (e.g. a second primary used for testing)
+_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    """One read replica: its engine, session factory and last health check."""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine: Engine = create_engine(url, **engine_options(url))
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.last_checked: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas, falling back to the primary."""
+
+    def __init__(self, urls: List[str], max_lag_seconds: float = 5.0):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag_seconds = max_lag_seconds
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.replica_sessions = 0
+        self.primary_sessions = 0
+        self.primary_fallbacks = 0
+
+    @classmethod
+    def from_settings(cls) -> "ReplicaRouter":
+        settings = get_settings()
+        urls = [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
+        return cls(urls, settings.replica_max_lag_seconds)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def session(self) -> Session:
+        """Open a session on the next healthy replica, or on the primary if there is none."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            with self._lock:
+                self.primary_sessions += 1
+            return get_session_factory()()
+        with self._lock:
+            replica = healthy[next(self._counter) % len(healthy)]
+            self.replica_sessions += 1
+        db = replica.session_factory()
+        db.info["replica"] = replica.name
+        return db
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self.primary_fallbacks += 1
+
+    def check(self, replica: Replica) -> None:
+        """Measure a replica's lag and mark it usable or not."""
+        try:
+            with replica.engine.connect() as conn:
+                lag = float(conn.execute(_LAG_SQL).scalar() or 0)
+            replica.lag_seconds = round(lag, 3)
+            replica.last_error = None
+            healthy = lag <= self.max_lag_seconds
+        except Exception as e:
+            replica.lag_seconds = None
+            replica.last_error = str(e)
+            healthy = False
+        replica.last_checked = datetime.utcnow()
+
+        if healthy != replica.healthy:
+            log = logger.info if healthy else logger.warning
+            log(
+                "Read replica available" if healthy else "Read replica unavailable",
+                extra={
+                    "replica": replica.name,
+                    "lag_seconds": replica.lag_seconds,
+                    "max_lag_seconds": self.max_lag_seconds,
+                    "error": replica.last_error,
+                },
+            )
+        replica.healthy = healthy
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            self.check(replica)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": [replica.as_dict() for replica in self.replicas],
+            "max_lag_seconds": self.max_lag_seconds,
+            "replica_sessions": self.replica_sessions,
+            "primary_sessions": self.primary_sessions,
+            "primary_fallbacks": self.primary_fallbacks,
+        }
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+
+
+replica_router = LazySingleton(ReplicaRouter.from_settings)
+
+
+def _dispose_pools_in_child() -> None:
+    # Workers forked by app.launcher must not share the parent's pooled connections
+    if initialized(replica_router):
+        replica_router.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_pools_in_child)
+
+
+def get_read_db():
+    """Dependency for a read-only session, on a replica when one is usable."""
+    db = replica_router.session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def first_or_primary(db: Session, load: Callable[[Session], Optional[T]]) -> Optional[T]:
+    """
+    Run ``load`` on db; if it finds nothing on a replica, run it again on the primary.
+
+    ``load`` must return plain data (not ORM objects), since the primary
+    session is closed before returning.
+    """
+    result = load(db)
+    if result is None and db.info.get("replica"):
+        replica_router.record_fallback()
+        primary = get_session_factory()()
+        try:
+            result = load(primary)
+        finally:
+            primary.close()
+    return result
+
+
+def on_primary(db: Session, load: Callable[[Session], T]) -> T:
+    """
+    Run ``load`` on db if it is a primary session, otherwise on a new primary session.
+
+    ``load`` must return plain data (not ORM objects), since the primary
+    session is closed before returning.
+    """
+    if not db.info.get("replica"):
+        return load(db)
+    primary = get_session_factory()()
+    try:
+        return load(primary)
+    finally:
+        primary.close()
+
+
+async def run_health_checks(interval_seconds: float) -> None:
+    """Check every replica now and then every ``interval_seconds``, off the event loop."""
+    while True:
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(replica_router.check_all)
+        except Exception as e:
+            logger.error("Replica health check failed", extra={"error": str(e)}, exc_info=True)
+        await asyncio.sleep(max(0.0, interval_seconds - (time.perf_counter() - started)))
@@ -0,0 +1,67 @@
+"""Single-flight execution: concurrent callers with the same key share one call."""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it runs
+    block and receive the same result (or exception). Thread-safe, for use
+    from sync route handlers running in the threadpool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
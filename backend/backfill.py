@@ -0,0 +1,221 @@
+"""Bulk backfill of historical sensor readings.
+
+Two modes, both writing through PostgreSQL COPY from a pool of worker
+processes (one database connection each):
+
+    # Synthetic history for existing units (or N new ones)
+    python backfill.py generate --all-units --days 365 --cadence 60 --workers 8
+    python backfill.py generate --units 500 --days 30
+
+    # Import CSV/Parquet exports from field units
+    python backfill.py import exports/*.parquet --map device=unit_id --map ts=timestamp
+
+Run the retention job afterwards if the backfill reaches past the raw
+retention window so old readings are rolled up.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+import psycopg2
+from app.database import get_settings
+from app.services.bulk_load import (
+    backfill_unit,
+    import_batch,
+    iter_import_batches,
+    to_psycopg2_dsn,
+)
+
+_worker_conn = None
+
+
+def _init_worker(dsn: str) -> None:
+    """Open one connection per worker process, reused for all its tasks."""
+    global _worker_conn
+    _worker_conn = psycopg2.connect(dsn)
+    with _worker_conn.cursor() as cursor:
+        # Each COPY commits on its own; losing the tail of a crashed backfill is fine
+        cursor.execute("SET synchronous_commit = off")
+    _worker_conn.commit()
+
+
+def _generate_task(unit_id: str, start: datetime, end: datetime, cadence: int, seed: int) -> int:
+    return backfill_unit(_worker_conn, unit_id, start, end, cadence, seed)
+
+
+def _import_task(
+    path: str,
+    row_groups: Optional[List[int]],
+    column_map: Dict[str, str],
+    known_unit_ids: List[str],
+    batch_rows: int,
+) -> Tuple[int, int]:
+    copied = rejected = 0
+    created_at = datetime.utcnow()
+    for batch in iter_import_batches(path, batch_rows, row_groups, column_map):
+        batch_copied, batch_rejected = import_batch(_worker_conn, batch, known_unit_ids, created_at)
+        copied += batch_copied
+        rejected += batch_rejected
+    return copied, rejected
+
+
+def _create_units(dsn: str, count: int) -> List[str]:
+    now = datetime.utcnow()
+    unit_ids = [str(uuid4()) for _ in range(count)]
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO dac_units (id, name, status, location, last_updated, created_at, updated_at)
+                VALUES (%s, %s, 'healthy', %s, %s, %s, %s)
+                """,
+                [
+                    (unit_id, f"Backfill Unit {index:05d}", f"Site {index // 50}", now, now, now)
+                    for index, unit_id in enumerate(unit_ids)
+                ],
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    return unit_ids
+
+
+def _existing_units(dsn: str) -> List[str]:
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM dac_units ORDER BY name")
+            return [str(row[0]).lower() for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def _run(executor: ProcessPoolExecutor, futures: Dict, label: str) -> Tuple[int, int]:
+    """Wait for futures, printing progress; returns (rows copied, rows rejected)."""
+    began = time.perf_counter()
+    copied = rejected = 0
+    for done, future in enumerate(as_completed(futures), start=1):
+        result = future.result()
+        if isinstance(result, tuple):
+            copied += result[0]
+            rejected += result[1]
+        else:
+            copied += result
+        elapsed = time.perf_counter() - began
+        rate = round(copied / elapsed) if elapsed else 0
+        print(f"[{done}/{len(futures)}] {label}: {copied} rows ({rate} rows/s)", flush=True)
+    return copied, rejected
+
+
+def generate(args: argparse.Namespace, dsn: str) -> None:
+    if args.all_units:
+        unit_ids = _existing_units(dsn)
+    else:
+        unit_ids = _create_units(dsn, args.units)
+    if not unit_ids:
+        sys.exit("No units to backfill")
+
+    end = datetime.utcnow().replace(second=0, microsecond=0)
+    start = end - timedelta(days=args.days)
+    chunk = timedelta(days=args.chunk_days)
+
+    # Tasks are (unit, time chunk) so a few long-history units still spread across workers
+    tasks = []
+    for unit_index, unit_id in enumerate(unit_ids):
+        chunk_start = start
+        chunk_index = 0
+        while chunk_start < end:
+            chunk_end = min(chunk_start + chunk, end)
+            seed = args.seed * 1_000_003 + unit_index * 10_007 + chunk_index
+            tasks.append((unit_id, chunk_start, chunk_end, args.cadence, seed))
+            chunk_start = chunk_end
+            chunk_index += 1
+
+    began = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(dsn,)) as executor:
+        futures = {executor.submit(_generate_task, *task): task for task in tasks}
+        copied, _ = _run(executor, futures, "generate")
+    elapsed = time.perf_counter() - began
+    print(
+        f"Backfilled {copied} readings for {len(unit_ids)} units in {elapsed:.1f}s "
+        f"({round(copied / elapsed) if elapsed else 0} rows/s)"
+    )
+
+
+def import_files(args: argparse.Namespace, dsn: str) -> None:
+    import pyarrow.parquet as pq
+
+    paths = sorted({path for pattern in args.paths for path in glob.glob(pattern)})
+    if not paths:
+        sys.exit("No input files matched")
+    column_map = dict(mapping.split("=", 1) for mapping in args.map)
+    known_unit_ids = _existing_units(dsn)
+
+    # Parquet files split by row group; CSV files are one task each
+    tasks = []
+    for path in paths:
+        if path.endswith(".parquet"):
+            groups = list(range(pq.ParquetFile(path).num_row_groups))
+            for offset in range(0, len(groups), args.row_groups_per_task):
+                tasks.append((path, groups[offset:offset + args.row_groups_per_task]))
+        else:
+            tasks.append((path, None))
+
+    began = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(dsn,)) as executor:
+        futures = {
+            executor.submit(_import_task, path, groups, column_map, known_unit_ids, args.batch_rows): path
+            for path, groups in tasks
+        }
+        copied, rejected = _run(executor, futures, "import")
+    elapsed = time.perf_counter() - began
+    print(
+        f"Imported {copied} readings from {len(paths)} files in {elapsed:.1f}s "
+        f"({round(copied / elapsed) if elapsed else 0} rows/s); skipped {rejected} invalid or duplicate rows"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk backfill sensor readings")
+    parser.add_argument(
+        "--dsn",
+        help="Database URL (default: DATABASE_URL)",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker processes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gen = subparsers.add_parser("generate", help="Generate synthetic history")
+    target = gen.add_mutually_exclusive_group(required=True)
+    target.add_argument("--units", type=int, help="Create this many new units")
+    target.add_argument("--all-units", action="store_true", help="Backfill every existing unit")
+    gen.add_argument("--days", type=float, default=30, help="Days of history per unit")
+    gen.add_argument("--cadence", type=int, default=60, help="Seconds between readings")
+    gen.add_argument("--chunk-days", type=float, default=7, help="Days of history per COPY task")
+    gen.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    imp = subparsers.add_parser("import", help="Import CSV or Parquet files")
+    imp.add_argument("paths", nargs="+", help="Files or glob patterns")
+    imp.add_argument(
+        "--map", action="append", default=[], metavar="SRC=DST",
+        help="Rename a source column to a sensor_readings column",
+    )
+    imp.add_argument("--batch-rows", type=int, default=250_000, help="Rows per COPY")
+    imp.add_argument("--row-groups-per-task", type=int, default=4, help="Parquet row groups per task")
+
+    args = parser.parse_args(argv)
+    # Settings are only loaded (and validated) when no DSN is given
+    dsn = to_psycopg2_dsn(args.dsn or get_settings().database_url)
+    if args.command == "generate":
+        generate(args, dsn)
+    else:
+        import_files(args, dsn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Drive an ASGI app in-process, without a server or HTTP client.
+
+Used by benchmarks that measure middleware overhead, where socket and
+client costs would drown out the difference being measured.
+"""
+import asyncio
+from typing import List, Sequence, Tuple
+
+
+async def request(app, path: str, method: str = "GET", query: str = "", headers: Sequence[Tuple[bytes, bytes]] = ()):
+    """Send one request through app; returns (status, headers, body)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench")] + list(headers),
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Nothing more to read; block like a connection that stays open
+        await asyncio.Event().wait()
+
+    status = 0
+    response_headers: List[Tuple[bytes, bytes]] = []
+    body = bytearray()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.extend(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, bytes(body)
+
+
+def run_requests(app, path: str, count: int, concurrency: int = 1) -> None:
+    """Issue count requests to path, ``concurrency`` at a time, on a fresh event loop."""
+    async def _worker(share: int):
+        for _ in range(share):
+            status, _, _ = await request(app, path)
+            if status >= 500:
+                raise RuntimeError(f"{path} returned {status}")
+
+    async def _main():
+        shares = [count // concurrency + (1 if i < count % concurrency else 0) for i in range(concurrency)]
+        await asyncio.gather(*(_worker(share) for share in shares))
+
+    asyncio.run(_main())
+
+
+def ping_app(stream_chunks: int = 100):
+    """Minimal FastAPI app: ``/ping`` (small JSON) and ``/stream`` (chunked body)."""
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(stream_chunks):
+                yield b"x" * 1024
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    return app
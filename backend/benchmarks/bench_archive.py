@@ -0,0 +1,93 @@
+"""Cold archive of sensor readings (``app.services.archive``).
+
+``bench_archive_read`` times reading one hour of one series from an
+archived day through the memory-mapped columns.
+
+The ``test_*`` checks cover what the readings and export endpoints rely on:
+a day that is being rewritten (late readings merged in) never disappears
+for readers, and export streams merge archived days into database rows in
+the export query's order.
+"""
+import threading
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+import pytest
+from app.services.archive import SensorArchive, export_order, merge_export_batches
+
+pytest.importorskip("numpy")
+
+DAY = date(2024, 1, 15)
+UNITS = [uuid4() for _ in range(20)]
+SENSOR_TYPES = ("co2", "temperature")
+
+
+def _rows(day: date, cadence_seconds: int = 60, units=UNITS):
+    """One day of archive rows (ARCHIVE_ROW_COLUMNS layout) for every unit and sensor type."""
+    start = datetime.combine(day, datetime.min.time())
+    rows = []
+    for unit_id in units:
+        for sensor_type in SENSOR_TYPES:
+            for step in range(0, 86_400, cadence_seconds):
+                timestamp = start + timedelta(seconds=step)
+                rows.append((unit_id, sensor_type, "ppm", timestamp, float(step), uuid4(), timestamp))
+    return rows
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = SensorArchive(str(tmp_path / "archive"))
+    archive.write_day(DAY, [_rows(DAY)])
+    return archive
+
+
+def bench_archive_read(benchmark, archive):
+    start = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=6)
+    benchmark.group = "archive read (1 hour, 1 series)"
+    readings = benchmark(archive.read, UNITS[0], "co2", start, start + timedelta(hours=1))
+    assert len(readings) == 61
+
+
+def test_rewrite_never_hides_the_day(archive):
+    start = datetime.combine(DAY, datetime.min.time())
+    end = start + timedelta(days=1)
+    reader = SensorArchive(archive.root)  # Another process's view of the same files
+    missing = []
+    stop = threading.Event()
+
+    def read_continuously():
+        while not stop.is_set():
+            if len(reader.read(UNITS[0], "co2", start, end)) < 1440:
+                missing.append(1)
+
+    thread = threading.Thread(target=read_continuously)
+    thread.start()
+    try:
+        for minute in range(20):
+            # Late readings between the stored ones force a full rewrite each time
+            late = start + timedelta(minutes=minute, seconds=30)
+            archive.write_day(DAY, [[(UNITS[0], "co2", "ppm", late, 1.0, uuid4(), late)]])
+    finally:
+        stop.set()
+        thread.join()
+    assert not missing, f"{len(missing)} reads saw the day missing or incomplete"
+    assert len(reader.read(UNITS[0], "co2", start, end)) == 1440 + 20
+    assert archive.days() == [DAY]
+
+
+def test_export_merges_archived_days(archive):
+    start = datetime.combine(DAY, datetime.min.time())
+    unit_id = str(min(UNITS, key=str))
+    # Database rows: the first reading of the day (archived, not yet deleted) and the next day
+    database_rows = [
+        (unit_id, "co2", start, 0.0, "ppm"),
+        (unit_id, "co2", start + timedelta(days=1), 1.0, "ppm"),
+        (unit_id, "temperature", start + timedelta(days=1), 2.0, "ppm"),
+    ]
+    archived = archive.iter_export([unit_id], ["co2", "temperature"], start, start + timedelta(days=2), 100)
+    rows = [row for batch in merge_export_batches([database_rows], archived, 100) for row in batch]
+
+    assert len(rows) == 2 * 1440 + 2
+    assert rows == sorted(rows, key=export_order)
+    assert rows[0] == database_rows[0]
+    assert rows[1440] == database_rows[1]
+    assert all(len(batch) <= 100 for batch in merge_export_batches([database_rows], [], 100))
@@ -0,0 +1,239 @@
+"""BRIN against B-tree for the sensor_readings time indexes.
+
+Each variant gets its own scratch copy of ``sensor_readings`` (columns and
+defaults only) with the unique (unit, sensor type, timestamp) index plus:
+
+- ``btree``: ``ix_sensor_readings_timestamp`` as before migration 006;
+- ``btree+brin-32``: both, as after migration 006 by default;
+- ``brin-N``: BRIN on ``timestamp`` and ``created_at`` with
+  ``pages_per_range = N``, as after ``-x drop_timestamp_btree=true``.
+
+Rows are generated the way live ingest writes them: every unit reports at
+each cadence step, so the heap is in timestamp order apart from a small share
+of late readings. ``benchmarks.datagen`` loads one unit at a time, which does not
+match that order, so these benchmarks do not use the shared fleet.
+
+``bench_time_index_ingest`` COPYs ``BENCH_BRIN_ROWS`` rows into an empty table
+per round and reports readings per second. ``bench_time_index_range_query``
+aggregates a fleet-wide time window, as the retention and archive jobs do,
+and reports the time index sizes alongside. It runs on two states of the
+table: ``fresh`` (loaded once) and ``steady`` (after ``BENCH_BRIN_CYCLES``
+rounds of deleting the oldest quarter, VACUUM and inserting a quarter of new
+readings, as retention plus ingest do in production). In the steady state
+new rows reuse pages freed by the delete, which widens BRIN summaries;
+compare the two before dropping the B-tree.
+"""
+import io
+import os
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+
+pytestmark = pytest.mark.db
+
+BENCH_BRIN_ROWS = int(os.getenv("BENCH_BRIN_ROWS", "1000000"))
+UNITS = 100
+CADENCE_SECONDS = 60
+LATE_EVERY = 200  # one reading in this many arrives a few cadence steps late
+
+BENCH_BRIN_CYCLES = int(os.getenv("BENCH_BRIN_CYCLES", "4"))
+STEADY_SHARE = 4  # each steady-state cycle replaces 1/STEADY_SHARE of the rows
+
+VARIANTS = ("btree", "btree+brin-32", "brin-16", "brin-32", "brin-128")
+STATES = ("fresh", "steady")
+
+_UNIQUE_INDEX = "CREATE UNIQUE INDEX {table}_unique ON {table} (unit_id, sensor_type, timestamp)"
+_BTREE_INDEX = "CREATE INDEX {table}_timestamp ON {table} (timestamp)"
+_BRIN_INDEX = (
+    "CREATE INDEX {table}_{column}_brin ON {table} USING brin ({column}) "
+    "WITH (pages_per_range = {pages_per_range}, autosummarize = on)"
+)
+
+
+def _table(variant: str, purpose: str) -> str:
+    return f"bench_{purpose}_" + variant.replace("-", "_").replace("+", "_")
+
+
+def _create_table(cursor, table: str, variant: str) -> None:
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(f"CREATE TABLE {table} (LIKE sensor_readings INCLUDING DEFAULTS)")
+    cursor.execute(_UNIQUE_INDEX.format(table=table))
+    for index in variant.split("+"):
+        if index == "btree":
+            cursor.execute(_BTREE_INDEX.format(table=table))
+        else:
+            pages_per_range = int(index.split("-")[1])
+            for column in ("timestamp", "created_at"):
+                cursor.execute(_BRIN_INDEX.format(table=table, column=column, pages_per_range=pages_per_range))
+
+
+def _copy_payload(rows: int, end: datetime) -> bytes:
+    """COPY text for ``rows`` readings ending at ``end``, in arrival order."""
+    unit_ids = [str(uuid4()) for _ in range(UNITS)]
+    steps = -(-rows // UNITS)
+    start = end - timedelta(seconds=steps * CADENCE_SECONDS)
+    lines = []
+    for index in range(rows):
+        step, unit = divmod(index, UNITS)
+        measured = start + timedelta(seconds=step * CADENCE_SECONDS)
+        if index % LATE_EVERY == 0:
+            # Off the cadence grid so it never collides with the unit's on-time readings
+            measured -= timedelta(seconds=3 * CADENCE_SECONDS + 7)
+        received = start + timedelta(seconds=step * CADENCE_SECONDS, milliseconds=unit)
+        lines.append(
+            f"{unit_ids[unit]}\tco2\t{415 + index % 97 * 0.13:.2f}\tppm\t"
+            f"{measured.isoformat(sep=' ')}\t{received.isoformat(sep=' ')}\n"
+        )
+    return "".join(lines).encode()
+
+
+def _copy(conn, table: str, payload: bytes) -> None:
+    with conn.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} (unit_id, sensor_type, value, unit, timestamp, created_at) FROM STDIN",
+            io.BytesIO(payload),
+        )
+    conn.commit()
+
+
+def _index_sizes(cursor, table: str) -> dict:
+    cursor.execute(
+        """
+        SELECT c.relname, pg_relation_size(c.oid)
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND c.relname <> %s
+        """,
+        (table, f"{table}_unique"),
+    )
+    return {name[len(table) + 1:]: size for name, size in cursor.fetchall()}
+
+
+def _vacuum(conn, table: str) -> None:
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            # Summarize every block range and refresh statistics, as autovacuum would
+            cursor.execute(f"VACUUM ANALYZE {table}")
+    finally:
+        conn.autocommit = False
+
+
+def _retention_cycle(conn, table: str, payload: bytes) -> None:
+    """Delete the oldest 1/STEADY_SHARE of the time span, vacuum, then insert payload."""
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT min(timestamp), max(timestamp) FROM {table}")
+        oldest, newest = cursor.fetchone()
+        cursor.execute(
+            f"DELETE FROM {table} WHERE timestamp < %s", (oldest + (newest - oldest) / STEADY_SHARE,)
+        )
+    conn.commit()
+    _vacuum(conn, table)
+    _copy(conn, table, payload)
+
+
+@pytest.fixture(scope="module")
+def payload_end():
+    return datetime.utcnow().replace(second=0, microsecond=0)
+
+
+@pytest.fixture(scope="module")
+def payload(payload_end):
+    return _copy_payload(BENCH_BRIN_ROWS, payload_end)
+
+
+@pytest.fixture(scope="module")
+def cycle_payloads(payload_end):
+    """New readings for each steady-state cycle, continuing after the initial load."""
+    rows = BENCH_BRIN_ROWS // STEADY_SHARE
+    span = timedelta(seconds=-(-rows // UNITS) * CADENCE_SECONDS)
+    return [_copy_payload(rows, payload_end + span * cycle) for cycle in range(1, BENCH_BRIN_CYCLES + 1)]
+
+
+@pytest.fixture
+def conn(bench_dsn):
+    import psycopg2
+
+    conn = psycopg2.connect(bench_dsn)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def bench_time_index_ingest(benchmark, conn, payload, variant):
+    table = _table(variant, "ingest")
+    with conn.cursor() as cursor:
+        _create_table(cursor, table, variant)
+    conn.commit()
+
+    def truncate():
+        with conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {table}")
+        conn.commit()
+
+    benchmark.group = f"sensor_readings ingest ({BENCH_BRIN_ROWS} rows, COPY)"
+    benchmark.extra_info["variant"] = variant
+    try:
+        benchmark.pedantic(_copy, args=(conn, table, payload), setup=truncate, rounds=3)
+        benchmark.extra_info["readings_per_second"] = round(BENCH_BRIN_ROWS / benchmark.stats.stats.mean)
+        with conn.cursor() as cursor:
+            benchmark.extra_info["index_bytes"] = _index_sizes(cursor, table)
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+
+
+@pytest.fixture(
+    scope="module",
+    params=[(state, variant) for state in STATES for variant in VARIANTS],
+    ids=lambda param: "-".join(param),
+)
+def loaded_table(request, bench_dsn, payload, cycle_payloads):
+    import psycopg2
+
+    state, variant = request.param
+    table = _table(variant, f"range_{state}")
+    conn = psycopg2.connect(bench_dsn)
+    try:
+        with conn.cursor() as cursor:
+            _create_table(cursor, table, variant)
+        conn.commit()
+        _copy(conn, table, payload)
+        if state == "steady":
+            for cycle_payload in cycle_payloads:
+                _retention_cycle(conn, table, cycle_payload)
+        _vacuum(conn, table)
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT max(timestamp) FROM {table}")
+            newest = cursor.fetchone()[0]
+            sizes = _index_sizes(cursor, table)
+        yield conn, table, state, variant, newest, sizes
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+        conn.close()
+
+
+@pytest.mark.parametrize("hours", [1, 24])
+def bench_time_index_range_query(benchmark, loaded_table, hours):
+    conn, table, state, variant, newest, sizes = loaded_table
+    # A window in the middle of the table, like the retention job's old slices
+    end = newest - timedelta(hours=hours)
+    start = end - timedelta(hours=hours)
+    sql = f"SELECT count(*), avg(value) FROM {table} WHERE timestamp >= %s AND timestamp < %s"
+
+    def run():
+        with conn.cursor() as cursor:
+            cursor.execute(sql, (start, end))
+            return cursor.fetchone()
+
+    benchmark.group = f"sensor_readings {hours}h fleet range query ({state})"
+    benchmark.extra_info["variant"] = variant
+    benchmark.extra_info["state"] = state
+    benchmark.extra_info["index_bytes"] = sizes
+    count, _ = benchmark(run)
+    assert count
@@ -0,0 +1,126 @@
+"""Response cache against a fake Redis server (``fakeredis``).
+
+``bench_cache_hit`` times a cached lookup on the memory backend and on the
+Redis backend (in-process fake, so only client and serialization cost).
+
+The ``test_*`` checks cover the Redis behaviour the routers rely on: an
+invalidation in one worker reaches another worker's cache over pub/sub (for
+the sensor window cache too), and an unreachable server degrades to uncached
+loads instead of errors.
+"""
+import time
+from datetime import timedelta
+from uuid import uuid4
+import pytest
+from app.cache import MISSING, Cache, LocalMemoryBackend, RedisBackend
+
+fakeredis = pytest.importorskip("fakeredis")
+
+NAMESPACE = "units"
+VALUE = [{"id": str(i), "name": f"Unit {i}", "status": "healthy"} for i in range(100)]
+
+
+def _redis_cache(server) -> Cache:
+    # Long version memo: only a pub/sub invalidation can refresh it within a check
+    return Cache(
+        RedisBackend(client=fakeredis.FakeRedis(server=server), resubscribe_seconds=0.05),
+        version_max_age=60,
+    )
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def bench_cache_hit(benchmark, backend):
+    cache = Cache(LocalMemoryBackend()) if backend == "memory" else _redis_cache(fakeredis.FakeServer())
+    try:
+        cache.set(NAMESPACE, "list", VALUE)
+        benchmark.group = "cache hit (100 units)"
+        result = benchmark(cache.get_or_set, NAMESPACE, "list", lambda: pytest.fail("unexpected miss"))
+        assert len(result) == len(VALUE)
+    finally:
+        cache.close()
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_invalidation_reaches_other_workers():
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = _redis_cache(server), _redis_cache(server)
+    try:
+        assert worker_a.get_or_set(NAMESPACE, "list", lambda: "old") == "old"
+        worker_b.invalidate(NAMESPACE)
+        assert _wait_for(lambda: worker_a.get_or_set(NAMESPACE, "list", lambda: "new") == "new")
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_unreachable_server_falls_back_to_loader():
+    server = fakeredis.FakeServer()
+    cache = _redis_cache(server)
+    try:
+        cache.set(NAMESPACE, "list", "cached")
+        server.connected = False
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return "from database"
+
+        assert cache.get(NAMESPACE, "list") is MISSING
+        assert cache.get_or_set(NAMESPACE, "list", loader) == "from database"
+        cache.invalidate(NAMESPACE)  # Must not raise after the caller's commit
+        assert loads == [1]
+        assert cache.stats()["backend_errors"] >= 3
+    finally:
+        server.connected = True
+        cache.close()
+
+
+def test_listener_resubscribes_after_disconnect():
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = _redis_cache(server), _redis_cache(server)
+    try:
+        worker_a.get_or_set(NAMESPACE, "list", lambda: "old")
+        server.connected = False
+        time.sleep(0.2)  # Let the listener hit the outage
+        server.connected = True
+        worker_b.invalidate(NAMESPACE)
+        assert _wait_for(lambda: worker_a.get_or_set(NAMESPACE, "list", lambda: "new") == "new")
+        assert worker_a.backend._listener is not None
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_series_invalidation_reaches_other_workers():
+    from app.services.timeseries_cache import (
+        SERIES_INVALIDATION_CHANNEL,
+        subscribe_to_remote_readings,
+        timeseries_cache,
+    )
+
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = _redis_cache(server), _redis_cache(server)
+    unit_id = uuid4()
+    try:
+        subscribe_to_remote_readings(worker_a)
+        window_start = timeseries_cache.window_start()
+        token = timeseries_cache.begin_fill(unit_id, "co2")
+        timeseries_cache.fill(unit_id, "co2", [], window_start, token)
+        start, end = window_start + timedelta(minutes=1), window_start + timedelta(minutes=2)
+        assert timeseries_cache.get(unit_id, "co2", start, end) == []
+
+        # What invalidate_series publishes after a bulk import in worker B
+        worker_b.publish(SERIES_INVALIDATION_CHANNEL, {"unit_id": str(unit_id), "sensor_type": None})
+        assert _wait_for(lambda: timeseries_cache.get(unit_id, "co2", start, end) is None)
+    finally:
+        timeseries_cache.invalidate(unit_id)
+        worker_a.close()
+        worker_b.close()
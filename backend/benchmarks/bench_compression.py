@@ -0,0 +1,130 @@
+"""Compression CPU cost against bytes saved on typical API payloads.
+
+``bench_compress_payload`` compresses a serialized 24h readings window (one
+sensor, 1-minute cadence) and a page of readings from many units with each
+encoding and level. Besides time per call, every benchmark reports the
+compression ratio, output size and throughput in MB/s, so the table shows
+what each extra millisecond buys.
+
+``bench_compression_middleware`` sends the 24h window through the middleware
+in-process, complete and streamed in 16 KiB chunks (flushed per chunk).
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from app.middleware.compression import (
+    BrotliEncoding,
+    CompressionMetrics,
+    CompressionMiddleware,
+    GzipEncoding,
+    ZstdEncoding,
+)
+from benchmarks.asgi import request
+
+READINGS_PER_WINDOW = 1440  # 24h at 1-minute cadence
+STREAM_CHUNK_BYTES = 16 * 1024
+REQUESTS_PER_ROUND = 50
+
+ENCODINGS = {
+    "gzip-1": (GzipEncoding, 1),
+    "gzip-6": (GzipEncoding, 6),
+    "gzip-9": (GzipEncoding, 9),
+    "br-1": (BrotliEncoding, 1),
+    "br-4": (BrotliEncoding, 4),
+    "br-6": (BrotliEncoding, 6),
+    "zstd-1": (ZstdEncoding, 1),
+    "zstd-3": (ZstdEncoding, 3),
+    "zstd-9": (ZstdEncoding, 9),
+}
+
+
+def _readings(unit_ids, count):
+    start = datetime.utcnow() - timedelta(days=1)
+    return [
+        {
+            "id": str(uuid4()),
+            "unit_id": str(unit_ids[i % len(unit_ids)]),
+            "sensor_type": "co2",
+            "value": round(415 + (i % 97) * 0.137, 2),
+            "unit": "ppm",
+            "timestamp": (start + timedelta(minutes=i)).isoformat(),
+            "created_at": (start + timedelta(minutes=i, seconds=1)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+PAYLOADS = {
+    "readings_24h": lambda: json.dumps(_readings([uuid4()], READINGS_PER_WINDOW)).encode(),
+    "readings_fleet": lambda: json.dumps(_readings([uuid4() for _ in range(100)], 5000)).encode(),
+}
+
+
+def _encoding(name):
+    factory, level = ENCODINGS[name]
+    try:
+        return factory(level)
+    except RuntimeError as e:
+        pytest.skip(str(e))
+
+
+@pytest.mark.parametrize("encoding_name", list(ENCODINGS))
+@pytest.mark.parametrize("payload_name", list(PAYLOADS))
+def bench_compress_payload(benchmark, payload_name, encoding_name):
+    encoding = _encoding(encoding_name)
+    payload = PAYLOADS[payload_name]()
+    benchmark.group = f"compress {payload_name} ({len(payload) // 1024} KiB)"
+    compressed = benchmark(encoding.compress, payload)
+    benchmark.extra_info["bytes_in"] = len(payload)
+    benchmark.extra_info["bytes_out"] = len(compressed)
+    benchmark.extra_info["ratio"] = round(len(compressed) / len(payload), 4)
+    benchmark.extra_info["mb_per_second"] = round(len(payload) / benchmark.stats.stats.mean / 1e6, 1)
+
+
+def _payload_app(payload: bytes):
+    app = FastAPI()
+
+    @app.get("/readings")
+    def readings():
+        return Response(payload, media_type="application/json")
+
+    @app.get("/readings/stream")
+    async def readings_stream():
+        async def chunks():
+            for offset in range(0, len(payload), STREAM_CHUNK_BYTES):
+                yield payload[offset:offset + STREAM_CHUNK_BYTES]
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    return app
+
+
+@pytest.mark.parametrize("encoding_name", ["none", "gzip-6", "br-4", "zstd-3"])
+@pytest.mark.parametrize("path", ["/readings", "/readings/stream"])
+def bench_compression_middleware(benchmark, path, encoding_name):
+    payload = PAYLOADS["readings_24h"]()
+    app = _payload_app(payload)
+    metrics = CompressionMetrics()
+    if encoding_name != "none":
+        app = CompressionMiddleware(app, [_encoding(encoding_name)], metrics=metrics)
+    accept = encoding_name.split("-")[0].encode()
+    headers = [(b"accept-encoding", accept)]
+    bytes_sent = []
+
+    def run():
+        async def _main():
+            for _ in range(REQUESTS_PER_ROUND):
+                status, _, body = await request(app, path, headers=headers)
+                assert status == 200
+                bytes_sent.append(len(body))
+        asyncio.run(_main())
+
+    benchmark.group = f"compression middleware {path}"
+    benchmark.extra_info["encoding"] = encoding_name
+    benchmark.pedantic(run, rounds=10, warmup_rounds=1)
+    benchmark.extra_info["bytes_per_response"] = bytes_sent[-1]
+    benchmark.extra_info["ratio"] = round(bytes_sent[-1] / len(payload), 4)
+    benchmark.extra_info["requests_per_second"] = round(REQUESTS_PER_ROUND / benchmark.stats.stats.mean)
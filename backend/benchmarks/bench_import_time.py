@@ -0,0 +1,91 @@
+"""Cold-start import budget, measured with ``python -X importtime``.
+
+Each check imports a module in a fresh interpreter and sums the cumulative
+import time of its top-level packages from the ``-X importtime`` report, so
+the number covers everything the import drags in. The tests fail when an
+import exceeds its budget (milliseconds; override with IMPORT_BUDGET_MAIN_MS
+and IMPORT_BUDGET_MODELS_MS), which catches heavy imports creeping back into
+module scope. Budgets are generous because machines differ; lower them on a
+known CI runner.
+
+``app.models`` must also stay free of side effects: importing it may not
+read settings, build the engine or import the web framework. Importing the
+app factory (and with it every router and service) may not read settings,
+build the engine or build the service singletons either.
+"""
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks.conftest import BACKEND_DIR
+
+IMPORT_BUDGETS_MS = {
+    "main": float(os.getenv("IMPORT_BUDGET_MAIN_MS", "3000")),
+    "app.models": float(os.getenv("IMPORT_BUDGET_MODELS_MS", "1000")),
+}
+
+
+def _run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    args = [sys.executable]
+    if importtime:
+        args += ["-X", "importtime"]
+    return subprocess.run(
+        args + ["-c", code],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),  # Includes the placeholder settings from conftest
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative import time of ``module`` in a fresh interpreter."""
+    report = _run(f"import {module}", importtime=True).stderr
+    total_us = 0
+    for line in report.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" " * 2):  # Top level: one space of indent
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+@pytest.mark.parametrize("module", list(IMPORT_BUDGETS_MS))
+def test_import_time_budget(module):
+    # Best of three to smooth out a cold filesystem cache
+    elapsed_ms = min(import_time_ms(module) for _ in range(3))
+    budget_ms = IMPORT_BUDGETS_MS[module]
+    assert elapsed_ms <= budget_ms, (
+        f"import {module} took {elapsed_ms:.0f} ms (budget {budget_ms:.0f} ms); "
+        f"see `python -X importtime -c 'import {module}'`"
+    )
+
+
+def test_models_import_has_no_side_effects():
+    result = _run(
+        "import sys, app.models, app.database as database; "
+        "print(database._settings is None, database._engine is None, 'fastapi' in sys.modules)"
+    )
+    settings_unread, engine_unbuilt, fastapi_imported = result.stdout.split()
+    assert settings_unread == "True", "importing app.models read settings"
+    assert engine_unbuilt == "True", "importing app.models created the engine"
+    assert fastapi_imported == "False", "importing app.models imported fastapi"
+
+
+def test_router_imports_have_no_side_effects():
+    result = _run(
+        "import app.database as database, app.factory, app.services.retention; "
+        "from app.utils.lazy import initialized; "
+        "from app.utils.replicas import replica_router; "
+        "from app.services.ingest_buffer import ingest_buffer; "
+        "from app.services.timeseries_cache import timeseries_cache; "
+        "print(database._settings is None, database._engine is None, "
+        "not any(map(initialized, (replica_router, ingest_buffer, timeseries_cache))))"
+    )
+    settings_unread, engine_unbuilt, singletons_unbuilt = result.stdout.split()
+    assert settings_unread == "True", "importing the routers read settings"
+    assert engine_unbuilt == "True", "importing the routers created the engine"
+    assert singletons_unbuilt == "True", "importing the routers built a service singleton"
@@ -0,0 +1,75 @@
+"""Single-reading ingest throughput: per-request commits vs group commit.
+
+CONCURRENCY threads each post readings one at a time by calling the route
+function directly, like gateways that can only send one reading per
+request. ``direct`` commits every reading on its own; ``durable`` and
+``ack`` go through the group-commit buffer (answering after the flush and
+once buffered, respectively). An ``ack`` round also waits for the buffer to
+drain, so all modes are timed until the readings are committed.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+from app import schemas
+from app.routers import sensors
+from app.services.ingest_buffer import GroupCommitBuffer
+
+pytestmark = pytest.mark.db
+
+READINGS_PER_ROUND = 2000
+CONCURRENCY = 32
+MODES = ("direct", "durable", "ack")
+
+
+class _FakeResponse:
+    status_code = 200
+
+
+@pytest.fixture(params=MODES)
+def ingest_mode(request, monkeypatch, cold_caches):
+    mode = request.param
+    buffer = GroupCommitBuffer("off" if mode == "direct" else mode)
+    monkeypatch.setattr(sensors, "ingest_buffer", buffer)
+    try:
+        yield mode, buffer
+    finally:
+        buffer.close()
+
+
+def _post_readings(unit_ids, buffer):
+    from app.database import SessionLocal
+
+    # A month back, outside the windows other benchmarks read; distinct per round
+    base = datetime.utcnow() - timedelta(days=30)
+
+    def post(index):
+        db = SessionLocal()
+        try:
+            sensors.create_sensor_reading(
+                schemas.SensorReadingCreate(
+                    unit_id=unit_ids[index % len(unit_ids)],
+                    sensor_type=schemas.SensorType.co2,
+                    value=400.0 + index % 50,
+                    unit="ppm",
+                    timestamp=base + timedelta(microseconds=index),
+                ),
+                response=_FakeResponse(),
+                db=db,
+            )
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        list(pool.map(post, range(READINGS_PER_ROUND)))
+    if buffer.enabled:
+        buffer.close()  # Drain so ack mode is timed until the rows are committed
+
+
+def bench_single_reading_ingest(benchmark, bench_dataset, ingest_mode):
+    mode, buffer = ingest_mode
+    benchmark.group = "single-reading ingest"
+    benchmark.extra_info["mode"] = mode
+    benchmark.pedantic(_post_readings, args=(bench_dataset, buffer), rounds=5, warmup_rounds=1)
+    benchmark.extra_info["readings_per_second"] = round(READINGS_PER_ROUND / benchmark.stats.stats.mean)
+    if buffer.enabled:
+        benchmark.extra_info.update(buffer.stats())
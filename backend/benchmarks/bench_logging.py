@@ -0,0 +1,45 @@
+"""Request throughput with structured logging off, synchronous, queued and sampled.
+
+Requests go straight into a minimal app wrapped in the request logging
+middleware (no server), so the difference between modes is the per-request
+logging cost. Log output is written to os.devnull to keep terminal speed out
+of the measurement; with a slow stdout the gap between the synchronous and
+queued modes grows.
+"""
+import os
+import pytest
+from app.database import settings
+from app.logging_config import setup_logging, shutdown_logging
+from app.middleware.request_logging import RequestLoggingMiddleware
+from benchmarks.asgi import ping_app, run_requests
+
+REQUESTS_PER_ROUND = 500
+
+MODES = {
+    # name: (log level, async output, 2xx sample rate)
+    "off": ("WARNING", False, 1.0),
+    "sync": ("INFO", False, 1.0),
+    "queued": ("INFO", True, 1.0),
+    "queued_sampled_10pct": ("INFO", True, 0.1),
+}
+
+
+@pytest.fixture(params=list(MODES))
+def logging_mode(request):
+    level, async_output, sample_rate = MODES[request.param]
+    devnull = open(os.devnull, "w")
+    setup_logging(level, async_output, stream=devnull)
+    try:
+        yield request.param, RequestLoggingMiddleware(ping_app(), sample_rate=sample_rate)
+    finally:
+        shutdown_logging()
+        setup_logging(settings.log_level, settings.log_async)
+        devnull.close()
+
+
+def bench_request_logging(benchmark, logging_mode):
+    mode, app = logging_mode
+    benchmark.group = "request logging"
+    benchmark.extra_info["mode"] = mode
+    benchmark.pedantic(run_requests, args=(app, "/ping", REQUESTS_PER_ROUND), rounds=20, warmup_rounds=2)
+    benchmark.extra_info["requests_per_second"] = round(REQUESTS_PER_ROUND / benchmark.stats.stats.mean)
@@ -0,0 +1,63 @@
+"""Overhead of the request logging middleware: pure ASGI vs ``BaseHTTPMiddleware``.
+
+``legacy`` reproduces the previous ``@app.middleware("http")`` logger with
+``call_next``. Application logging is set to WARNING so only the middleware
+mechanics are compared, not log serialization (see bench_logging.py).
+"""
+import logging
+import time
+import pytest
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.logging_config import get_logger
+from app.middleware.request_logging import RequestLoggingMiddleware
+from benchmarks.asgi import ping_app, run_requests
+
+REQUESTS_PER_ROUND = 500
+
+logger = get_logger("main")
+
+
+async def legacy_log_requests(request, call_next):
+    start_time = time.time()
+    logger.info("request_received", extra={"method": request.method, "path": request.url.path})
+    response = await call_next(request)
+    process_time = time.time() - start_time
+    logger.info(
+        "request_completed",
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "process_time_ms": round(process_time * 1000, 2),
+        },
+    )
+    response.headers["X-Process-Time"] = str(process_time)
+    return response
+
+
+VARIANTS = {
+    "none": lambda app: app,
+    "legacy": lambda app: BaseHTTPMiddleware(app, dispatch=legacy_log_requests),
+    "asgi": lambda app: RequestLoggingMiddleware(app),
+}
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    app_logger = logging.getLogger("app")
+    previous = app_logger.level
+    app_logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        app_logger.setLevel(previous)
+
+
+@pytest.mark.parametrize("variant", list(VARIANTS))
+@pytest.mark.parametrize("path", ["/ping", "/stream"])
+def bench_request_logging_middleware(benchmark, variant, path):
+    app = VARIANTS[variant](ping_app())
+    benchmark.group = f"logging middleware {path}"
+    benchmark.extra_info["variant"] = variant
+    benchmark.pedantic(run_requests, args=(app, path, REQUESTS_PER_ROUND, 10), rounds=20, warmup_rounds=2)
+    benchmark.extra_info["requests_per_second"] = round(REQUESTS_PER_ROUND / benchmark.stats.stats.mean)
@@ -0,0 +1,62 @@
+"""Benchmarks for the hot query paths against a generated fleet.
+
+Route functions are called directly with a session so the numbers cover
+query, ORM and transform cost without HTTP overhead. ``cold_caches`` keeps
+the in-process caches out of the measurement.
+"""
+from datetime import datetime, timedelta
+import pytest
+from app import schemas
+from app.routers import sensors, tests, units
+
+pytestmark = pytest.mark.db
+
+
+def bench_get_units(benchmark, db, cold_caches):
+    result = benchmark(units.get_units, skip=0, limit=100, db=db)
+    assert result
+
+
+def bench_get_unit(benchmark, db, bench_dataset, cold_caches):
+    result = benchmark(units.get_unit, bench_dataset[0], db=db)
+    assert str(result["id"]) == str(bench_dataset[0])
+
+
+@pytest.mark.parametrize("hours", [1, 24])
+def bench_get_sensor_readings(benchmark, db, bench_dataset, cold_caches, hours):
+    end = datetime.utcnow()
+    start = end - timedelta(hours=hours)
+    result = benchmark(
+        sensors.get_sensor_readings,
+        unit_id=bench_dataset[0],
+        sensor_type=schemas.SensorType.co2,
+        start_time=start,
+        end_time=end,
+        db=db,
+    )
+    assert result
+
+
+def bench_get_sensor_readings_cached(benchmark, db, bench_dataset):
+    """Same 24h window served from the time-series cache after the first call."""
+    end = datetime.utcnow()
+    start = end - timedelta(hours=24)
+    kwargs = dict(
+        unit_id=bench_dataset[0],
+        sensor_type=schemas.SensorType.co2,
+        start_time=start,
+        end_time=end,
+        db=db,
+    )
+    sensors.get_sensor_readings(**kwargs)
+    result = benchmark(sensors.get_sensor_readings, **kwargs)
+    assert result
+
+
+def bench_get_available_sensor_types(benchmark, db, bench_dataset, cold_caches):
+    result = benchmark(sensors.get_available_sensor_types, bench_dataset[0], db=db)
+    assert set(result) == {"co2", "temperature", "airflow", "efficiency"}
+
+
+def bench_get_test_runs(benchmark, db, cold_caches):
+    benchmark(tests.get_test_runs, unit_id=None, skip=0, limit=100, db=db)
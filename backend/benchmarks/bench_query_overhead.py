@@ -0,0 +1,94 @@
+"""Python-side overhead of the hot queries: per-request ORM ``Query`` vs prebuilt statements.
+
+``legacy`` rebuilds each query as an ORM ``Query`` the way the routers did
+before ``app/utils/queries.py``; ``prebuilt`` executes the module-level
+statements. Besides wall time, every benchmark reports
+``python_ms_per_call``: wall time minus the database time measured by the
+query profiler, i.e. query construction, compilation and result processing.
+"""
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.orm import joinedload
+from app import models
+from app.database import engine
+from app.utils import queries
+from app.utils.query_profiler import begin_request, query_profiler
+
+pytestmark = pytest.mark.db
+
+OVERHEAD_CALLS = 200
+
+
+def _legacy_unit(db, unit_id):
+    return db.query(models.DacUnit).filter(models.DacUnit.id == unit_id).first()
+
+
+def _prebuilt_unit(db, unit_id):
+    return db.execute(queries.UNIT_BY_ID, {"unit_id": unit_id}).scalar_one_or_none()
+
+
+def _legacy_readings(db, unit_id):
+    start = datetime.utcnow() - timedelta(hours=24)
+    return db.query(models.SensorReading).filter(
+        models.SensorReading.unit_id == unit_id,
+        models.SensorReading.sensor_type == models.SensorTypeEnum.co2,
+        models.SensorReading.timestamp >= start,
+    ).order_by(models.SensorReading.timestamp).all()
+
+
+def _prebuilt_readings(db, unit_id):
+    start = datetime.utcnow() - timedelta(hours=24)
+    return db.execute(queries.READINGS_SINCE, {
+        "unit_id": unit_id, "sensor_type": models.SensorTypeEnum.co2, "start": start,
+    }).all()
+
+
+def _legacy_test_runs(db, unit_id):
+    return db.query(models.TestRun).filter(models.TestRun.unit_id == unit_id).options(
+        joinedload(models.TestRun.result).joinedload(models.TestResult.metrics)
+    ).order_by(models.TestRun.started_at.desc()).offset(0).limit(100).all()
+
+
+def _prebuilt_test_runs(db, unit_id):
+    return db.execute(
+        queries.TEST_RUNS_PAGE_FOR_UNIT, {"unit_id": unit_id, "skip": 0, "limit": 100}
+    ).unique().scalars().all()
+
+
+PATHS = {
+    "unit_by_id": (_legacy_unit, _prebuilt_unit),
+    "readings_24h": (_legacy_readings, _prebuilt_readings),
+    "test_runs_page": (_legacy_test_runs, _prebuilt_test_runs),
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def profiler():
+    query_profiler.install(engine, slow_query_ms=0)
+
+
+def _python_ms_per_call(fn, db, unit_id) -> float:
+    stats = begin_request()
+    started = time.perf_counter()
+    for _ in range(OVERHEAD_CALLS):
+        fn(db, unit_id)
+        db.expunge_all()
+    wall = time.perf_counter() - started
+    return round((wall - stats.total_seconds) / OVERHEAD_CALLS * 1000, 4)
+
+
+@pytest.mark.parametrize("style", ["legacy", "prebuilt"])
+@pytest.mark.parametrize("path", list(PATHS))
+def bench_query_overhead(benchmark, db, bench_dataset, path, style):
+    fn = PATHS[path][0 if style == "legacy" else 1]
+    unit_id = bench_dataset[0]
+    benchmark.group = f"query overhead: {path}"
+    benchmark.extra_info["style"] = style
+
+    def call():
+        fn(db, unit_id)
+        db.expunge_all()  # Every request starts with an empty identity map
+
+    benchmark(call)
+    benchmark.extra_info["python_ms_per_call"] = _python_ms_per_call(fn, db, unit_id)
@@ -0,0 +1,97 @@
+"""Microbenchmarks for app.utils.transformers (no database required)."""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+import pytest
+from app import models
+from app.utils.transformers import (
+    transform_dac_unit,
+    transform_sensor_reading,
+    transform_test_run,
+)
+
+READINGS_PER_WINDOW = 1440  # 24h at 1-minute cadence
+
+
+@pytest.fixture(scope="module")
+def readings():
+    unit_id = uuid4()
+    start = datetime.utcnow() - timedelta(days=1)
+    return [
+        models.SensorReading(
+            id=uuid4(),
+            unit_id=unit_id,
+            sensor_type=models.SensorTypeEnum.co2,
+            value=Decimal("421.37"),
+            unit="ppm",
+            timestamp=start + timedelta(minutes=i),
+            created_at=start + timedelta(minutes=i, seconds=1),
+        )
+        for i in range(READINGS_PER_WINDOW)
+    ]
+
+
+@pytest.fixture(scope="module")
+def test_runs():
+    now = datetime.utcnow()
+    runs = []
+    for _ in range(100):
+        run = models.TestRun(
+            id=uuid4(),
+            unit_id=uuid4(),
+            status=models.TestRunStatusEnum.completed,
+            started_at=now,
+            completed_at=now,
+            created_at=now,
+        )
+        run.result = models.TestResult(
+            id=uuid4(),
+            test_run_id=run.id,
+            passed=True,
+            summary="All systems operating within normal parameters.",
+            created_at=now,
+            metrics=[
+                models.TestMetric(
+                    id=uuid4(),
+                    name=name,
+                    value=Decimal("87.5"),
+                    unit=unit,
+                    threshold_min=Decimal("70"),
+                    threshold_max=Decimal("100"),
+                )
+                for name, unit in (
+                    ("CO₂ Capture Rate", "%"),
+                    ("Energy Efficiency", "%"),
+                    ("System Pressure", "bar"),
+                )
+            ],
+        )
+        runs.append(run)
+    return runs
+
+
+def bench_transform_sensor_reading_window(benchmark, readings):
+    """One 24h chart window, as returned by GET /api/sensors/readings."""
+    result = benchmark(lambda: [transform_sensor_reading(r) for r in readings])
+    assert len(result) == READINGS_PER_WINDOW
+
+
+def bench_transform_test_run_page(benchmark, test_runs):
+    """A page of 100 runs with results and metrics, as in GET /api/tests/runs."""
+    result = benchmark(lambda: [transform_test_run(run) for run in test_runs])
+    assert len(result) == len(test_runs)
+
+
+def bench_transform_dac_unit(benchmark):
+    now = datetime.utcnow()
+    unit = models.DacUnit(
+        id=uuid4(),
+        name="DAC Unit Alpha",
+        status=models.UnitStatusEnum.healthy,
+        location="Building A, Floor 2",
+        last_updated=now,
+        created_at=now,
+        updated_at=now,
+    )
+    result = benchmark(transform_dac_unit, unit)
+    assert result["status"] == "healthy"
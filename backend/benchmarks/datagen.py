@@ -0,0 +1,145 @@
+"""Scalable benchmark data generator.
+
+Creates N units with M days of readings for every sensor type at a fixed
+cadence and streams the readings into PostgreSQL with COPY (via
+``app.services.bulk_load``).
+
+Usage (from backend/):
+    python -m benchmarks.datagen --units 100 --days 7 --cadence 60
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
+import psycopg2
+from app.services.bulk_load import backfill_unit, to_psycopg2_dsn
+
+BENCH_UNIT_PREFIX = "Bench Unit"
+
+
+def _insert_units(cursor, count: int, now: datetime) -> List[UUID]:
+    statuses = ["healthy", "healthy", "healthy", "warning", "critical"]
+    unit_ids = [uuid4() for _ in range(count)]
+    cursor.executemany(
+        """
+        INSERT INTO dac_units (id, name, status, location, last_updated, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """,
+        [
+            (
+                str(unit_id),
+                f"{BENCH_UNIT_PREFIX} {index:05d}",
+                statuses[index % len(statuses)],
+                f"Site {index // 50}, Rack {index % 50}",
+                now,
+                now,
+                now,
+            )
+            for index, unit_id in enumerate(unit_ids)
+        ],
+    )
+    return unit_ids
+
+
+def generate_dataset(
+    dsn: str,
+    units: int,
+    days: float,
+    cadence_seconds: int = 300,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Insert ``units`` units and ``days`` of readings per sensor at ``cadence_seconds``.
+
+    Readings are generated with ``app.services.bulk_load`` and written with
+    one COPY per unit. Use ``backfill.py`` for multi-process loads.
+
+    Returns:
+        Counts and throughput of the load
+    """
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    start = now - timedelta(days=days)
+
+    conn = psycopg2.connect(dsn)
+    began = time.perf_counter()
+    rows = 0
+    try:
+        with conn.cursor() as cursor:
+            unit_ids = _insert_units(cursor, units, now)
+        conn.commit()
+        for index, unit_id in enumerate(unit_ids):
+            # Include the final step so the newest reading is at ``now``
+            rows += backfill_unit(
+                conn, str(unit_id), start, now + timedelta(seconds=1), cadence_seconds, seed + index
+            )
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - began
+    return {
+        "units": units,
+        "readings": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed) if elapsed else 0,
+    }
+
+
+def clear_dataset(dsn: str) -> None:
+    """Remove benchmark units and everything that references them."""
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE bench_units AS SELECT id FROM dac_units WHERE name LIKE %s",
+                (f"{BENCH_UNIT_PREFIX} %",),
+            )
+            cursor.execute("""
+                DELETE FROM test_metrics WHERE test_result_id IN (
+                    SELECT r.id FROM test_results r JOIN test_runs t ON t.id = r.test_run_id
+                    WHERE t.unit_id IN (SELECT id FROM bench_units))
+            """)
+            cursor.execute("""
+                DELETE FROM test_results WHERE test_run_id IN (
+                    SELECT id FROM test_runs WHERE unit_id IN (SELECT id FROM bench_units))
+            """)
+            cursor.execute("DELETE FROM test_runs WHERE unit_id IN (SELECT id FROM bench_units)")
+            cursor.execute(
+                "DELETE FROM sensor_reading_rollups WHERE unit_id IN (SELECT id FROM bench_units)"
+            )
+            cursor.execute("DELETE FROM sensor_readings WHERE unit_id IN (SELECT id FROM bench_units)")
+            cursor.execute("DELETE FROM dac_units WHERE id IN (SELECT id FROM bench_units)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate benchmark sensor data")
+    parser.add_argument("--units", type=int, default=50, help="Number of DAC units")
+    parser.add_argument("--days", type=float, default=7, help="Days of history per unit")
+    parser.add_argument("--cadence", type=int, default=300, help="Seconds between readings")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--clear", action="store_true", help="Remove existing benchmark data first")
+    parser.add_argument(
+        "--dsn",
+        default=os.getenv("BENCH_DATABASE_URL") or os.getenv("DATABASE_URL"),
+        help="Database URL (default: BENCH_DATABASE_URL or DATABASE_URL)",
+    )
+    args = parser.parse_args(argv)
+    if not args.dsn:
+        parser.error("--dsn, BENCH_DATABASE_URL or DATABASE_URL is required")
+
+    dsn = to_psycopg2_dsn(args.dsn)
+    if args.clear:
+        clear_dataset(dsn)
+    stats = generate_dataset(dsn, args.units, args.days, args.cadence, args.seed)
+    print(
+        f"Inserted {stats['units']} units and {stats['readings']} readings "
+        f"in {stats['seconds']}s ({stats['rows_per_second']} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""HTTP load scenarios for the dashboard, sensor and test flows.
+
+Run against a local stack seeded with benchmarks.datagen, e.g.:
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 \
+        --headless -u 200 -r 20 -t 2m --csv bench_results/load
+
+Locust prints p50/p95/p99 latency and requests/s per endpoint; ``--csv``
+writes the same figures (``*_stats.csv``) for comparison between runs.
+"""
+import random
+from datetime import datetime, timedelta
+from locust import HttpUser, between, events, task
+
+SENSOR_TYPES = ["co2", "temperature", "airflow", "efficiency"]
+
+_unit_ids = []
+
+
+@events.test_start.add_listener
+def load_unit_ids(environment, **kwargs):
+    """Fetch the fleet once so every user picks from real unit IDs."""
+    import requests
+
+    response = requests.get(f"{environment.host}/api/units?limit=1000", timeout=30)
+    response.raise_for_status()
+    _unit_ids.extend(unit["id"] for unit in response.json())
+    if not _unit_ids:
+        raise RuntimeError("No units found; seed the database with benchmarks.datagen first")
+
+
+def _window(hours: float):
+    end = datetime.utcnow()
+    start = end - timedelta(hours=hours)
+    return start.isoformat(), end.isoformat()
+
+
+class DashboardUser(HttpUser):
+    """Operator watching the overview and drilling into sensor charts."""
+
+    wait_time = between(1, 3)
+    weight = 6
+
+    @task(3)
+    def overview(self):
+        self.client.get("/api/units", name="/api/units")
+
+    @task(2)
+    def unit_detail(self):
+        unit_id = random.choice(_unit_ids)
+        self.client.get(f"/api/units/{unit_id}", name="/api/units/[id]")
+
+    @task(6)
+    def sensor_chart(self):
+        unit_id = random.choice(_unit_ids)
+        start, end = _window(random.choice([1, 6, 24]))
+        self.client.get(
+            "/api/sensors/readings",
+            params={
+                "unitId": unit_id,
+                "sensorType": random.choice(SENSOR_TYPES),
+                "startTime": start,
+                "endTime": end,
+            },
+            name="/api/sensors/readings",
+        )
+
+    @task(1)
+    def sensor_types(self):
+        unit_id = random.choice(_unit_ids)
+        self.client.get(f"/api/sensors/types/{unit_id}", name="/api/sensors/types/[id]")
+
+
+class TestOperatorUser(HttpUser):
+    """Operator triggering test runs and polling for their results."""
+
+    wait_time = between(2, 5)
+    weight = 1
+
+    @task(3)
+    def test_history(self):
+        unit_id = random.choice(_unit_ids)
+        self.client.get("/api/tests/runs", params={"unitId": unit_id}, name="/api/tests/runs")
+
+    @task(1)
+    def run_test(self):
+        unit_id = random.choice(_unit_ids)
+        with self.client.post(
+            "/api/tests/runs", json={"unitId": unit_id}, name="POST /api/tests/runs", catch_response=True
+        ) as response:
+            if response.status_code != 200:
+                response.failure(f"status {response.status_code}")
+                return
+            run_id = response.json()["id"]
+        for _ in range(3):
+            self.client.get(f"/api/tests/runs/{run_id}", name="/api/tests/runs/[id]")
+
+
+class IngestGateway(HttpUser):
+    """Gateway posting single readings."""
+
+    wait_time = between(0.5, 1.5)
+    weight = 2
+
+    @task
+    def post_reading(self):
+        sensor_type = random.choice(SENSOR_TYPES)
+        self.client.post(
+            "/api/sensors/readings",
+            json={
+                "unit_id": random.choice(_unit_ids),
+                "sensor_type": sensor_type,
+                "value": round(random.uniform(10, 500), 2),
+                "unit": "ppm" if sensor_type == "co2" else "%",
+                "timestamp": datetime.utcnow().isoformat(),
+            },
+            name="POST /api/sensors/readings",
+        )
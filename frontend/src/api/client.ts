@@ -5,7 +5,7 @@
  * For now, we'll simulate API calls with mock data and delays.
  */
 
-const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
+export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
 
 /**
  * Simulate network delay for realistic development experience
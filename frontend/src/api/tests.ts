@@ -1,5 +1,5 @@
-import type { TestRun, TestRunStatus } from '../types/domain';
-import { get, post, patch } from './client';
+import type { TestRun, TestRunBatchProgress, TestRunStatus, UnitStatus } from '../types/domain';
+import { API_BASE_URL, get, post, patch } from './client';
 import { generateMockTestRun, generateMockTestRuns } from '../utils/mockData';
 
 // Store active test runs for status updates
@@ -176,3 +176,56 @@ export async function updateTestRunStatus(
   }
 }
 
+/**
+ * Transform backend batch progress to frontend format
+ */
+function transformBatchProgress(backendBatch: any): TestRunBatchProgress {
+  return {
+    id: String(backendBatch.id),
+    totalRuns: backendBatch.total_runs,
+    pending: backendBatch.pending,
+    running: backendBatch.running,
+    completed: backendBatch.completed,
+    failed: backendBatch.failed,
+    passed: backendBatch.passed,
+    progress: backendBatch.progress,
+    done: backendBatch.done,
+    testRunIds: backendBatch.test_run_ids?.map(String),
+  };
+}
+
+/**
+ * Trigger test runs for many units in one request, either by ID or by filter
+ */
+export async function triggerTestRunBatch(
+  target: { unitIds: string[] } | { status?: UnitStatus; location?: string }
+): Promise<TestRunBatchProgress> {
+  const backendBatch = await post<any>('/tests/runs:batch', target);
+  return transformBatchProgress(backendBatch);
+}
+
+/**
+ * Fetch aggregate progress of a test run batch
+ */
+export async function fetchTestRunBatch(batchId: string): Promise<TestRunBatchProgress> {
+  const backendBatch = await get<any>(`/tests/batches/${batchId}`);
+  return transformBatchProgress(backendBatch);
+}
+
+/**
+ * Subscribe to batch progress via Server-Sent Events; the stream closes once every run has finished
+ */
+export function subscribeToTestRunBatch(
+  batchId: string,
+  callback: (progress: TestRunBatchProgress) => void
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/tests/batches/${batchId}/events`);
+  source.addEventListener('progress', (event) => {
+    const progress = transformBatchProgress(JSON.parse((event as MessageEvent).data));
+    callback(progress);
+    if (progress.done) {
+      source.close();
+    }
+  });
+  return () => source.close();
+}
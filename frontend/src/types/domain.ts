@@ -44,6 +44,19 @@ export interface TestResults {
   summary: string;
 }
 
+export interface TestRunBatchProgress {
+  id: string;
+  totalRuns: number;
+  pending: number;
+  running: number;
+  completed: number;
+  failed: number;
+  passed: number;
+  progress: number;
+  done: boolean;
+  testRunIds?: string[];
+}
+
 export interface TimeRange {
   start: Date;
   end: Date;
@@ -63,7 +63,7 @@ while [ $WAIT_COUNT -lt $MAX_WAIT ]; do
     # Check if container is running (status contains "Up")
     if echo "$CONTAINER_LINE" | grep -q "Up"; then
         # Check if backend is responding via health endpoint
-        if curl -s -f http://localhost:8000/health > /dev/null 2>&1; then
+        if curl -s -f http://localhost:8000/readyz > /dev/null 2>&1; then
             echo -e "${GREEN}Backend is ready!${NC}"
             BACKEND_READY=true
             break